@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import Blueprint, jsonify
+from sqlalchemy.engine import Engine
+
+
+def _check_engine(engine: Engine) -> Dict:
+    """Round trip over a pooled connection; reports the pool state alongside."""
+    pool = engine.pool
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1").scalar()
+        status = {"ready": True}
+    except Exception as e:
+        status = {"ready": False, "error": str(e).splitlines()[0][:500]}
+    status["ms"] = round((time.perf_counter() - started) * 1000, 3)
+    if hasattr(pool, "checkedout"):
+        status["pool"] = {"checked_out": pool.checkedout(), "idle": pool.checkedin(), "size": pool.size()}
+    return status
+
+
+def setup_health_api(app, engines: Dict[str, Engine], cache_ttl: float = 2.0):
+    """
+    Register the probe endpoints.
+
+    /healthz (liveness) answers from the process alone and never touches a
+    database. /readyz (readiness) runs ``SELECT 1`` on a pooled connection of
+    every engine and returns 503 while any of them is unreachable; the result
+    is reused for ``cache_ttl`` seconds so frequent probes don't add load.
+    """
+    health_api = Blueprint('health_api', __name__)
+    lock = threading.Lock()
+    last: Dict[str, Optional[object]] = {"at": None, "body": None}
+
+    @health_api.route('/healthz', methods=['GET'])
+    def healthz():
+        return jsonify({"status": "ok"}), 200
+
+    @health_api.route('/readyz', methods=['GET'])
+    def readyz():
+        with lock:
+            now = time.monotonic()
+            if last["at"] is None or now - last["at"] >= cache_ttl:
+                checks = {name: _check_engine(engine) for name, engine in engines.items()}
+                ready = all(check["ready"] for check in checks.values())
+                last["at"], last["body"] = now, {"status": "ready" if ready else "unavailable", "databases": checks}
+            body = last["body"]
+        return jsonify(body), 200 if body["status"] == "ready" else 503
+
+    app.register_blueprint(health_api)
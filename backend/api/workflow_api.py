@@ -1,74 +1,209 @@
-from flask import Blueprint, jsonify, request
-from backend.services.wf_builder_service import AnswerService, VC_DB_Service
-from datetime import datetime, timezone
-from config.database import VC_DB_Local
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from datetime import datetime
+import logging
 import pytz
+from backend.services.timing import format_server_timing
+
+
+def _to_ist_string(frontend_timestamp: str) -> str:
+    """Convert the frontend's ISO UTC timestamp ('...Z') to an IST 'YYYY-mm-dd HH:MM:SS' string."""
+    utc_time = datetime.fromisoformat(frontend_timestamp.rstrip("Z")).replace(tzinfo=pytz.UTC)  # Convert ISO to datetime (remove 'Z')
+    ist_time = utc_time.astimezone(pytz.timezone("Asia/Kolkata"))  # Convert to IST timezone
+    return ist_time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for ?limit= on the paginated listing endpoints
+MAX_PAGE_SIZE = 500
+# Incident numbers accepted by one /incident-log/check/batch request
+MAX_BATCH_INCIDENTS = 5000
+# IncidentLog_TBL.inlStatus_FRK of a closed incident
+INCIDENT_STATUS_CLOSED = 2
+
+# ?stream= modes of the listing endpoints and their content types
+STREAM_MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _page_args():
+    """
+    Parse ?limit=&after=&prefix= of a listing endpoint.
+
+    Pagination is opt-in: without limit/after the whole (optionally
+    prefix-filtered) catalog is returned, as before. With either of them
+    the page holds at most limit (default and cap MAX_PAGE_SIZE) workflows
+    after the workflow_id cursor ``after``.
+
+    Raises:
+        ValueError: If limit or after is not a valid integer.
+    """
+    limit = request.args.get("limit")
+    after = request.args.get("after")
+    if limit is not None or after is not None:
+        limit = min(int(limit), MAX_PAGE_SIZE) if limit is not None else MAX_PAGE_SIZE
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+    if after is not None:
+        after = int(after)
+    return limit, after, request.args.get("prefix") or None
+
+
+def _stream_mode():
+    """
+    The ?stream= mode of a listing endpoint, or None for a regular response.
+
+    Raises:
+        ValueError: If the mode is unknown or combined with ?limit=.
+    """
+    mode = request.args.get("stream")
+    if mode is None:
+        return None
+    if mode not in STREAM_MIMETYPES:
+        raise ValueError(f"stream must be one of {', '.join(STREAM_MIMETYPES)}")
+    if request.args.get("limit") is not None:
+        raise ValueError("stream exports everything after the cursor and cannot be combined with limit")
+    return mode
+
+
+def _streamed_response(chunks, mode):
+    """
+    Generator response for a stream of JSON chunks.
+
+    The request context stays available until the generator is exhausted;
+    the scoped sessions it uses are removed again by the teardown that runs
+    once the stream ends. Once the first byte is sent the status can no
+    longer change, so a failure midway is logged and ends the stream early.
+    """
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            logger.error(f"Error while streaming {request.path}: {str(e)}")
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[mode])
+
+
+def _json_array_chunks(items, mode):
+    """Encode an iterable as a JSON array (mode "json") or as NDJSON lines, one item at a time."""
+    dumps = current_app.json.dumps
+    if mode == "ndjson":
+        for item in items:
+            yield dumps(item) + "\n"
+        return
+    yield "["
+    for index, item in enumerate(items):
+        yield ("," if index else "") + dumps(item)
+    yield "]"
+
+
+def _json_object_chunks(pairs, mode):
+    """
+    Encode (workflow_id, value) pairs as one JSON object keyed by workflow_id
+    (mode "json"), or as NDJSON lines of ``{"workflow_id": ..., **value}``.
+    """
+    dumps = current_app.json.dumps
+    if mode == "ndjson":
+        for key, value in pairs:
+            yield dumps({"workflow_id": key, **value}) + "\n"
+        return
+    yield "{"
+    for index, (key, value) in enumerate(pairs):
+        yield ("," if index else "") + dumps(str(key)) + ":" + dumps(value)
+    yield "}"
+
+
+def _paged_response(items, last_id, limit):
+    """JSON response carrying the next keyset cursor in X-Next-Cursor when more pages may follow."""
+    response = jsonify(items)
+    if limit is not None and len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(last_id)
+    return response
 
      
-def setup_workflow_api(app, wf_builder_service, question_management_service, vc_service):
-
+def setup_workflow_api(app, wf_builder_service, question_management_service, vc_service, answer_service,
+                       lookup_executor=None):
+    """
+    Register the /api blueprint.
+
+    The services are shared by every request; they hold scoped_session
+    registries, so each request thread transparently gets its own session.
+    With a ``lookup_executor`` (services/lookup_executor.py), independent
+    lookups of one request run concurrently on its pool threads.
+    """
         
     workflow_api = Blueprint('workflow_api', __name__)
-    answer_service = AnswerService(db_session=wf_builder_service.db)
-    # Create the session for VC_DB_Service (using VC_DB_Local from database.py)
-    with VC_DB_Local() as vc_db_session:
-        # Create an instance of VC_DB_Service using the vc_db_session
-        vc_service = VC_DB_Service(db_session=vc_db_session)
 
     @workflow_api.route('/workflows/get_id', methods=['POST'])
     def get_workflow_id_and_persons():
         """Fetch workflow_id and associated person details using workflow_name (incident_number optional)."""
 
-        print("API Hit: /api/workflows/get_id")
         data = request.get_json()
 
         if not data:
-            print("No data received or invalid JSON")
+            logger.debug("get_id: no data received or invalid JSON")
             return jsonify({"error": "Invalid or missing JSON"}), 400
 
         workflow_name = data.get("workflow_name")
         incident_number = data.get("incident_number")  # optional
 
         if not workflow_name:
-            print("workflow_name is missing from request body")
+            logger.debug("get_id: workflow_name is missing from request body")
             return jsonify({"error": "workflow_name is required"}), 400
 
-        print(f"Received workflow_name: {workflow_name}")
-        if incident_number:
-            print(f"Received incident_number: {incident_number}")
+        # The category usually comes from the in-memory directory; only the VC
+        # lookups of 2. and 3. that need a query go to the executor (each on its
+        # own pooled connection) while 1. runs here
+        incident_category_prk = vc_service.get_cached_incident_category_prk(workflow_name)
+        category_lookup = building_lookup = None
+        if lookup_executor is not None:
+            if incident_category_prk is None:
+                category_lookup = lookup_executor.submit(
+                    vc_service.get_incident_category_prk_by_wf_name, workflow_name
+                )
+            if incident_number:
+                building_lookup = lookup_executor.submit(
+                    vc_service.get_building_frk_from_incident_number, incident_number
+                )
 
         # 1. Get workflow_id
         workflow_id = wf_builder_service.get_workflow_id_by_name(workflow_name)
         if workflow_id is None:
-            print(f"No matching workflow found for: {workflow_name}")
+            logger.info(f"No matching workflow found for: {workflow_name}", extra={"sampled": True})
             return jsonify({"error": "Workflow not found"}), 404
 
-        print(f"Found workflow_id: {workflow_id}")
-
         # 2. Get incident_category_prk
-        incident_category_prk = vc_service.get_incident_category_prk_by_wf_name(workflow_name)
+        if category_lookup is not None:
+            incident_category_prk = category_lookup.result()
+        elif incident_category_prk is None:
+            incident_category_prk = vc_service.get_incident_category_prk_by_wf_name(workflow_name)
         if incident_category_prk is None:
-            print(f"Incident category not found for workflow_name: {workflow_name}")
+            logger.warning(f"Incident category not found for workflow_name: {workflow_name}", extra={"sampled": True})
             return jsonify({
                 "workflow_id": workflow_id,
                 "persons": [],
                 "warning": "Incident category not found"
             }), 200
 
-        print(f"Found incident_category_prk: {incident_category_prk}")
-
         # 3. Get building_frk only if incident_number is given
         building_frk = None
         if incident_number:
-            building_frk = vc_service.get_building_frk_from_incident_number(incident_number)
-            if building_frk is None:
-                print(f"Building not found for incident_number: {incident_number}")
+            if building_lookup is not None:
+                building_frk = building_lookup.result()
             else:
-                print(f"Found building_frk: {building_frk}")
+                building_frk = vc_service.get_building_frk_from_incident_number(incident_number)
+            if building_frk is None:
+                logger.info(f"Building not found for incident_number: {incident_number}", extra={"sampled": True})
 
         # 4. Get persons
         persons = vc_service.get_persons_by_incident_category(incident_category_prk, building_frk)
-        print(f"Found {len(persons)} persons")
+        logger.debug(f"get_id resolved {workflow_name!r}", extra={
+            "workflow_id": workflow_id, "incident_number": incident_number,
+            "incident_category_prk": incident_category_prk, "building_frk": building_frk, "persons": len(persons),
+        })
 
         return jsonify({
             "workflow_id": workflow_id,
@@ -88,7 +223,14 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
                     "status": "name_not_unique"
             }), 400
 
-        workflow = wf_builder_service.create_workflow(workflow_data)
+        try:
+            workflow = wf_builder_service.create_workflow(workflow_data)
+        except IntegrityError:
+            # Lost a race with a concurrent create of the same name (unique workflow_name_key)
+            return jsonify({
+                    "error": "Workflow name must be unique",
+                    "status": "name_not_unique"
+            }), 400
         return jsonify({"workflow_id": workflow.workflow_id})
 
     @workflow_api.route('/workflows/<int:workflow_id>', methods=['GET'])
@@ -120,11 +262,28 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
             
     @workflow_api.route('/workflows/<int:workflow_id>', methods=['PATCH'])
     def edit_workflow(workflow_id):
-        """Update an existing workflow"""
+        """Update an existing workflow, writing only what differs from the stored one"""
         try:
             workflow_data = request.get_json()
-            workflow = wf_builder_service.update_workflow(workflow_id, workflow_data)
-            return jsonify({"workflow_id": workflow.workflow_id})
+            renamed = "workflow_name" in workflow_data
+            if renamed and not wf_builder_service.is_workflow_name_unique(
+                    workflow_data["workflow_name"], exclude_workflow_id=workflow_id):
+                return jsonify({
+                        "error": "Workflow name must be unique",
+                        "status": "name_not_unique"
+                }), 400
+            changes = wf_builder_service.update_workflow(workflow_id, workflow_data)
+            return jsonify({"workflow_id": workflow_id, "changes": changes})
+        except IntegrityError as e:
+            if not renamed:
+                return jsonify({"error": str(e)}), 500
+            # Lost a race with a concurrent create or rename to the same name (unique workflow_name_key)
+            return jsonify({
+                    "error": "Workflow name must be unique",
+                    "status": "name_not_unique"
+            }), 400
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -139,10 +298,22 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
 
     @workflow_api.route('/workflows/questions', methods=['GET'])
     def get_all_workflow_questions():
-        """Get all workflows with their questions"""
+        """Get workflows with their questions (keyset-paginated with ?limit=&after=, filtered with ?prefix=, streamed with ?stream=json|ndjson)"""
+        try:
+            limit, after, prefix = _page_args()
+            stream = _stream_mode()
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameters: {str(e)}"}), 400
+        if stream:
+            pairs = question_management_service.iter_all_workflow_questions(after=after, name_prefix=prefix)
+            return _streamed_response(_json_object_chunks(pairs, stream), stream)
         try:
-            workflows = question_management_service.get_all_workflow_questions()
-            return jsonify(workflows)
+            workflows = question_management_service.get_all_workflow_questions(
+                limit=limit, after=after, name_prefix=prefix
+            )
+            # Keyed by workflow_id in keyset order, so the cursor is the last key
+            last_id = next(reversed(workflows), None)
+            return _paged_response(workflows, last_id, limit)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -157,10 +328,21 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
         
     @workflow_api.route('/workflows/details', methods=['GET'])
     def get_all_workflow_details():
-        """Fetch detailed information of all workflows."""
+        """Fetch detailed information of workflows (keyset-paginated with ?limit=&after=, filtered with ?prefix=, streamed with ?stream=json|ndjson)."""
+        try:
+            limit, after, prefix = _page_args()
+            stream = _stream_mode()
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameters: {str(e)}"}), 400
+        if stream:
+            items = wf_builder_service.iter_all_workflow_details(after=after, name_prefix=prefix)
+            return _streamed_response(_json_array_chunks(items, stream), stream)
         try:
-            all_workflows = wf_builder_service.get_all_workflow_details()
-            return jsonify(all_workflows), 200
+            workflows = wf_builder_service.get_all_workflow_details(
+                limit=limit, after=after, name_prefix=prefix
+            )
+            last_id = workflows[-1]["workflow_id"] if workflows else None
+            return _paged_response(workflows, last_id, limit), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -185,93 +367,120 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
                     "error": "question_id, answer_text, incident_number, and workflow_id are all required."
                 }), 400
                 
-            print(f"Received timestamp: {frontend_timestamp}")
-                
-            # Convert frontend UTC timestamp to IST
-            utc_time = datetime.fromisoformat(frontend_timestamp.rstrip("Z")).replace(tzinfo=pytz.UTC)  # Convert ISO to datetime (remove 'Z')
-            ist = pytz.timezone("Asia/Kolkata")
-            ist_time = utc_time.astimezone(ist)  # Convert to IST timezone
-            # Log both UTC and IST times
-            print("Original UTC time:", utc_time)
-            print("Converted IST time:", ist_time)
-            formatted_ist_time = ist_time.strftime("%Y-%m-%d %H:%M:%S")
-            
-            print(f"Converted timestamp to IST: {formatted_ist_time}")
+            formatted_ist_time = _to_ist_string(frontend_timestamp)
+            logger.debug(f"Converted timestamp {frontend_timestamp} to IST: {formatted_ist_time}")
 
-            # Fetch workflow_name using workflow_id
-            workflow = wf_builder_service.get_workflow_structure(workflow_id)
-            if not workflow:
+            # Fetch the workflow snapshot (served from the compiled workflow cache)
+            try:
+                workflow = wf_builder_service.get_compiled_workflow(int(workflow_id))
+            except ValueError:
                 return jsonify({"error": f"Workflow with ID {workflow_id} not found."}), 404
-            workflow_name = workflow.get("workflow_name")
-
-            # Fetch question_text if not provided in the request
-            question_text = data.get("question_text")
-            if not question_text:
-                question_text = answer_service.fetch_question_text(question_id)
-
-            # Fetch existing responses for the given workflow and incident to determine question number
-            existing_responses = answer_service.get_responses_with_questions(
-                workflow_id=workflow_id,
-                incident_number=incident_number
-            )
-            question_number = len(existing_responses) + 1
-
-            # Call the service to save the answer and response
-            result = answer_service.save_answer(
-                question_id=question_id,
-                answer_text=answer_text,
-                incident_number=incident_number
-            )
-
-            # Get current timestamp
-            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
-            # Generate the formatted text in the specified format
-            #formatted_text = f"""{question_number}. {question_text}{chr(13)}{chr(10)}{answer_text}{chr(13)}{chr(10)}Timestamp: {timestamp}{chr(13)}{chr(10)}"""
-            formatted_text = f"""{question_number}. {question_text}{chr(13)}{chr(10)}{answer_text}{chr(13)}{chr(10)}Timestamp: {formatted_ist_time}{chr(13)}{chr(10)}"""
-
-            # Update the temp incident text
-            answer_service.update_temp_incident_text(
-                incident_number=incident_number,
-                new_text=formatted_text
-            )
-
-            # Update the incident log details by appending to the inlIncidentDetails_MEM field
-            answer_service.update_incidentlog_details(
-                incident_number=incident_number,
-                new_text=formatted_text,
-                workflow_name=workflow_name,
-                building_frk=building_frk
-            )
-            # Check if the current question is the last one
-            is_last_question = question_management_service.is_last_question(question_id)
-            if is_last_question:
-                # If it's the last question, close the connection and return a success message
-                answer_service.close_session()
-                wf_builder_service.close_session()
-                question_management_service.close_session()
-                print("Last question reached")
+            # Save answer/response/transcript in one transaction, then append to the incident log
+            try:
+                result = answer_service.submit_answer(
+                    workflow=workflow,
+                    question_id=int(question_id),
+                    answer_text=answer_text,
+                    incident_number=incident_number,
+                    answered_at=formatted_ist_time,
+                    question_text=data.get("question_text"),
+                    building_frk=building_frk
+                )
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
+
+            server_timing = {"Server-Timing": format_server_timing(result["timings"])}
+            if result["is_last_question"]:
+                logger.info("Last question reached", extra={
+                    "incident_number": incident_number, "workflow_id": workflow_id, "sampled": True,
+                })
                 return jsonify({
                     "message": "Answer saved successfully. This was the last question.",
                     "question_id": question_id,
                     "answer_text": answer_text,
                     "timestamp_in_ist": formatted_ist_time
-                }), 200
+                }), 200, server_timing
 
             return jsonify({
                 "message": "Answer and Response saved successfully.",
                 "answer_id": result["answer_id"],
                 "response_id": result["response_id"]
-            }), 201
+            }), 201, server_timing
 
         except Exception as e:
-            answer_service.close_session()
-            wf_builder_service.close_session()
-            question_management_service.close_session()
             return jsonify({"error": str(e)}), 500
 
 
 
+    @workflow_api.route('/questions/answers/batch', methods=['POST'])
+    def submit_answers_batch():
+        """
+        Submit an ordered list of answers for one incident and workflow in one call.
+
+        Body: incident_number, workflow_id, optional building_frk, and
+        ``answers``: a list of {question_id, answer_text, timestamp, question_text?}.
+        """
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"error": "Invalid or missing JSON"}), 400
+
+            incident_number = data.get("incident_number")
+            workflow_id = data.get("workflow_id")
+            answers = data.get("answers")
+
+            if not all([incident_number, workflow_id]) or not isinstance(answers, list) or not answers:
+                return jsonify({
+                    "error": "incident_number, workflow_id and a non-empty answers list are all required."
+                }), 400
+
+            entries = []
+            for position, answer in enumerate(answers, start=1):
+                if not isinstance(answer, dict) or not all(
+                        [answer.get("question_id"), answer.get("answer_text"), answer.get("timestamp")]):
+                    return jsonify({
+                        "error": f"Answer {position}: question_id, answer_text and timestamp are all required."
+                    }), 400
+                try:
+                    question_id = int(answer["question_id"])
+                except (TypeError, ValueError):
+                    return jsonify({"error": f"Answer {position}: question_id must be an integer."}), 400
+                try:
+                    answered_at = _to_ist_string(answer["timestamp"])
+                except (AttributeError, TypeError, ValueError):
+                    return jsonify({"error": f"Answer {position}: timestamp must be an ISO 8601 UTC time."}), 400
+                entries.append({
+                    "question_id": question_id,
+                    "answer_text": answer["answer_text"],
+                    "answered_at": answered_at,
+                    "question_text": answer.get("question_text")
+                })
+
+            try:
+                workflow = wf_builder_service.get_compiled_workflow(int(workflow_id))
+            except ValueError:
+                return jsonify({"error": f"Workflow with ID {workflow_id} not found."}), 404
+
+            try:
+                result = answer_service.submit_answers(
+                    workflow=workflow,
+                    incident_number=incident_number,
+                    answers=entries,
+                    building_frk=data.get("building_frk")
+                )
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
+
+            return jsonify({
+                "message": f"{len(result['answers'])} answers saved successfully.",
+                "answers": result["answers"],
+                "is_last_question": result["is_last_question"]
+            }), 201, {"Server-Timing": format_server_timing(result["timings"])}
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @workflow_api.route('/workflows/<int:workflow_id>/questions-and-options', methods=['GET'])
     def get_questions_and_options(workflow_id):
         """
@@ -297,6 +506,20 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
         except Exception as e:
             return jsonify({"error": str(e)}), 500
         
+    @workflow_api.route('/incidents/<incident_number>/transcript', methods=['GET'])
+    def get_incident_transcript(incident_number):
+        """
+        Return the assembled SOP transcript of an incident: temp_incident.text_mme
+        plus the segments not yet folded into it, so also complete mid-run.
+        """
+        try:
+            transcript = answer_service.get_incident_transcript(incident_number)
+            if transcript is None:
+                return jsonify({"error": "No transcript found for this incident"}), 404
+            return jsonify({"incident_number": incident_number, "text": transcript}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        
     @workflow_api.route('/incident-log/check', methods=['GET'])
     def check_incidentlog():
         """
@@ -314,19 +537,20 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
             except ValueError:
                 return jsonify({"error": "incident number must be an integer"}), 400
             
-            # Fetch incident status
-            incident_status = vc_service.get_incident_status(incidentlog_prk)
-            if not incident_status:
+            # Existence and status in one VC statement
+            incident = vc_service.validate_incidentlog(incidentlog_prk)
+            if not incident["exists"]:
                 return jsonify({"exists": False}), 200
 
             # Check if incident is closed
-            if incident_status["inlStatus_FRK"] == 2:
+            if incident["inlStatus_FRK"] == INCIDENT_STATUS_CLOSED:
                 return jsonify({"error": "Incident is closed"}), 400
             
             if workflow_id:
             # Validate that incident_prk is linked to the provided workflow_id
                 workflow_id = int(workflow_id)
-                linked_workflow = vc_service.get_workflow_for_incidentlog(incidentlog_prk)
+                # Point lookup on the binding written with the incident's first answer
+                linked_workflow = answer_service.get_bound_workflow(str(incidentlog_prk))
                 if linked_workflow:
                     if linked_workflow != workflow_id: 
                         return jsonify({
@@ -334,11 +558,51 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
                             "linked_workflow": linked_workflow,
                         }), 400
 
-            # Check existence using vc_db_service
-            exists = vc_service.check_incidentlog_exists(incidentlog_prk)
-            return jsonify({"exists": exists}), 200
+            return jsonify({"exists": True}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
+
+    @workflow_api.route('/incident-log/check/batch', methods=['POST'])
+    def check_incidentlogs():
+        """
+        Validate many incidents at once (dashboard): body {"incidentlog_prks": [...], "workflow_id": optional}.
+
+        Returns one entry per distinct incident number, in request order, with
+        exists, closed, inlStatus_FRK and linked_workflow; with a workflow_id,
+        "conflict" flags incidents already linked to another workflow.
+        """
+        data = request.get_json(silent=True) or {}
+        incidentlog_prks = data.get("incidentlog_prks")
+        if not isinstance(incidentlog_prks, list) or not incidentlog_prks:
+            return jsonify({"error": "incidentlog_prks must be a non-empty list"}), 400
+        if len(incidentlog_prks) > MAX_BATCH_INCIDENTS:
+            return jsonify({"error": f"At most {MAX_BATCH_INCIDENTS} incident numbers per request"}), 400
+        try:
+            incidentlog_prks = [int(prk) for prk in incidentlog_prks]
+            workflow_id = int(data["workflow_id"]) if data.get("workflow_id") is not None else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "incident numbers and workflow_id must be integers"}), 400
+
+        try:
+            incidents = vc_service.validate_incidentlogs(incidentlog_prks)
+            bound = answer_service.get_bound_workflows([str(prk) for prk in incidents])
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        results = []
+        for prk, incident in incidents.items():
+            linked_workflow = bound[str(prk)]
+            entry = {
+                "incidentlog_prk": prk,
+                "exists": incident["exists"],
+                "closed": incident["inlStatus_FRK"] == INCIDENT_STATUS_CLOSED,
+                "inlStatus_FRK": incident["inlStatus_FRK"],
+                "linked_workflow": linked_workflow,
+            }
+            if workflow_id is not None:
+                entry["conflict"] = bool(linked_workflow) and linked_workflow != workflow_id
+            results.append(entry)
+        return jsonify({"results": results}), 200
         
     @workflow_api.route('/incident/category', methods=['GET'])
     def get_incident_category():
@@ -366,4 +630,34 @@ def setup_workflow_api(app, wf_builder_service, question_management_service, vc_
 
 
 
+    @workflow_api.route('/cache/stats', methods=['GET'])
+    def get_cache_stats():
+        """Size and hit-rate counters of the in-process caches, and the IncidentLog_TBL write-behind queue."""
+        stats = {
+            "workflows": wf_builder_service.workflow_cache.stats(),
+            "workflow_names": wf_builder_service.name_cache.stats(),
+        }
+        if vc_service.persons_cache is not None:
+            stats["persons"] = vc_service.persons_cache.stats()
+        if vc_service.category_directory is not None:
+            stats["incident_categories"] = vc_service.category_directory.stats()
+        stats["incident_bindings"] = answer_service.binding_cache.stats()
+        if answer_service.incidentlog_writer is not None:
+            stats["incidentlog_writer"] = answer_service.incidentlog_writer.stats()
+        return jsonify(stats), 200
+
+    @workflow_api.route('/cache/persons', methods=['DELETE'])
+    def invalidate_persons_cache():
+        """
+        Drop cached related-person lists, optionally only for one
+        incident_category_prk and/or building_frk (query parameters).
+        """
+        try:
+            incident_category_prk = request.args.get("incident_category_prk", type=int)
+            building_frk = request.args.get("building_frk", type=int)
+            dropped = vc_service.invalidate_persons_cache(incident_category_prk, building_frk)
+            return jsonify({"invalidated": "all" if dropped < 0 else dropped}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     app.register_blueprint(workflow_api, url_prefix='/api')
\ No newline at end of file
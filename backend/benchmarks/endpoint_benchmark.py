@@ -0,0 +1,382 @@
+"""
+Offline benchmark of every /api route, without SQL Server.
+
+Both databases are stood in for by one local SQLite file: the sop-manage
+schema comes from ``Base.metadata`` (through init_schema), the VC tables
+read by VC_DB_Service (IncidentLog, IncidentCategory, Building, Device,
+NVR, ProEvent, BuildingKeyLink, Person) are created with the columns those
+queries use. The raw T-SQL of VC_DB_Service is rewritten to SQLite on the
+fly (three-part names, TOP, ISNULL/NVARCHAR(MAX) and '+' concatenation).
+
+After seeding, every route is driven through the Flask test client and the
+p50/p95 latency and the number of SQL statements sent to each database are
+reported per endpoint:
+
+    python backend/benchmarks/endpoint_benchmark.py --iterations 50
+    python backend/benchmarks/endpoint_benchmark.py --json results.json
+
+Absolute numbers are SQLite's; compare runs of the same machine to spot
+regressions in latency or, more reliably, in statement counts. Inserts
+whose generated ids are read back in order (INSERT .. RETURNING for
+questions, answers and responses) are one statement per row on SQLite,
+which has no insert sentinel; SQL Server sends one statement per block.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# main.py and the api use imports relative to backend/, the models relative to the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.config.database import DB_SCHEMA
+from backend.config.migrations import init_schema
+from backend.models.SOP_tables import (
+    Workflow, Question, Option, Response, Answer, TempIncident, IncidentProgress, IncidentWorkflow, workflow_name_key
+)
+
+VC_TABLES = [
+    "CREATE TABLE IncidentLog_TBL (IncidentLog_PRK INTEGER PRIMARY KEY, inlStatus_FRK INT, inlCategory_FRK INT, "
+    "inlBuilding_FRK INT, inlActionTaken_MEM TEXT, inlIncidentDetails_MEM TEXT)",
+    "CREATE TABLE IncidentCategory_TBL (IncidentCategory_PRK INTEGER PRIMARY KEY, incName_TXT TEXT)",
+    "CREATE TABLE Building_TBL (Building_PRK INTEGER PRIMARY KEY)",
+    "CREATE TABLE Device_TBL (Device_PRK INTEGER PRIMARY KEY, dvcBuilding_FRK INT, dvcName_txt TEXT)",
+    "CREATE TABLE NVR_TBL (NVR_PRK INTEGER PRIMARY KEY, nvrAlias_TXT TEXT)",
+    "CREATE TABLE ProEvent_TBL (ProEvent_PRK INTEGER PRIMARY KEY, pevBuilding_frk INT, pevIncidentCategory_frk INT)",
+    "CREATE TABLE BuildingKeyLink_TBL (BuildingKeyLink_PRK INTEGER PRIMARY KEY, bklBuilding_FRK INT, bklKeyHolder_FRK INT)",
+    "CREATE TABLE Person_TBL (Person_PRK INTEGER PRIMARY KEY, prsFirstName_txt TEXT, prsLastName_txt TEXT, "
+    "prsTelnum_txt TEXT, prsMobileNum_txt TEXT, prsEmailAddress_txt TEXT)",
+    # The VC database keys these lookups; keep the stand-in comparable
+    "CREATE INDEX ix_device_building ON Device_TBL (dvcBuilding_FRK)",
+    "CREATE INDEX ix_proevent_building ON ProEvent_TBL (pevBuilding_frk)",
+    "CREATE INDEX ix_keylink_building ON BuildingKeyLink_TBL (bklBuilding_FRK)",
+]
+
+# The models live in the dbo schema; SQLite only has "main"
+SCHEMA_MAP = {DB_SCHEMA: "main"}
+ROUTE_TIMESTAMP = "2025-01-01T10:00:00.000Z"
+
+
+def _tsql_to_sqlite(conn, cursor, statement, parameters, context, executemany):
+    """Rewrite the raw T-SQL of VC_DB_Service to SQLite."""
+    statement = re.sub(r"\[(TEST|sop-manage)\]\.\[dbo\]\.", "", statement)
+    statement = statement.replace("[dbo].", "")
+    statement = re.sub(r"\bTOP \d+\b", "", statement)
+    if "NVARCHAR(MAX)" in statement:
+        # Only the IncidentLog append concatenates strings with '+'
+        statement = statement.replace("ISNULL(", "IFNULL(").replace("NVARCHAR(MAX)", "TEXT")
+        statement = re.sub(r"\s\+(\s)", r" ||\1", statement)
+    return statement, parameters
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}").execution_options(schema_translate_map=SCHEMA_MAP)
+    event.listen(engine, "before_cursor_execute", _tsql_to_sqlite, retval=True)
+    return engine
+
+
+def seed_vc(engine, args, rng):
+    """IncidentCategory per workflow, buildings with devices/key holders, and the incident log."""
+    with engine.begin() as conn:
+        for ddl in VC_TABLES:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(
+            "INSERT INTO IncidentCategory_TBL VALUES (?, ?)",
+            [(c, f"Category {c}") for c in range(1, args.workflows + 1)]
+        )
+        conn.exec_driver_sql("INSERT INTO Building_TBL VALUES (?)", [(b,) for b in range(1, args.buildings + 1)])
+        conn.exec_driver_sql(
+            "INSERT INTO Device_TBL (dvcBuilding_FRK, dvcName_txt) VALUES (?, ?)",
+            [(b, f"dev-{b}-{d}") for b in range(1, args.buildings + 1) for d in range(2)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO NVR_TBL (nvrAlias_TXT) VALUES (?)",
+            [(f"dev-{b}-0",) for b in range(1, args.buildings + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO ProEvent_TBL (pevBuilding_frk, pevIncidentCategory_frk) VALUES (?, ?)",
+            [(b, rng.randint(1, args.workflows)) for b in range(1, args.buildings + 1) for _ in range(5)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO Person_TBL VALUES (?, ?, ?, ?, ?, ?)",
+            [(p, f"First{p}", f"Last{p}", f"0{p:09d}", f"9{p:09d}", f"person{p}@example.com")
+             for p in range(1, args.persons + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO BuildingKeyLink_TBL (bklBuilding_FRK, bklKeyHolder_FRK) VALUES (?, ?)",
+            [(b, rng.randint(1, args.persons)) for b in range(1, args.buildings + 1) for _ in range(4)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO IncidentLog_TBL VALUES (?, ?, ?, ?, NULL, NULL)",
+            [(i, rng.choice((1, 1, 1, 2)), rng.randint(1, args.workflows), rng.randint(1, args.buildings))
+             for i in range(1, args.incidents + 1)]
+        )
+
+
+def seed_sop(engine, args, rng):
+    """Workflows named after the categories, their questions/options and answered incident runs."""
+    q = args.questions_per_workflow
+    with engine.begin() as conn:
+        conn.execute(Workflow.__table__.insert(), [
+            {"workflow_id": w, "workflow_name": f"Category_{w}", "workflow_name_key": workflow_name_key(f"Category_{w}"),
+             "incident_type": "bench"}
+            for w in range(1, args.workflows + 1)
+        ])
+        question_rows, option_rows = [], []
+        for w in range(1, args.workflows + 1):
+            for n in range(q):
+                question_id = (w - 1) * q + n + 1
+                next_id = question_id + 1 if n + 1 < q else None
+                choice = n % 3 == 0
+                question_rows.append({
+                    "question_id": question_id, "workflow_id": w, "question_text": f"Step {n + 1} of category {w}",
+                    "question_type": "MULTIPLE_CHOICE" if choice else "SUBJECTIVE",
+                    "next_question_id": None if choice else next_id, "is_required": True, "is_completed": False,
+                })
+                if choice:
+                    option_rows.extend(
+                        {"question_id": question_id, "option_text": f"Choice {o}", "next_question_id": next_id,
+                         "is_completed": False}
+                        for o in range(3)
+                    )
+        conn.execute(Question.__table__.insert(), question_rows)
+        conn.execute(Option.__table__.insert(), option_rows)
+
+        # The first `answered` incidents already ran part of their SOP
+        answered = {}
+        answer_rows, response_rows, incident_rows, progress_rows = [], [], [], []
+        for incident in range(1, args.answered + 1):
+            w = rng.randint(1, args.workflows)
+            steps = rng.randint(1, q - 1)
+            answered[str(incident)] = w
+            incident_rows.append({"incident_number": str(incident), "text_mme": "*Start SOP*\n" + "\n".join(
+                f"{n + 1}. Step {n + 1} of category {w}\nanswer\nTimestamp: 2025-01-01 15:30:00\n" for n in range(steps)
+            )})
+            progress_rows.append({"incident_number": str(incident), "workflow_id": w, "step_count": steps})
+            for n in range(steps):
+                answer_id = len(answer_rows) + 1
+                answer_rows.append({"answer_id": answer_id, "question_id": (w - 1) * q + n + 1, "answer_text": "answer"})
+                response_rows.append({"id": answer_id, "incident_number": str(incident), "workflow_id": w,
+                                      "question_id": (w - 1) * q + n + 1, "answer_id": answer_id})
+        conn.execute(TempIncident.__table__.insert(), incident_rows)
+        conn.execute(Answer.__table__.insert(), answer_rows)
+        conn.execute(Response.__table__.insert(), response_rows)
+        conn.execute(IncidentProgress.__table__.insert(), progress_rows)
+        conn.execute(IncidentWorkflow.__table__.insert(),
+                     [{"incident_number": incident, "workflow_id": w} for incident, w in answered.items()])
+    return answered
+
+
+def scenarios(args, answered):
+    """
+    (label, rule, method, request factory) for every /api route. A factory
+    takes the iteration number and returns (url, json body or None).
+    """
+    q = args.questions_per_workflow
+    rng = random.Random(7)
+    answered_items = sorted(answered.items())
+    fresh = itertools.count(args.answered + 1)  # IncidentLog rows without any answers yet
+    created = []  # workflows made by POST /workflows, consumed by DELETE
+    run = {"incident": None, "workflow": None, "step": q}  # incident POST /questions/answer is walking
+
+    def workflow():
+        return rng.randint(1, args.workflows)
+
+    def new_workflow(i):
+        return "/api/workflows", {
+            "workflow_name": f"Bench_{os.getpid()}_{i}", "incident_type": "bench",
+            "questions": [
+                {"question_text": f"Q{n}", "question_type": "SUBJECTIVE", "next_question_id": n + 1 if n < q else None}
+                for n in range(1, q + 1)
+            ],
+        }
+
+    def answer(i):
+        # Walk fresh incidents through their SOP, one step per call
+        if run["step"] >= q:
+            run.update(incident=str(next(fresh)), workflow=workflow(), step=0)
+        w, n = run["workflow"], run["step"]
+        run["step"] += 1
+        return "/api/questions/answer", {
+            "question_id": (w - 1) * q + n + 1, "answer_text": f"answer {i}", "incident_number": run["incident"],
+            "workflow_id": w, "timestamp": ROUTE_TIMESTAMP, "building_frk": rng.randint(1, args.buildings),
+        }
+
+    def answers_batch(i):
+        incident, w = str(next(fresh)), workflow()
+        return "/api/questions/answers/batch", {
+            "incident_number": incident, "workflow_id": w,
+            "answers": [{"question_id": (w - 1) * q + n, "answer_text": f"batch {n}", "timestamp": ROUTE_TIMESTAMP}
+                        for n in range(1, 6)],
+        }
+
+    def patch(i):
+        w = workflow()
+        return f"/api/workflows/{w}", {"questions": [
+            {"question_id": (w - 1) * q + n + 1, "question_text": f"Step {n + 1} of category {w}" + (" (rev)" if n == 0 and i % 2 else "")}
+            for n in range(q)
+        ]}
+
+    def delete(i):
+        return f"/api/workflows/{created.pop()}", None
+
+    def answered_incident():
+        return answered_items[rng.randrange(len(answered_items))]
+
+    return created, [
+        ("POST get_id", "/api/workflows/get_id", "POST",
+         lambda i: ("/api/workflows/get_id", {"workflow_name": f"Category_{workflow()}",
+                                              "incident_number": str(rng.randint(1, args.incidents))})),
+        ("POST workflows", "/api/workflows", "POST", new_workflow),
+        ("GET workflow", "/api/workflows/<int:workflow_id>", "GET", lambda i: (f"/api/workflows/{workflow()}", None)),
+        ("PATCH workflow", "/api/workflows/<int:workflow_id>", "PATCH", patch),
+        ("DELETE workflow", "/api/workflows/<int:workflow_id>", "DELETE", delete),
+        ("GET workflow questions", "/api/workflows/<int:workflow_id>/questions", "GET",
+         lambda i: (f"/api/workflows/{workflow()}/questions", None)),
+        ("GET all questions", "/api/workflows/questions", "GET", lambda i: ("/api/workflows/questions", None)),
+        ("GET all questions page", "/api/workflows/questions", "GET",
+         lambda i: (f"/api/workflows/questions?limit=50&after={rng.randrange(args.workflows)}", None)),
+        ("GET all questions ndjson", "/api/workflows/questions", "GET",
+         lambda i: ("/api/workflows/questions?stream=ndjson", None)),
+        ("GET last question id", "/api/questions/last-id", "GET", lambda i: ("/api/questions/last-id", None)),
+        ("GET details", "/api/workflows/details", "GET", lambda i: ("/api/workflows/details", None)),
+        ("GET details page", "/api/workflows/details", "GET",
+         lambda i: (f"/api/workflows/details?limit=50&after={rng.randrange(args.workflows)}", None)),
+        ("POST answer", "/api/questions/answer", "POST", answer),
+        ("POST answers batch", "/api/questions/answers/batch", "POST", answers_batch),
+        ("GET questions-and-options", "/api/workflows/<int:workflow_id>/questions-and-options", "GET",
+         lambda i: (f"/api/workflows/{workflow()}/questions-and-options", None)),
+        ("GET responses", "/api/workflows/<int:workflow_id>/responses/<incident_number>", "GET",
+         lambda i: ("/api/workflows/{1}/responses/{0}".format(*answered_incident()), None)),
+        ("GET transcript", "/api/incidents/<incident_number>/transcript", "GET",
+         lambda i: (f"/api/incidents/{answered_incident()[0]}/transcript", None)),
+        ("GET incident-log check", "/api/incident-log/check", "GET",
+         lambda i: ("/api/incident-log/check?incidentlog_prk={0}&workflow_id={1}".format(*answered_incident()), None)),
+        ("POST incident-log check batch", "/api/incident-log/check/batch", "POST",
+         lambda i: ("/api/incident-log/check/batch",
+                    {"incidentlog_prks": [rng.randint(1, args.incidents) for _ in range(100)]})),
+        ("GET incident category", "/api/incident/category", "GET",
+         lambda i: (f"/api/incident/category?incident_number={rng.randint(1, args.incidents)}", None)),
+        ("GET cache stats", "/api/cache/stats", "GET", lambda i: ("/api/cache/stats", None)),
+        ("DELETE persons cache", "/api/cache/persons", "DELETE", lambda i: ("/api/cache/persons", None)),
+    ]
+
+
+def run(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="sop-endpoints-"), "bench.db")
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(42)
+
+    # One file holds both databases so the cross-database response query resolves
+    sop_engine, vc_engine = make_engine(path), make_engine(path)
+    seed_vc(vc_engine, args, rng)
+    init_schema(sop_engine)
+
+    from main import create_app
+    app = create_app(
+        session_factory=sessionmaker(bind=sop_engine, autoflush=False, expire_on_commit=False),
+        vc_session_factory=sessionmaker(bind=vc_engine, autoflush=False, expire_on_commit=False),
+    )
+    start = time.perf_counter()
+    answered = seed_sop(sop_engine, args, rng)
+    if app.extensions.get("category_directory") is not None:
+        app.extensions["category_directory"].load()
+    print(f"Seeded {args.workflows} workflows x {args.questions_per_workflow} questions, "
+          f"{args.incidents} incidents ({args.answered} answered) in {time.perf_counter() - start:.1f}s ({path})")
+
+    counts = {"sop": 0, "vc": 0}
+    event.listen(sop_engine, "before_cursor_execute", lambda *a: counts.__setitem__("sop", counts["sop"] + 1))
+    event.listen(vc_engine, "before_cursor_execute", lambda *a: counts.__setitem__("vc", counts["vc"] + 1))
+
+    client = app.test_client()
+    created, plan = scenarios(args, answered)
+    # DELETE consumes what POST /workflows created, so POST always runs first
+    results, errors = [], {}
+    for label, rule, method, make in plan:
+        durations, sop_counts, vc_counts, statuses = [], [], [], {}
+        for i in range(args.warmup + args.iterations):
+            if method == "DELETE" and rule.endswith("<int:workflow_id>") and not created:
+                break
+            url, body = make(i)
+            counts["sop"] = counts["vc"] = 0
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            if label == "POST workflows" and response.status_code == 200:
+                created.append(response.get_json()["workflow_id"])
+            if i < args.warmup:
+                continue
+            durations.append(elapsed)
+            sop_counts.append(counts["sop"])
+            vc_counts.append(counts["vc"])
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 500:
+                errors[label] = response.get_data(as_text=True)[:200]
+        if not durations:
+            continue
+        durations.sort()
+        results.append({
+            "endpoint": label, "rule": rule, "method": method, "n": len(durations),
+            "p50_ms": round(statistics.median(durations), 3),
+            "p95_ms": round(durations[max(0, int(len(durations) * 0.95) - 1)], 3),
+            "sop_statements": round(statistics.mean(sop_counts), 2),
+            "vc_statements": round(statistics.mean(vc_counts), 2),
+            "max_statements": max(s + v for s, v in zip(sop_counts, vc_counts)),
+            "statuses": statuses,
+        })
+
+    covered = {(rule, method) for _, rule, method, _ in plan}
+    missing = sorted(
+        (rule.rule, method)
+        for rule in app.url_map.iter_rules() if rule.rule.startswith("/api/")
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+        if (rule.rule, method) not in covered
+    )
+    return results, missing, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=300)
+    parser.add_argument("--questions-per-workflow", type=int, default=20)
+    parser.add_argument("--incidents", type=int, default=20000, help="IncidentLog_TBL rows")
+    parser.add_argument("--answered", type=int, default=5000, help="incidents with recorded responses")
+    parser.add_argument("--buildings", type=int, default=1000)
+    parser.add_argument("--persons", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per endpoint")
+    parser.add_argument("--db", help="SQLite file to build (default: a temporary file)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results, missing, errors = run(args)
+
+    print(f"\n{'endpoint':<28}{'n':>5}{'p50':>11}{'p95':>11}{'sop sql':>9}{'vc sql':>8}{'max':>6}  statuses")
+    for r in results:
+        print(f"{r['endpoint']:<28}{r['n']:>5}{r['p50_ms']:>9.2f}ms{r['p95_ms']:>9.2f}ms"
+              f"{r['sop_statements']:>9}{r['vc_statements']:>8}{r['max_statements']:>6}  {r['statuses']}")
+    for label, body in errors.items():
+        print(f"\n{label} failed: {body}")
+    if missing:
+        print("\nRoutes not covered: " + ", ".join(f"{method} {rule}" for rule, method in missing))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"generated_at": datetime.now(timezone.utc).isoformat(), "args": vars(args),
+                       "results": results, "missing_routes": missing}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Lookup cost of the hot response/question/option/answer queries before and
+after the secondary indexes (config/migrations.py: add_secondary_indexes).
+
+Builds the sop-manage schema in a local SQLite file without those indexes,
+seeds it (1M responses by default), times every lookup, creates the indexes
+through the migration step and times them again.
+
+    python backend/benchmarks/index_benchmark.py --responses 1000000 --lookups 200
+
+SQLite stands in for SQL Server here, so absolute numbers differ; the
+scan-versus-seek difference the indexes make does not.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, distinct, func, select
+
+# Append the backend path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.config.database import DB_SCHEMA
+from backend.config.migrations import SECONDARY_INDEXES, add_secondary_indexes
+from backend.models.SOP_tables import Base, Workflow, Question, Option, Response, Answer, TempIncident
+
+CHUNK = 50_000
+# The models live in the dbo schema; SQLite only has "main"
+SCHEMA_MAP = {DB_SCHEMA: "main"}
+
+
+def seed(engine, responses: int, workflows: int, questions_per_workflow: int, responses_per_incident: int):
+    """Insert workflows, questions, options, incidents, answers and responses with explicit ids."""
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(Workflow.__table__.insert(), [
+            {"workflow_id": w, "workflow_name": f"Workflow_{w}", "workflow_name_key": f"workflow_{w}",
+             "incident_type": "bench"}
+            for w in range(1, workflows + 1)
+        ])
+        question_rows, option_rows = [], []
+        for w in range(1, workflows + 1):
+            for n in range(questions_per_workflow):
+                question_id = (w - 1) * questions_per_workflow + n + 1
+                choice = n % 2 == 0
+                question_rows.append({
+                    "question_id": question_id, "workflow_id": w, "question_text": f"Question {n + 1}",
+                    "question_type": "MULTIPLE_CHOICE" if choice else "SUBJECTIVE",
+                })
+                if choice:
+                    option_rows.extend(
+                        {"question_id": question_id, "option_text": f"Option {o}"} for o in range(3)
+                    )
+        conn.execute(Question.__table__.insert(), question_rows)
+        conn.execute(Option.__table__.insert(), option_rows)
+
+    incidents = responses // responses_per_incident
+    answer_id = 0
+    for start in range(0, incidents, CHUNK // responses_per_incident):
+        incident_rows, answer_rows, response_rows = [], [], []
+        for i in range(start, min(incidents, start + CHUNK // responses_per_incident)):
+            incident_number = str(100_000 + i)
+            w = rng.randint(1, workflows)
+            incident_rows.append({"incident_number": incident_number, "text_mme": None})
+            for step in range(responses_per_incident):
+                answer_id += 1
+                question_id = (w - 1) * questions_per_workflow + step % questions_per_workflow + 1
+                answer_rows.append({"answer_id": answer_id, "question_id": question_id, "answer_text": "ok"})
+                response_rows.append({
+                    "id": answer_id, "incident_number": incident_number, "workflow_id": w,
+                    "question_id": question_id, "answer_id": answer_id,
+                })
+        with engine.begin() as conn:
+            conn.execute(TempIncident.__table__.insert(), incident_rows)
+            conn.execute(Answer.__table__.insert(), answer_rows)
+            conn.execute(Response.__table__.insert(), response_rows)
+    return incidents
+
+
+def lookups(workflows: int, incidents: int, questions: int):
+    """(name, statement factory) of the hot access patterns, keyed by random ids."""
+    return [
+        ("responses of incident run", lambda rng: select(Response.id, Response.question_id, Response.answer_id).where(
+            Response.workflow_id == rng.randint(1, workflows),
+            Response.incident_number == str(100_000 + rng.randrange(incidents))
+        ).order_by(Response.id)),
+        ("step seed count", lambda rng: select(func.count(Response.id)).where(
+            Response.workflow_id == rng.randint(1, workflows),
+            Response.incident_number == str(100_000 + rng.randrange(incidents))
+        )),
+        ("workflow of incident", lambda rng: select(distinct(Response.workflow_id)).where(
+            Response.incident_number == str(100_000 + rng.randrange(incidents))
+        )),
+        ("questions of workflow", lambda rng: select(Question.question_id, Question.question_text).where(
+            Question.workflow_id == rng.randint(1, workflows)
+        )),
+        ("options of question", lambda rng: select(Option.option_id, Option.option_text).where(
+            Option.question_id == rng.randint(1, questions)
+        )),
+        ("answers of question", lambda rng: select(Answer.answer_id).where(
+            Answer.question_id == rng.randint(1, questions)
+        )),
+    ]
+
+
+def measure(engine, queries, count: int):
+    """p50/p95 milliseconds and query plan of every lookup."""
+    results = {}
+    with engine.connect() as conn:
+        for name, make in queries:
+            rng = random.Random(name)
+            durations = []
+            for _ in range(count):
+                statement = make(rng)
+                start = time.perf_counter()
+                conn.execute(statement).fetchall()
+                durations.append((time.perf_counter() - start) * 1000)
+            compiled = make(random.Random(0)).compile(
+                dialect=conn.dialect, schema_translate_map=SCHEMA_MAP, render_schema_translate=True,
+                compile_kwargs={"literal_binds": True}
+            )
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+            durations.sort()
+            results[name] = {
+                "p50": statistics.median(durations),
+                "p95": durations[int(len(durations) * 0.95) - 1],
+                "plan": "; ".join(row[-1] for row in plan),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=int, default=1_000_000)
+    parser.add_argument("--workflows", type=int, default=500)
+    parser.add_argument("--questions-per-workflow", type=int, default=20)
+    parser.add_argument("--responses-per-incident", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=200, help="timed executions per query and phase")
+    parser.add_argument("--db", help="SQLite file to build (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="sop-bench-"), "bench.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}").execution_options(schema_translate_map=SCHEMA_MAP)
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Start from the pre-migration schema
+        for table, index_name in SECONDARY_INDEXES:
+            next(index for index in table.indexes if index.name == index_name).drop(conn)
+
+    start = time.perf_counter()
+    incidents = seed(engine, args.responses, args.workflows, args.questions_per_workflow, args.responses_per_incident)
+    print(f"Seeded {incidents * args.responses_per_incident:,} responses / {incidents:,} incidents "
+          f"in {time.perf_counter() - start:.1f}s ({path})")
+
+    queries = lookups(args.workflows, incidents, args.workflows * args.questions_per_workflow)
+    before = measure(engine, queries, args.lookups)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        add_secondary_indexes(conn)
+        conn.exec_driver_sql("ANALYZE")
+    print(f"Created indexes in {time.perf_counter() - start:.1f}s")
+    after = measure(engine, queries, args.lookups)
+
+    print(f"\n{'lookup':<28}{'p50 before':>12}{'p95 before':>12}{'p50 after':>12}{'p95 after':>12}{'speedup':>10}")
+    for name, _ in queries:
+        b, a = before[name], after[name]
+        print(f"{name:<28}{b['p50']:>10.3f}ms{b['p95']:>10.3f}ms{a['p50']:>10.3f}ms{a['p95']:>10.3f}ms"
+              f"{b['p50'] / a['p50']:>9.0f}x")
+    print("\nQuery plans (before -> after):")
+    for name, _ in queries:
+        print(f"  {name}: {before[name]['plan']}  ->  {after[name]['plan']}")
+
+
+if __name__ == "__main__":
+    main()
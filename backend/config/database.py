@@ -1,6 +1,7 @@
 import os
+import threading
 import urllib
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import logging
@@ -8,10 +9,12 @@ import logging
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
+# Handlers and levels are set up by config/logging_config.py
 logger = logging.getLogger(__name__)
 
+# Log every statement (development only); production relies on the slow-query log
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
 # Database configuration for sop-manage
 DB_CONFIG = {
     'driver': os.getenv('DB_DRIVER', 'ODBC Driver 17 for SQL Server'),
@@ -62,32 +65,78 @@ def create_VC_db_connection_string():
     )
     return f"mssql+pyodbc:///?odbc_connect={params}"
 
-# Create engine for sop-manage
-engine = create_engine(
-    create_connection_string(),
-    echo=True,  # Set to False in production
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=3600,
-)
+# Engines and session factories are built on first use: importing this module
+# opens no connections, and building an engine only sets up its (empty) pool.
+_lock = threading.RLock()
+_engines = {}
+_session_factories = {}
 
-# Create engine for TEST database
-vc_db_engine = create_engine(
-    create_VC_db_connection_string(),
-    echo=True,  # Set to False in production
+ENGINE_OPTIONS = dict(
     pool_size=5,
     max_overflow=10,
     pool_timeout=30,
     pool_recycle=3600,
 )
 
-# Event listener to create schema if it doesn't exist for sop-manage
-@event.listens_for(engine, 'connect')
-def create_schema(dbapi_connection, connection_record):
-    try:
-        cursor = dbapi_connection.cursor()
-        cursor.execute(f"""
+
+def _get_engine(name, connection_string):
+    if name not in _engines:
+        with _lock:
+            if name not in _engines:
+                _engines[name] = create_engine(connection_string(), echo=DB_ECHO, **ENGINE_OPTIONS)
+    return _engines[name]
+
+
+def get_engine():
+    """Engine for sop-manage, created on first call"""
+    return _get_engine("sop", create_connection_string)
+
+
+def get_vc_engine():
+    """Engine for the TEST (VC) database, created on first call"""
+    return _get_engine("vc", create_VC_db_connection_string)
+
+
+def _get_session_factory(name, get):
+    if name not in _session_factories:
+        with _lock:
+            if name not in _session_factories:
+                _session_factories[name] = sessionmaker(
+                    bind=get(),
+                    autocommit=False,
+                    autoflush=False,
+                    expire_on_commit=False
+                )
+    return _session_factories[name]
+
+
+def get_session_factory():
+    """Session factory for sop-manage"""
+    return _get_session_factory("sop", get_engine)
+
+
+def get_vc_session_factory():
+    """Session factory for the TEST (VC) database"""
+    return _get_session_factory("vc", get_vc_engine)
+
+
+def __getattr__(name):
+    # Module-level names of the former eagerly created objects, resolved lazily
+    lazy = {
+        "engine": get_engine,
+        "vc_db_engine": get_vc_engine,
+        "SessionLocal": get_session_factory,
+        "VC_DB_Local": get_vc_session_factory,
+    }
+    if name in lazy:
+        return lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def create_db_schema(engine):
+    """Create the sop-manage schema if it doesn't exist (part of the opt-in schema setup)"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"""
             IF NOT EXISTS (
                 SELECT schema_name 
                 FROM information_schema.schemata 
@@ -97,31 +146,11 @@ def create_schema(dbapi_connection, connection_record):
                 EXEC('CREATE SCHEMA {DB_SCHEMA}')
             END
         """)
-        cursor.close()
-        dbapi_connection.commit()
-    except Exception as e:
-        logger.error(f"Error creating schema: {e}")
-
-# Session factory for sop-manage
-SessionLocal = sessionmaker(
-    bind=engine,
-    autocommit=False,
-    autoflush=False,
-    expire_on_commit=False
-)
-
-# Session factory for TEST database
-VC_DB_Local = sessionmaker(
-    bind=vc_db_engine,
-    autocommit=False,
-    autoflush=False,
-    expire_on_commit=False
-)
 
 # Dependency function for sop-manage database session
 def get_db():
     """Database session dependency for sop-manage"""
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
@@ -130,7 +159,7 @@ def get_db():
 # Dependency function for TEST database session
 def get_vc_db():
     """Database session dependency for TEST database"""
-    db = VC_DB_Local()
+    db = get_vc_session_factory()()
     try:
         yield db
     finally:
@@ -140,7 +169,7 @@ def get_vc_db():
 def test_connection_sop_manage():
     """Test connection to sop-manage database"""
     try:
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             logger.info("Successfully connected to sop-manage database!")
             return True
     except Exception as e:
@@ -152,20 +181,18 @@ def test_connection_test_db():
     """Test connection to TEST database"""
     try:
         # Query the sop-manage database
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             result = connection.execute(text("SELECT TOP 1 * FROM [sop-manage].[dbo].[workflow]"))
             for row in result:
-                print(row)
+                logger.debug(f"{row}")
 
         # Query the TEST database
-        with vc_db_engine.connect() as connection:
+        with get_vc_engine().connect() as connection:
             result = connection.execute(text("SELECT TOP 1 * FROM [dbo].[IncidentLog_TBL]"))
             for row in result:
-                print(row)
+                logger.debug(f"{row}")
 
         logger.info("Successfully connected to TEST database!")
     except Exception as e:
         logger.error(f"Error connecting to TEST database: {e}")
         return False
-
-test_connection_test_db()
\ No newline at end of file
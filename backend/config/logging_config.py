@@ -0,0 +1,161 @@
+"""
+Process-wide logging setup: JSON lines on stderr, levels from the environment.
+
+    LOG_LEVEL=INFO                         root level
+    LOG_LEVELS=services=DEBUG,sqlalchemy.engine=WARNING
+                                           per-logger overrides
+    LOG_FORMAT=json|text                   text is meant for local development
+    LOG_SAMPLE_EVERY=100                   keep 1 in N of the messages logged
+                                           with extra={"sampled": True}
+    SLOW_QUERY_MS=500                      statements at or over this go to the
+                                           "sql.slow" logger (0 turns it off)
+"""
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger("sql.slow")
+
+# LogRecord attributes that are not user supplied extras
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sampled"}
+
+_configured = False
+_slow_query_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra={...}`` fields are carried over as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass every N-th record of each call site that is marked ``extra={"sampled": True}``.
+
+    The first record of a call site always passes; the kept ones carry
+    ``sample_every`` so counts can be scaled back up. Unmarked records are
+    never dropped.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[Tuple[str, int], itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            counter = self._counters.setdefault(key, itertools.count())
+            seen = next(counter)
+        if seen % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """``"a.b=DEBUG,c=WARNING"`` -> {"a.b": "DEBUG", "c": "WARNING"}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(force: bool = False):
+    """Install the stderr handler on the root logger once per process, as set by the environment."""
+    global _configured
+    if _configured and not force:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        handler.setFormatter(JsonFormatter())
+    handler.addFilter(SamplingFilter(int(os.getenv("LOG_SAMPLE_EVERY", "100"))))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    # SQL echo is replaced by the slow-query log; it can still be turned on here
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    slow_query_logger.setLevel(logging.WARNING)
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+    _configured = True
+
+
+def _truncate(value, limit: int = 2000) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def log_slow_queries(engine: Engine, db: str, threshold_ms: Optional[float] = None) -> Engine:
+    """
+    Log SQL text, parameters and duration of the engine's statements that take
+    at least ``threshold_ms`` (default SLOW_QUERY_MS); faster ones cost a timer only.
+    """
+    if threshold_ms is None:
+        threshold_ms = float(os.getenv("SLOW_QUERY_MS", "500"))
+    if threshold_ms <= 0 or engine in _slow_query_engines:
+        return engine
+    _slow_query_engines.add(engine)
+    threshold = threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        if seconds < threshold:
+            return
+        if executemany:
+            parameters = {"rows": len(parameters), "first": parameters[0] if parameters else None}
+        slow_query_logger.warning("slow query", extra={
+            "db": db,
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": " ".join(statement.split())[:4000],
+            "params": _truncate(parameters),
+        })
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_started"):
+            conn.info["slow_query_started"].pop()
+
+    return engine
@@ -0,0 +1,164 @@
+"""
+Idempotent schema migrations for databases created before a model change.
+
+``Base.metadata.create_all`` only creates missing tables; columns and
+indexes added to existing tables are brought in by the steps below. Every
+step inspects the live schema first, so running them again is a no-op.
+
+None of this runs on import or app start unless asked for: ``init_schema``
+is called by ``flask --app wsgi init-db`` or by create_app when
+DB_INIT_SCHEMA is set. Deployments run init-db as a one-off job before
+starting the new image (the "migrate" service in docker-compose.yml).
+"""
+import os
+import sys
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import DDL, bindparam, exists, func, insert, inspect, select, update
+from sqlalchemy.engine import Connection, Engine
+
+# Append the backend path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.config.database import create_db_schema
+from backend.models.SOP_tables import (
+    Base, Workflow, Question, Option, Response, Answer, IncidentWorkflow, TempIncidentSegment, workflow_name_key
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _has_column(connection: Connection, table, column_name: str) -> bool:
+    columns = inspect(connection).get_columns(table.name, schema=connection.schema_for_object(table))
+    return any(column["name"] == column_name for column in columns)
+
+
+def _has_index(connection: Connection, table, index_name: str) -> bool:
+    indexes = inspect(connection).get_indexes(table.name, schema=connection.schema_for_object(table))
+    return any(index["name"] == index_name for index in indexes)
+
+
+def _index(table, index_name: str):
+    return next(index for index in table.indexes if index.name == index_name)
+
+
+def _add_column(connection: Connection, column):
+    """ALTER TABLE .. ADD a column as NULL-able, so existing rows can be backfilled first."""
+    dialect = connection.dialect
+    connection.execute(DDL(
+        f"ALTER TABLE %(fullname)s "
+        f"ADD {dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)} NULL"
+    ).against(column.table))
+
+
+def add_workflow_name_key(connection: Connection) -> bool:
+    """Add workflow.workflow_name_key, backfill it and create its unique index."""
+    table = Workflow.__table__
+    column = table.c.workflow_name_key
+    changed = False
+
+    if not _has_column(connection, table, column.name):
+        _add_column(connection, column)
+        changed = True
+
+    rows = connection.execute(
+        select(table.c.workflow_id, table.c.workflow_name).where(column.is_(None))
+    ).fetchall()
+    if rows:
+        connection.execute(
+            update(table).where(table.c.workflow_id == bindparam("b_workflow_id")),
+            [{"b_workflow_id": row.workflow_id, "workflow_name_key": workflow_name_key(row.workflow_name)}
+             for row in rows]
+        )
+        logger.info(f"Backfilled workflow_name_key for {len(rows)} workflows")
+        changed = True
+
+    if connection.dialect.name == "mssql" and changed:
+        # Match the model now that every row has a key (must precede the index)
+        connection.execute(DDL(
+            f"ALTER TABLE %(fullname)s ALTER COLUMN {connection.dialect.identifier_preparer.quote(column.name)} "
+            f"{column.type.compile(dialect=connection.dialect)} NOT NULL"
+        ).against(table))
+
+    if not _has_index(connection, table, "ix_workflow_name_key"):
+        duplicates = connection.execute(
+            select(column).group_by(column).having(func.count() > 1)
+        ).scalars().all()
+        if duplicates:
+            # Leave the data alone; names must be made unique by hand first
+            logger.error(f"Not creating ix_workflow_name_key, duplicate workflow names: {duplicates}")
+            return changed
+        _index(table, "ix_workflow_name_key").create(connection)
+        changed = True
+    return changed
+
+
+# Non-unique indexes declared on tables that predate them
+SECONDARY_INDEXES = [
+    (Question.__table__, "ix_question_workflow_id"),
+    (Option.__table__, "ix_option_question_id"),
+    (Response.__table__, "ix_response_workflow_incident"),
+    (Response.__table__, "ix_response_incident_number"),
+    (Answer.__table__, "ix_answer_question_id"),
+    (TempIncidentSegment.__table__, "ix_temp_incident_segment_incident_number"),
+]
+
+
+def add_secondary_indexes(connection: Connection) -> bool:
+    """Create the declared lookup indexes on question, option, response, answer and temp_incident_segment where missing."""
+    changed = False
+    for table, index_name in SECONDARY_INDEXES:
+        if not _has_index(connection, table, index_name):
+            _index(table, index_name).create(connection)
+            logger.info(f"Created index {index_name}")
+            changed = True
+    return changed
+
+
+def backfill_incident_workflow(connection: Connection) -> bool:
+    """Create incident_workflow and bind every incident that has responses but no binding yet."""
+    binding = IncidentWorkflow.__table__
+    response = Response.__table__
+    binding.create(connection, checkfirst=True)
+
+    # An incident is only ever run with one workflow; MIN keeps this deterministic if not
+    unbound = select(
+        response.c.incident_number, func.min(response.c.workflow_id), func.min(response.c.created_at)
+    ).where(
+        response.c.workflow_id.is_not(None),
+        ~exists().where(binding.c.incident_number == response.c.incident_number)
+    ).group_by(response.c.incident_number)
+    result = connection.execute(
+        insert(binding).from_select(["incident_number", "workflow_id", "created_at"], unbound)
+    )
+    if result.rowcount and result.rowcount > 0:
+        logger.info(f"Bound {result.rowcount} incidents to their workflow")
+        return True
+    return False
+
+
+# (name, step) in the order they must run; steps return True if they changed anything
+MIGRATIONS: List[Tuple[str, Callable[[Connection], bool]]] = [
+    ("workflow_name_key", add_workflow_name_key),
+    ("secondary_indexes", add_secondary_indexes),
+    ("incident_workflow", backfill_incident_workflow),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Run every migration step, each in its own transaction; returns the names of the steps that changed something."""
+    applied = []
+    for name, step in MIGRATIONS:
+        with engine.begin() as connection:
+            if step(connection):
+                applied.append(name)
+                logger.info(f"Applied migration step {name}")
+    return applied
+
+
+def init_schema(engine: Engine) -> List[str]:
+    """Create the schema and missing tables, then run the migrations; returns the steps applied."""
+    if engine.dialect.name == "mssql":
+        create_db_schema(engine)
+    Base.metadata.create_all(engine)
+    return run_migrations(engine)
@@ -0,0 +1,76 @@
+"""
+Gunicorn settings for production (``gunicorn -c gunicorn.conf.py``).
+
+    PORT=5002                  listen port
+    WEB_CONCURRENCY=<2 x CPUs> worker processes (1 for INCIDENTLOG_WRITE_BEHIND)
+    GUNICORN_THREADS=4         request threads per worker (keep below the
+                               pool size + overflow of each engine, 15)
+    GUNICORN_PRELOAD=true      build the app once in the master before forking
+    GUNICORN_TIMEOUT=60        seconds before a silent worker is restarted
+    GUNICORN_GRACEFUL_TIMEOUT=30
+                               seconds a stopping worker gets to finish
+                               requests and flush the write-behind queue
+    GUNICORN_ACCESS_LOG=false  one log line per request
+    PROMETHEUS_MULTIPROC_DIR=<tmp>/sop-metrics
+                               where workers share their /metrics values
+                               (prometheus_client multiprocess mode);
+                               emptied when the master starts
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2)))
+# Read by create_app, which refuses INCIDENTLOG_WRITE_BEHIND with more than one worker
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Requests mostly wait on SQL Server, so each worker serves several on threads
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Restart workers now and then so a slow leak can't grow unbounded
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-" if os.getenv("GUNICORN_ACCESS_LOG", "false").lower() in ("1", "true", "yes") else None
+errorlog = "-"
+
+# prometheus_client writes every worker's metrics to files in this directory, merged at
+# scrape time. It picks multiprocess mode on import, so this must be set before the app
+# is built (preloaded in the master or loaded in each worker)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "sop-metrics"))
+
+
+def on_starting(server):
+    """Runs in the master before any worker starts: drop the metric files of a previous run."""
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    """Runs in the master when a worker exits: its live gauges stop counting, its counters stay."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    """Runs in each worker once the app is loaded (after the fork when preloading)."""
+    from main import reset_after_fork, start_background_services
+    reset_after_fork(worker.wsgi)
+    start_background_services(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    """Runs in the worker as it exits: flush queued incident log writes, close connections."""
+    from main import stop_background_services
+    if getattr(worker, "wsgi", None) is not None:
+        stop_background_services(worker.wsgi, timeout=max(graceful_timeout - 5, 1))
@@ -1,3 +1,4 @@
+import atexit
 import os
 import sys
 from dotenv import load_dotenv  # Import dotenv to load .env variables
@@ -6,47 +7,245 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 from flask import Flask
 from flask_cors import CORS
-from sqlalchemy.orm import sessionmaker
-from config.database import engine, VC_DB_Local  # Ensure VC_DB_Local is correctly imported
-from models.SOP_tables import Base, VC_DB_Base  # Make sure these models are defined correctly
-from services.wf_builder_service import WorkflowBuilderService, QuestionManagementService, VC_DB_Service
+from sqlalchemy.orm import scoped_session
+from config.database import get_session_factory, get_vc_session_factory
+from config.migrations import init_schema
+from config.logging_config import configure_logging, log_slow_queries
+from services.wf_builder_service import WorkflowBuilderService, QuestionManagementService, AnswerService, VC_DB_Service
+from services.cache import LRUCache
+from services.incidentlog_writer import IncidentLogWriter
+from services.incident_category_directory import IncidentCategoryDirectory
+from services.metrics import Metrics
+from services.lookup_executor import LookupExecutor
 from api.workflow_api import setup_workflow_api
+from api.health_api import setup_health_api
 
 # Load environment variables from .env
 load_dotenv()
 
-app = Flask(__name__)
 
-# Get allowed origins from .env
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
+def create_app(session_factory=None, vc_session_factory=None, start_background=True):
+    """
+    Build the Flask application.
 
-# Configure CORS
-CORS(app, resources={
-    r"/*": {  # Allow all routes
-        "origins": allowed_origins,
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+    Every database gets a thread-local scoped_session registry; the services
+    hold the registry rather than a concrete Session, so each request (and
+    each worker thread) works on its own session, which is removed again
+    when the app context is torn down.
 
-# Set up the database connection
-Base.metadata.create_all(engine)  # Ensure Base refers to all necessary models
+    Building the app opens no database connection: engines connect on the
+    first request, and schema setup only runs with DB_INIT_SCHEMA=true (or
+    ``flask --app wsgi init-db``). /readyz reports whether the databases
+    are reachable.
 
-# Initialize session for main DB and VC_DB
-Session = sessionmaker(bind=engine)
-vc_db_session = VC_DB_Local()
+    Args:
+        session_factory: sessionmaker for sop-manage (defaults to get_session_factory())
+        vc_session_factory: sessionmaker for the VC database (defaults to get_vc_session_factory())
+        start_background: Start the category refresh and write-behind threads now.
+            A pre-forking server passes False and calls start_background_services
+            in every worker, since threads don't survive a fork.
+    """
+    # JSON log lines with levels from LOG_LEVEL/LOG_LEVELS (once per process)
+    configure_logging()
 
-# Set up the VC DB Service
-vc_service = VC_DB_Service(db_session=vc_db_session)
+    app = Flask(__name__)
 
-# Set up the Workflow Builder Service
-wf_builder_service = WorkflowBuilderService(db_session=Session())
+    # Get allowed origins from .env
+    allowed_origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
 
-# Set up the Question Management Service
-question_management_service = QuestionManagementService(db_session=Session())
+    # Configure CORS
+    CORS(app, resources={
+        r"/*": {  # Allow all routes
+            "origins": allowed_origins,
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            # Readable by the frontend: paging cursor and per-stage timings
+            "expose_headers": ["X-Next-Cursor", "Server-Timing"]
+        }
+    })
+
+    # Engines are those the session factories are bound to; neither connects yet
+    session_factory = session_factory or get_session_factory()
+    vc_session_factory = vc_session_factory or get_vc_session_factory()
+    sop_engine = session_factory.kw["bind"]
+    vc_engine = vc_session_factory.kw["bind"]
+
+    # SQL, parameters and duration of statements over SLOW_QUERY_MS
+    log_slow_queries(sop_engine, "sop")
+    log_slow_queries(vc_engine, "vc")
+
+    # SQL count/time per request and route, pool stats; served at /metrics
+    metrics = None
+    if os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes"):
+        # Under gunicorn PROMETHEUS_MULTIPROC_DIR is set, so /metrics covers every worker
+        metrics = Metrics()
+        metrics.instrument_engine(sop_engine, "sop")
+        metrics.instrument_engine(vc_engine, "vc")
+        metrics.init_app(app)
+
+    # Schema creation and migrations are opt-in, so a cold start never waits on the database
+    if os.getenv("DB_INIT_SCHEMA", "false").lower() in ("1", "true", "yes"):
+        init_schema(sop_engine)
+
+    @app.cli.command("init-db")
+    def init_db():
+        """Create missing tables and run the schema migrations."""
+        applied = init_schema(sop_engine)
+        print(f"Schema ready; migration steps applied: {', '.join(applied) or 'none'}")
+
+    # Liveness and readiness probes
+    setup_health_api(app, {"sop": sop_engine, "vc": vc_engine},
+                     cache_ttl=float(os.getenv("READYZ_CACHE_TTL", "2")))
+
+    # Per-thread session registries for main DB and VC_DB
+    db_session = scoped_session(session_factory)
+    vc_db_session = scoped_session(vc_session_factory)
+
+    @app.teardown_appcontext
+    def remove_sessions(exception=None):
+        """Return this request's sessions (and their connections) to the pool."""
+        db_session.remove()
+        vc_db_session.remove()
+
+    # Related persons change rarely; cache the heavy keyholder CTE per (category, building)
+    persons_cache = LRUCache(
+        maxsize=int(os.getenv("PERSONS_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("PERSONS_CACHE_TTL", "300")),
+    )
+
+    # Workflow name <-> incident category map, loaded and refreshed in the background
+    category_directory = None
+    category_refresh = float(os.getenv("INCIDENT_CATEGORY_REFRESH", "300"))
+    if category_refresh > 0:
+        category_directory = IncidentCategoryDirectory(
+            session_factory=vc_session_factory,
+            refresh_interval=category_refresh,
+        )
+
+    # Set up the VC DB Service
+    vc_service = VC_DB_Service(
+        db_session=vc_db_session,
+        persons_cache=persons_cache,
+        category_directory=category_directory,
+    )
+
+    # Compiled workflow snapshots, shared by all request threads of this process.
+    # The TTL bounds staleness when other worker processes edit a workflow.
+    workflow_cache = LRUCache(
+        maxsize=int(os.getenv("WORKFLOW_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("WORKFLOW_CACHE_TTL", "300")),
+    )
+
+    # Normalized workflow name -> workflow_id, for uniqueness checks and name lookups
+    workflow_name_cache = LRUCache(
+        maxsize=int(os.getenv("WORKFLOW_NAME_CACHE_SIZE", "4096")),
+        ttl=float(os.getenv("WORKFLOW_CACHE_TTL", "300")),
+    )
+
+    # incident_number -> bound workflow_id; bindings never change while their workflow exists
+    incident_binding_cache = LRUCache(
+        maxsize=int(os.getenv("INCIDENT_BINDING_CACHE_SIZE", "16384")),
+        ttl=float(os.getenv("WORKFLOW_CACHE_TTL", "300")),
+    )
+
+    # Set up the Workflow Builder Service
+    wf_builder_service = WorkflowBuilderService(
+        db_session=db_session,
+        workflow_cache=workflow_cache,
+        name_cache=workflow_name_cache,
+        binding_cache=incident_binding_cache,
+    )
+
+    # Set up the Question Management Service
+    question_management_service = QuestionManagementService(db_session=db_session, workflow_cache=workflow_cache)
+
+    # Optional write-behind queue so answers don't wait on the VC database
+    incidentlog_writer = None
+    if os.getenv("INCIDENTLOG_WRITE_BEHIND", "false").lower() in ("1", "true", "yes"):
+        # Each worker would have its own queue, and blocks of one incident could be
+        # written out of order; gunicorn.conf.py exports its worker count here
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            raise RuntimeError("INCIDENTLOG_WRITE_BEHIND keeps an incident's appends in order only "
+                               "within one process; run a single worker (WEB_CONCURRENCY=1) to enable it.")
+        incidentlog_writer = IncidentLogWriter(
+            session_factory=vc_session_factory,
+            flush_interval=float(os.getenv("INCIDENTLOG_FLUSH_INTERVAL", "0.5")),
+            vc_service=vc_service,
+        )
+        # Flush whatever is still queued when the process exits
+        atexit.register(incidentlog_writer.stop)
+        if metrics is not None:
+            metrics.watch_incidentlog_writer(incidentlog_writer)
+
+    # Set up the Answer Service
+    answer_service = AnswerService(
+        db_session=db_session,
+        vc_service=vc_service,
+        incidentlog_writer=incidentlog_writer,
+        materialize_transcripts=os.getenv("TRANSCRIPT_MATERIALIZE", "true").lower() in ("1", "true", "yes"),
+        binding_cache=incident_binding_cache,
+    )
+
+    # Runs a request's independent lookups concurrently (0 runs them in sequence)
+    lookup_executor = None
+    lookup_workers = int(os.getenv("LOOKUP_WORKERS", "8"))
+    if lookup_workers > 0:
+        lookup_executor = LookupExecutor(sessions=[db_session, vc_db_session], max_workers=lookup_workers)
+
+    # Set up the Workflow API
+    setup_workflow_api(app, wf_builder_service, question_management_service, vc_service, answer_service,
+                       lookup_executor=lookup_executor)
+
+    app.extensions["workflow_cache"] = workflow_cache
+    app.extensions["workflow_name_cache"] = workflow_name_cache
+    app.extensions["incident_binding_cache"] = incident_binding_cache
+    app.extensions["persons_cache"] = persons_cache
+    app.extensions["category_directory"] = category_directory
+    app.extensions["incidentlog_writer"] = incidentlog_writer
+    app.extensions["metrics"] = metrics
+    app.extensions["lookup_executor"] = lookup_executor
+    app.extensions["engines"] = {"sop": sop_engine, "vc": vc_engine}
+
+    if start_background:
+        start_background_services(app)
+    return app
+
+
+def start_background_services(app):
+    """Start the category refresh and write-behind threads in this process (idempotent)."""
+    for name in ("category_directory", "incidentlog_writer"):
+        if app.extensions.get(name) is not None:
+            app.extensions[name].start()
+
+
+def reset_after_fork(app):
+    """
+    Give a forked worker pools of its own.
+
+    Connections inherited from the parent are dropped without being closed
+    (closing them would close the parent's sockets); the worker opens new
+    ones on first use.
+    """
+    for engine in app.extensions["engines"].values():
+        engine.dispose(close=False)
+    if app.extensions.get("metrics") is not None:
+        app.extensions["metrics"].after_fork()
+
+
+def stop_background_services(app, timeout: float = 10.0):
+    """Flush the write-behind queue, stop the background threads and close pooled connections."""
+    if app.extensions.get("incidentlog_writer") is not None:
+        app.extensions["incidentlog_writer"].stop(timeout)
+    if app.extensions.get("category_directory") is not None:
+        app.extensions["category_directory"].stop()
+    if app.extensions.get("lookup_executor") is not None:
+        app.extensions["lookup_executor"].shutdown()
+    for engine in app.extensions["engines"].values():
+        engine.dispose()
 
-# Set up the Workflow API
-setup_workflow_api(app, wf_builder_service, question_management_service, vc_service)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5002, debug=True)
+    # Development server only; production runs gunicorn with gunicorn.conf.py
+    app = create_app()
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5002")),
+            debug=os.getenv("FLASK_DEBUG", "false").lower() in ("1", "true", "yes"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum, Text
 from sqlalchemy.orm import relationship, validates, declarative_base
 from datetime import datetime
 import enum
@@ -17,24 +17,35 @@ class QuestionType(str, enum.Enum):
     CHECKBOX = "CHECKBOX"
     INSTRUCTION = "INSTRUCTION"
 
+def workflow_name_key(workflow_name: str) -> str:
+    """Normalized form under which workflow names are unique and looked up ('  Fire_Alarm ' -> 'fire_alarm')."""
+    return workflow_name.strip().lower()
+
+
 class Workflow(Base):
     __tablename__ = "workflow"
     __table_args__ = (
+        Index("ix_workflow_name_key", "workflow_name_key", unique=True),
         {'schema': DB_SCHEMA}
     )
 
     workflow_id = Column(Integer, primary_key=True)
     workflow_name = Column(String(255), nullable=False)
+    # workflow_name_key(workflow_name), maintained by WorkflowBuilderService
+    workflow_name_key = Column(String(255), nullable=False)
     incident_type = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    questions = relationship("Question", back_populates="workflow", cascade="all, delete-orphan")
+    questions = relationship("Question", back_populates="workflow", cascade="all, delete-orphan",
+                             order_by="Question.question_id")
     responses = relationship("Response", back_populates="workflow")
 
 class Question(Base):
     __tablename__ = "question"
     __table_args__ = (
+        # Questions of a workflow (snapshots, listings, diffs)
+        Index("ix_question_workflow_id", "workflow_id"),
         {'schema': DB_SCHEMA}
     )
 
@@ -51,7 +62,8 @@ class Question(Base):
     workflow = relationship("Workflow", back_populates="questions")
     options = relationship("Option", back_populates="question", 
                          foreign_keys="[Option.question_id]",
-                         cascade="all, delete-orphan")
+                         cascade="all, delete-orphan",
+                         order_by="Option.option_id")
     responses = relationship("Response", back_populates="question")
     answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan")
     next_question = relationship("Question", remote_side=[question_id],
@@ -68,6 +80,8 @@ class Question(Base):
 class Option(Base):
     __tablename__ = "option"
     __table_args__ = (
+        # Options of a question
+        Index("ix_option_question_id", "question_id"),
         {'schema': DB_SCHEMA}
     )
 
@@ -84,6 +98,10 @@ class Option(Base):
 class Response(Base):
     __tablename__ = "response"
     __table_args__ = (
+        # Responses of one incident run: step seeding, transcripts, cleanup
+        Index("ix_response_workflow_incident", "workflow_id", "incident_number"),
+        # Incident -> workflow lookups of the incident_workflow backfill (config/migrations.py)
+        Index("ix_response_incident_number", "incident_number"),
         {'schema': DB_SCHEMA}
     )
 
@@ -101,6 +119,35 @@ class Response(Base):
     temp_incident = relationship("TempIncident", back_populates="responses")  # Linked to TempIncident
 
     
+class IncidentProgress(Base):
+    __tablename__ = "incident_progress"
+    __table_args__ = (
+        {'schema': DB_SCHEMA}
+    )
+
+    # Number of responses recorded so far for an incident run of a workflow;
+    # incremented in the same transaction that inserts the responses
+    incident_number = Column(String(50), primary_key=True)
+    workflow_id = Column(Integer, ForeignKey(f"{DB_SCHEMA}.workflow.workflow_id", ondelete="CASCADE"), primary_key=True)
+    step_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IncidentWorkflow(Base):
+    __tablename__ = "incident_workflow"
+    __table_args__ = (
+        # Bindings dropped with their workflow (delete_workflow)
+        Index("ix_incident_workflow_workflow_id", "workflow_id"),
+        {'schema': DB_SCHEMA}
+    )
+
+    # The workflow an incident is run with, written in the transaction of its
+    # first answer; the primary key allows one workflow per incident
+    incident_number = Column(String(50), primary_key=True)
+    workflow_id = Column(Integer, ForeignKey(f"{DB_SCHEMA}.workflow.workflow_id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    
 class TempIncident(Base):
     __tablename__ = "temp_incident"
     __table_args__ = (
@@ -108,12 +155,37 @@ class TempIncident(Base):
     )
 
     incident_number = Column(String(50), primary_key=True)  # Primary key
+    # Only the folded part of the transcript: while a run is in progress the
+    # newer steps are in TempIncidentSegment, and text_mme is complete once the
+    # terminal question's answer (or materialize_transcript) has folded them in
     text_mme = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship to Response
     responses = relationship("Response", back_populates="temp_incident")
+    # Transcript appended after text_mme, see TempIncidentSegment
+    segments = relationship("TempIncidentSegment", back_populates="temp_incident",
+                            order_by="TempIncidentSegment.id", cascade="all, delete-orphan")
+
+
+class TempIncidentSegment(Base):
+    __tablename__ = "temp_incident_segment"
+    __table_args__ = (
+        # Segments of one incident: transcript reads, folds, cascade deletes
+        Index("ix_temp_incident_segment_incident_number", "incident_number"),
+        {'schema': DB_SCHEMA}
+    )
+
+    # Append-only transcript: every answer (or answer batch) inserts one row
+    # instead of rewriting temp_incident.text_mme. The full transcript is
+    # text_mme followed by the segments in id order, joined with "\n".
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    incident_number = Column(String(50), ForeignKey(f"{DB_SCHEMA}.temp_incident.incident_number", ondelete="CASCADE"), nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    temp_incident = relationship("TempIncident", back_populates="segments")
     
     
 class IncidentLog(VC_DB_Base):
@@ -129,6 +201,8 @@ class IncidentLog(VC_DB_Base):
 class Answer(Base):
     __tablename__ = "answer"
     __table_args__ = (
+        # Answers of a question (cascading deletes)
+        Index("ix_answer_question_id", "question_id"),
         {'schema': DB_SCHEMA}
     )
 
@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_workflow_name(name: str) -> str:
+    """Key under which a workflow name and its incident category name meet ('Fire  alarm' -> 'fire_alarm')."""
+    return '_'.join(name.replace('_', ' ').split()).lower()
+
+
+class IncidentCategoryDirectory:
+    """
+    In-memory bidirectional map between IncidentCategory_TBL rows and workflow names.
+
+    Workflow names are incident category names with whitespace replaced by
+    underscores. The whole table (a few hundred rows) is loaded at once and
+    reloaded every ``refresh_interval`` seconds by a background thread, so
+    name resolution is a dict lookup. Lookups are case-insensitive, like
+    the SQL Server comparison they replace. Until the first load succeeds
+    ``loaded`` is False and callers fall back to querying the database.
+    """
+
+    def __init__(self, session_factory, refresh_interval: float = 300):
+        """
+        Args:
+            session_factory: Callable returning a new VC database session.
+            refresh_interval (float): Seconds between background reloads.
+        """
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        # Both maps are replaced together, never mutated, so readers need no lock
+        self._maps = ({}, {})
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.loaded = False
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def load(self) -> bool:
+        """(Re)load the whole category table; returns False if the query failed."""
+        session = self.session_factory()
+        try:
+            rows = session.execute(text("""
+                SELECT IncidentCategory_PRK, incName_TXT
+                FROM [TEST].[dbo].IncidentCategory_TBL
+                ORDER BY IncidentCategory_PRK
+            """)).fetchall()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"Error loading IncidentCategory_TBL: {str(e)}")
+            return False
+        finally:
+            session.close()
+
+        prk_by_key: Dict[str, int] = {}
+        name_by_prk: Dict[int, str] = {}
+        for row in rows:
+            if row.incName_TXT is None:
+                continue
+            workflow_name = '_'.join(row.incName_TXT.split())
+            name_by_prk[row.IncidentCategory_PRK] = workflow_name
+            # Lowest PRK wins when two categories only differ in case/spacing
+            prk_by_key.setdefault(normalize_workflow_name(workflow_name), row.IncidentCategory_PRK)
+
+        self._maps = (prk_by_key, name_by_prk)
+        self.loaded = True
+        self.loaded_at = time.time()
+        self.refreshes += 1
+        logger.info(f"Loaded {len(name_by_prk)} incident categories")
+        return True
+
+    def start(self) -> "IncidentCategoryDirectory":
+        """Load in the background now and then every refresh_interval seconds (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="incident-category-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.load()
+            self._stop.wait(self.refresh_interval)
+
+    def prk_for_workflow_name(self, workflow_name: str) -> Optional[int]:
+        """IncidentCategory_PRK of a workflow name, or None if no category matches."""
+        return self._maps[0].get(normalize_workflow_name(workflow_name))
+
+    def workflow_name_for_prk(self, incident_category_prk: int) -> Optional[str]:
+        """Workflow name of an IncidentCategory_PRK, or None if unknown."""
+        return self._maps[1].get(incident_category_prk)
+
+    def stats(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "size": len(self._maps[1]),
+            "age_seconds": (time.time() - self.loaded_at) if self.loaded_at else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
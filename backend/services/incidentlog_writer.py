@@ -0,0 +1,210 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Append the backend path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.services.wf_builder_service import VC_DB_Service
+
+
+class _PendingAppend:
+    """Texts queued for one incident, in arrival order."""
+
+    def __init__(self, workflow_name: str, building_frk, enqueued_at: float):
+        self.workflow_name = workflow_name
+        self.building_frk = building_frk
+        self.enqueued_at = enqueued_at
+        self.texts: List[str] = []
+        self.attempts = 0
+
+
+class IncidentLogWriter:
+    """
+    Write-behind queue for IncidentLog_TBL.inlActionTaken_MEM appends.
+
+    Appends are queued per incident and written by a single background
+    thread, so the HTTP request never waits on the VC database. Everything
+    queued for an incident since its last flush is coalesced into one
+    UPDATE (texts joined with CRLF, exactly as consecutive appends would
+    produce), and since there is only one writer the text order within an
+    incident is preserved. The queue is flushed every ``flush_interval``
+    seconds and on ``stop()``.
+
+    That order only holds within one process: two workers with a queue
+    each could write blocks of the same incident out of order, so
+    create_app refuses write-behind when WEB_CONCURRENCY is above 1.
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 0.5, max_attempts: int = 3,
+                 vc_service: Optional[VC_DB_Service] = None):
+        """
+        Args:
+            session_factory: Callable returning a new VC database session.
+            flush_interval (float): Maximum time (s) an append waits before it is written.
+            max_attempts (int): Flush attempts per block before it is dropped and logged.
+            vc_service (VC_DB_Service): Service whose caches the writer shares; it is
+                rebound to the writer's own session for every flush.
+        """
+        self.session_factory = session_factory
+        self.vc_service = vc_service or VC_DB_Service(None)
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending: "OrderedDict[str, _PendingAppend]" = OrderedDict()
+        self._cond = threading.Condition()
+        # Serialises flushes so two blocks of the same incident are never written out of order
+        self._write_lock = threading.Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            "enqueued": 0,
+            "updates": 0,
+            "coalesced": 0,
+            "failures": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flush_seconds_total": 0.0,
+            "flush_seconds_max": 0.0,
+            "last_flush_seconds": 0.0,
+        }
+
+    def start(self) -> "IncidentLogWriter":
+        """Start the background writer thread (idempotent)."""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="incidentlog-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def enqueue(self, incident_number: str, new_text: str, workflow_name: str, building_frk=None):
+        """Queue text to be appended to an incident's inlActionTaken_MEM."""
+        key = str(incident_number)
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = _PendingAppend(workflow_name, building_frk, time.monotonic())
+                self._pending[key] = pending
+            pending.texts.append(new_text)
+            self._metrics["enqueued"] += 1
+
+    def flush(self):
+        """Write everything queued so far on the calling thread."""
+        with self._write_lock:
+            with self._cond:
+                batch = self._pending
+                self._pending = OrderedDict()
+            self._write(batch)
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """
+        Stop the writer thread after flushing every queued append.
+
+        Blocks that still cannot be written once ``timeout`` has passed (or
+        after max_attempts) are dropped and logged with their incident numbers.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        # Anything queued after the thread's final pass, and blocks re-queued after a failed write
+        while self._pending:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            if not self._write_lock.acquire(timeout=-1 if remaining is None else remaining):
+                break
+            try:
+                with self._cond:
+                    batch = self._pending
+                    self._pending = OrderedDict()
+                self._write(batch)
+            finally:
+                self._write_lock.release()
+
+        with self._cond:
+            unflushed = self._pending
+            self._pending = OrderedDict()
+            self._metrics["dropped"] += sum(len(pending.texts) for pending in unflushed.values())
+        for incident_number, pending in unflushed.items():
+            logger.error(f"IncidentLog_TBL writer stopped with {len(pending.texts)} append(s) "
+                         f"for incident {incident_number} unwritten")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _write(self, batch: "OrderedDict[str, _PendingAppend]"):
+        if not batch:
+            return
+        start = time.monotonic()
+        failed: "OrderedDict[str, _PendingAppend]" = OrderedDict()
+        # Counted locally and added to self._metrics under the lock stats() reads with
+        counts = {"updates": 0, "coalesced": 0, "failures": 0, "dropped": 0}
+        session = self.session_factory()
+        try:
+            vc_service = self.vc_service.for_session(session)
+            for incident_number, pending in batch.items():
+                try:
+                    static_heading = vc_service.build_sop_heading(pending.workflow_name, pending.building_frk)
+                    vc_service.append_incidentlog_text(
+                        incident_number,
+                        static_heading,
+                        f"{chr(13)}{chr(10)}".join(pending.texts)
+                    )
+                    counts["updates"] += 1
+                    counts["coalesced"] += len(pending.texts) - 1
+                except Exception as e:
+                    pending.attempts += 1
+                    counts["failures"] += 1
+                    logger.error(f"Error appending to IncidentLog_TBL for incident {incident_number} "
+                                 f"(attempt {pending.attempts}): {str(e)}")
+                    if pending.attempts < self.max_attempts:
+                        failed[incident_number] = pending
+                    else:
+                        counts["dropped"] += len(pending.texts)
+                        logger.error(f"Dropping {len(pending.texts)} IncidentLog_TBL append(s) for incident {incident_number}")
+        finally:
+            session.close()
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            # Failed blocks go back in front of anything queued for the same incident meanwhile
+            for incident_number, pending in failed.items():
+                newer = self._pending.pop(incident_number, None)
+                if newer is not None:
+                    pending.texts.extend(newer.texts)
+                self._pending[incident_number] = pending
+
+            for key, value in counts.items():
+                self._metrics[key] += value
+            self._metrics["flushes"] += 1
+            self._metrics["flush_seconds_total"] += elapsed
+            self._metrics["flush_seconds_max"] = max(self._metrics["flush_seconds_max"], elapsed)
+            self._metrics["last_flush_seconds"] = elapsed
+
+    def stats(self) -> Dict:
+        """Queue depth and flush counters/latency for monitoring."""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                **self._metrics,
+                "queue_incidents": len(self._pending),
+                "queue_depth": sum(len(p.texts) for p in self._pending.values()),
+                "oldest_pending_seconds": max((now - p.enqueued_at for p in self._pending.values()), default=0.0),
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
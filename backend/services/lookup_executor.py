@@ -0,0 +1,42 @@
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Sequence
+
+from sqlalchemy.orm import scoped_session
+
+
+class LookupExecutor:
+    """
+    Thread pool for independent database lookups of a single request.
+
+    The services hold scoped_session registries, so a task running on a pool
+    thread gets that thread's own sessions and thus its own pooled
+    connection; they are removed again when the task ends, returning the
+    connection before the next task runs on the thread. Tasks run in a copy
+    of the submitting context, so request metrics and logging still see the
+    request. Threads are started on first use, never in a pre-forking master.
+    """
+
+    def __init__(self, sessions: Sequence[scoped_session], max_workers: int = 8):
+        """
+        Args:
+            sessions: The scoped_session registries the lookups may use.
+            max_workers (int): Concurrent lookups across all requests of the process.
+        """
+        self.sessions = list(sessions)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookup")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run ``fn(*args, **kwargs)`` on a pool thread in a copy of the current context."""
+        return self._executor.submit(contextvars.copy_context().run, self._run, fn, args, kwargs)
+
+    def _run(self, fn: Callable, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            for session in self.sessions:
+                session.remove()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,283 @@
+import os
+import re
+import threading
+from contextvars import ContextVar
+import time
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from flask import Response, jsonify, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Statements run outside a request (write-behind writer, category refresh, startup)
+BACKGROUND_ROUTE = "<background>"
+
+
+class _RequestStats:
+    """SQL activity of one request, filled in by the engine hooks running in the request's context."""
+
+    __slots__ = ("route", "started", "statements", "seconds", "slowest", "closing")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.closing = False
+        self.statements: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        # (duration, db, statement)
+        self.slowest: Optional[Tuple[float, str, str]] = None
+
+
+class _IncidentLogWriterCollector:
+    """The counters and queue state of an IncidentLogWriter, read at every scrape."""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def collect(self):
+        stats = self.writer.stats()
+        events = CounterMetricFamily(
+            "incidentlog_writer_events", "IncidentLog_TBL write-behind appends and flushes.", labels=["event"])
+        for event_name in ("enqueued", "updates", "coalesced", "failures", "dropped", "flushes"):
+            events.add_metric([event_name], stats[event_name])
+        yield events
+        yield CounterMetricFamily(
+            "incidentlog_writer_flush_seconds", "Time spent flushing the IncidentLog_TBL queue.",
+            value=stats["flush_seconds_total"])
+        state = GaugeMetricFamily(
+            "incidentlog_writer_state", "IncidentLog_TBL write-behind queue and last flush.", labels=["field"])
+        for field in ("queue_incidents", "queue_depth", "oldest_pending_seconds",
+                      "flush_seconds_max", "last_flush_seconds", "running"):
+            state.add_metric([field], float(stats[field]))
+        yield state
+
+
+class Metrics:
+    """
+    Per-request and per-route SQL/latency metrics, served in Prometheus text format.
+
+    ``instrument_engine`` hooks an Engine's cursor executions and pool
+    events; every statement executed in a request's context is attributed
+    to that request and its route (url rule), everything else to
+    ``<background>``. ``init_app`` adds the request hooks, ``/metrics`` and
+    ``/metrics/slowest`` (the slowest statement seen per route, with its SQL).
+
+    The metrics are prometheus_client's. With ``PROMETHEUS_MULTIPROC_DIR``
+    set before prometheus_client is imported (gunicorn.conf.py does), every
+    worker writes its values to files there and ``/metrics`` serves all of
+    them merged through ``MultiProcessCollector``, whichever worker answers
+    the scrape; gunicorn's ``child_exit`` hook marks exited workers dead so
+    their gauges drop out. ``/metrics/slowest`` and the write-behind writer's
+    metrics stay per worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.multiprocess_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+        # Merged from the multiprocess files at scrape time rather than registered here
+        self.registry = CollectorRegistry() if self.multiprocess_dir is None else None
+        # A context variable rather than a thread-local, so work handed to a pool
+        # thread in a copy of the request's context still counts for the request
+        self._stats: ContextVar[Optional[_RequestStats]] = ContextVar("request_metrics", default=None)
+        self._engines: Dict[str, Engine] = {}
+        self.requests_total = Counter(
+            "http_requests_total", "HTTP requests served.", ("route", "method", "status"), registry=self.registry)
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("route", "method"), registry=self.registry)
+        self.statements_total = Counter(
+            "db_statements_total", "SQL statements executed.", ("db", "route"), registry=self.registry)
+        self.statement_seconds = Histogram(
+            "db_statement_duration_seconds", "Latency of single SQL statements.", ("db",), registry=self.registry)
+        self.request_statements = Histogram(
+            "db_request_statements", "SQL statements per HTTP request.", ("db", "route"),
+            buckets=STATEMENT_COUNT_BUCKETS, registry=self.registry)
+        self.request_db_seconds = Histogram(
+            "db_request_seconds", "Total SQL time per HTTP request.", ("db", "route"), registry=self.registry)
+        self.slowest_seconds = Gauge(
+            "db_route_slowest_statement_seconds", "Slowest SQL statement seen per route.", ("db", "route"),
+            multiprocess_mode="max", registry=self.registry)
+        self.pool_checkouts = Counter(
+            "db_pool_checkouts_total", "Connections checked out of the pool.", ("db",), registry=self.registry)
+        self.pool_held_seconds = Histogram(
+            "db_pool_connection_held_seconds", "Time from a connection's checkout to its checkin.", ("db",),
+            registry=self.registry)
+        self.pool_connects = Counter(
+            "db_pool_connects_total", "New DBAPI connections opened.", ("db",), registry=self.registry)
+        # Kept up to date by the pool events, so every worker's files are current between scrapes
+        self.pool_state = Gauge(
+            "db_pool_connections", "Open and checked out pool connections, summed over live workers.",
+            ("db", "state"), multiprocess_mode="livesum", registry=self.registry)
+        # (db, route) -> (seconds, statement) of this process
+        self._slowest: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._writer_collector: Optional[_IncidentLogWriterCollector] = None
+
+    # -- engines -----------------------------------------------------------
+
+    def instrument_engine(self, engine: Engine, db: str) -> Engine:
+        """
+        Attribute the engine's statements and pool checkouts to ``db`` (idempotent per name).
+
+        Call it before the engine's first connection: connections opened
+        earlier are missing from the open-connection gauge.
+        """
+        if self._engines.get(db) is engine:
+            return engine
+        self._engines[db] = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get("metrics_started")
+            if started:
+                self._record_statement(db, statement, time.perf_counter() - started.pop())
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            # A failed statement never reaches after_cursor_execute
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("metrics_started"):
+                conn.info["metrics_started"].pop()
+
+        # Pool listeners on the engine carry over to the pool dispose() creates
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.pool_connects.labels(db).inc()
+            self.pool_state.labels(db, "open").inc()
+
+        @event.listens_for(engine, "close")
+        def on_close(dbapi_connection, connection_record):
+            self.pool_state.labels(db, "open").dec()
+
+        @event.listens_for(engine, "close_detached")
+        def on_close_detached(dbapi_connection):
+            self.pool_state.labels(db, "open").dec()
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["metrics_checked_out"] = time.perf_counter()
+            self.pool_checkouts.labels(db).inc()
+            self.pool_state.labels(db, "checked_out").inc()
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop("metrics_checked_out", None)
+            if started is not None:
+                self.pool_held_seconds.labels(db).observe(time.perf_counter() - started)
+                self.pool_state.labels(db, "checked_out").dec()
+
+        return engine
+
+    def after_fork(self):
+        """
+        Start a forked worker from empty values; what the parent counted is not the worker's.
+
+        Multiprocess values are per pid and reset by prometheus_client itself.
+        """
+        with self._lock:
+            self._slowest.clear()
+        if self.multiprocess_dir is None:
+            for metric in (self.requests_total, self.request_seconds, self.statements_total,
+                           self.statement_seconds, self.request_statements, self.request_db_seconds,
+                           self.slowest_seconds, self.pool_checkouts, self.pool_held_seconds,
+                           self.pool_connects, self.pool_state):
+                metric.clear()
+
+    def watch_incidentlog_writer(self, writer) -> None:
+        """Export the counters and queue state of an IncidentLogWriter, read at every scrape."""
+        self._writer_collector = _IncidentLogWriterCollector(writer)
+        if self.registry is not None:
+            self.registry.register(self._writer_collector)
+
+    def _record_statement(self, db: str, statement: str, seconds: float):
+        stats = self._stats.get()
+        route = stats.route if stats is not None else BACKGROUND_ROUTE
+        with self._lock:
+            if stats is not None:
+                stats.statements[db] = stats.statements.get(db, 0) + 1
+                stats.seconds[db] = stats.seconds.get(db, 0.0) + seconds
+                if stats.slowest is None or seconds > stats.slowest[0]:
+                    stats.slowest = (seconds, db, statement)
+            slowest = self._slowest.get((db, route))
+            if slowest is None or seconds > slowest[0]:
+                self._slowest[(db, route)] = (seconds, re.sub(r"\s+", " ", statement).strip()[:2000])
+                self.slowest_seconds.labels(db, route).set(seconds)
+        self.statements_total.labels(db, route).inc()
+        self.statement_seconds.labels(db).observe(seconds)
+
+    # -- requests ----------------------------------------------------------
+
+    def current(self) -> Optional[_RequestStats]:
+        """SQL activity of the request whose context is current, if any."""
+        return self._stats.get()
+
+    def init_app(self, app):
+        @app.before_request
+        def start_request_metrics():
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            self._stats.set(_RequestStats(route))
+
+        @app.after_request
+        def add_db_timing(response):
+            stats = self.current()
+            if stats is None:
+                return response
+            if stats.statements:
+                # Appended to any stage timings the endpoint reported
+                entries = [
+                    f'db-{db};dur={round(stats.seconds[db] * 1000, 3)};desc="{count} queries"'
+                    for db, count in sorted(stats.statements.items())
+                ]
+                existing = response.headers.get("Server-Timing")
+                response.headers["Server-Timing"] = ", ".join(([existing] if existing else []) + entries)
+            # Finished when the server closes the response, i.e. after a streamed body
+            stats.closing = True
+            response.call_on_close(partial(self._finish_request, stats, request.method, response.status_code))
+            return response
+
+        @app.teardown_request
+        def finish_failed_request_metrics(exception=None):
+            # Requests that never produced a response
+            stats = self.current()
+            if stats is not None and not stats.closing:
+                self._finish_request(stats, request.method, 500)
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            return Response(self.render(), mimetype=CONTENT_TYPE_LATEST)
+
+        @app.route("/metrics/slowest", methods=["GET"])
+        def slowest_statements():
+            with self._lock:
+                return jsonify([
+                    {"db": db, "route": route, "seconds": seconds, "statement": statement}
+                    for (db, route), (seconds, statement) in sorted(self._slowest.items(), key=lambda item: -item[1][0])
+                ])
+
+    def _finish_request(self, stats: _RequestStats, method: str, status: int):
+        if self.current() is stats:
+            self._stats.set(None)
+        self.requests_total.labels(stats.route, method, str(status)).inc()
+        self.request_seconds.labels(stats.route, method).observe(time.perf_counter() - stats.started)
+        for db in self._engines:
+            self.request_statements.labels(db, stats.route).observe(stats.statements.get(db, 0))
+            self.request_db_seconds.labels(db, stats.route).observe(stats.seconds.get(db, 0.0))
+
+    # -- exposition --------------------------------------------------------
+
+    def render(self) -> bytes:
+        registry = self.registry
+        if registry is None:
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry, path=self.multiprocess_dir)
+            if self._writer_collector is not None:
+                registry.register(self._writer_collector)
+        return generate_latest(registry)
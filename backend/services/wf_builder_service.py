@@ -1,10 +1,10 @@
 import os
 import sys
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Union
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func, text
+from typing import Iterator, List, Dict, Optional, Tuple, Union
+from sqlalchemy.orm import Session, selectinload, contains_eager, joinedload
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy import bindparam, func, text, select, update, insert, delete
 from enum import Enum
 import logging
 
@@ -12,11 +12,27 @@ logger = logging.getLogger(__name__)
 
 # Append the backend path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from backend.models.SOP_tables import Workflow, Question, Option, QuestionType, Response, Answer, TempIncident, IncidentLog
+from backend.models.SOP_tables import workflow_name_key, Workflow, Question, Option, QuestionType, Response, Answer, TempIncident, TempIncidentSegment, IncidentLog, IncidentProgress, IncidentWorkflow
+from backend.services.cache import LRUCache
+from backend.services.workflow_cache import CompiledWorkflow, load_compiled_workflow
+from backend.services.timing import StageTimer
+
+
+def _workflow_page_conditions(after: Optional[int] = None, name_prefix: Optional[str] = None) -> list:
+    """WHERE clauses of a keyset page of workflows (workflow_id > after, optional name prefix)."""
+    conditions = []
+    if after is not None:
+        conditions.append(Workflow.workflow_id > after)
+    if name_prefix:
+        conditions.append(Workflow.workflow_name.startswith(name_prefix, autoescape=True))
+    return conditions
+
 
 class QuestionManagementService:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, workflow_cache: Optional[LRUCache] = None):
         self.db = db_session
+        # Shared with WorkflowBuilderService so both see the same compiled snapshots
+        self.workflow_cache = workflow_cache if workflow_cache is not None else LRUCache(maxsize=256)
     
     def get_last_question_id(self) -> int:
         """Get the last used question ID from the database"""
@@ -38,40 +54,110 @@ class QuestionManagementService:
             for q in questions
         ]
     
-    def get_all_workflow_questions(self) -> Dict[int, List[Dict]]:
-        """Get all workflows with their question IDs"""
-        workflows = self.db.query(Workflow).all()
-        result = {}
-        
-        for workflow in workflows:
-            result[workflow.workflow_id] = {
-                "workflow_name": workflow.workflow_name,
-                "questions": [
-                    {
-                        "question_id": q.question_id,
-                        "question_text": q.question_text,
-                        "question_type": q.question_type.value
-                    }
-                    for q in workflow.questions
-                ]
-            }
+    def get_all_workflow_questions(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        name_prefix: Optional[str] = None
+    ) -> Dict[int, Dict]:
+        """
+        Get workflows with their questions, keyed by workflow_id in keyset
+        (ascending workflow_id) order; the last key is the next page's cursor.
+
+        Args:
+            limit (int): Maximum number of workflows to return (all if None).
+            after (int): Keyset cursor; only workflows with a greater workflow_id are returned.
+            name_prefix (str): Only workflows whose name starts with this prefix.
+        """
+        # Column-only projections, two queries whatever the page size
+        conditions = _workflow_page_conditions(after, name_prefix)
+        workflow_query = select(Workflow.workflow_id, Workflow.workflow_name).where(
+            *conditions
+        ).order_by(Workflow.workflow_id)
+        if limit is not None:
+            workflow_query = workflow_query.limit(limit)
+
+        result = {
+            row.workflow_id: {"workflow_name": row.workflow_name, "questions": []}
+            for row in self.db.execute(workflow_query)
+        }
+        if not result:
+            return result
+
+        question_query = select(
+            Question.workflow_id, Question.question_id, Question.question_text, Question.question_type
+        ).join(Workflow, Question.workflow_id == Workflow.workflow_id).where(*conditions)
+        if limit is not None:
+            # Same keyset range as the workflow page
+            question_query = question_query.where(Workflow.workflow_id <= next(reversed(result)))
+        for row in self.db.execute(question_query.order_by(Question.workflow_id, Question.question_id)):
+            result[row.workflow_id]["questions"].append({
+                "question_id": row.question_id,
+                "question_text": row.question_text,
+                "question_type": row.question_type
+            })
         return result
     
-    def is_last_question(self, question_id: int) -> bool:
-        """Check if the given question is the last question in its workflow."""
+    def iter_all_workflow_questions(
+        self,
+        after: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        Stream (workflow_id, {"workflow_name", "questions"}) pairs ordered by workflow_id.
+
+        One outer-joined query read ``batch_size`` rows at a time (yield_per),
+        so memory stays flat however large the catalog is; only the workflow
+        being assembled is held.
+        """
+        query = select(
+            Workflow.workflow_id, Workflow.workflow_name,
+            Question.question_id, Question.question_text, Question.question_type
+        ).outerjoin(
+            Question, Question.workflow_id == Workflow.workflow_id
+        ).where(
+            *_workflow_page_conditions(after, name_prefix)
+        ).order_by(Workflow.workflow_id, Question.question_id).execution_options(yield_per=batch_size)
+
+        current_id, current = None, None
+        for row in self.db.execute(query):
+            if row.workflow_id != current_id:
+                if current is not None:
+                    yield current_id, current
+                current_id, current = row.workflow_id, {"workflow_name": row.workflow_name, "questions": []}
+            if row.question_id is not None:
+                current["questions"].append({
+                    "question_id": row.question_id,
+                    "question_text": row.question_text,
+                    "question_type": row.question_type
+                })
+        if current is not None:
+            yield current_id, current
+    
+    def is_last_question(self, question_id: int, workflow_id: Optional[int] = None) -> bool:
+        """
+        Check if the given question ends its workflow.
+
+        A question is last when it is one of the workflow's terminal
+        questions (nothing leads on from it; a null link means the next
+        question in order), which is a set lookup on the cached compiled
+        workflow. Passing workflow_id
+        skips the lookup of the question's workflow.
+        """
         try:
-            # Fetch the question based on the provided question_id
-            question = self.db.query(Question).filter(Question.question_id == question_id).first()
-            if not question:
+            if workflow_id is None:
+                workflow_id = self.db.query(Question.workflow_id).filter(
+                    Question.question_id == question_id
+                ).scalar()
+                if workflow_id is None:
+                    raise ValueError(f"Question with ID {question_id} not found.")
+
+            workflow = load_compiled_workflow(self.db, self.workflow_cache, workflow_id)
+            if workflow.question(question_id) is None:
                 raise ValueError(f"Question with ID {question_id} not found.")
 
-            # Get the maximum question ID for the workflow associated with the question
-            max_question_id = self.db.query(func.max(Question.question_id)).filter(
-                Question.workflow_id == question.workflow_id
-            ).scalar()
-
-            # Return True if the current question ID is the maximum question ID
-            return question_id == max_question_id
+            return question_id in workflow.terminal_question_ids
 
         except Exception as e:
             logger.error(f"Error checking if question {question_id} is the last: {str(e)}")
@@ -87,36 +173,76 @@ class QuestionManagementService:
 
 
 class WorkflowBuilderService:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, workflow_cache: Optional[LRUCache] = None,
+                 name_cache: Optional[LRUCache] = None, binding_cache: Optional[LRUCache] = None):
         self.db = db_session
+        # Process-local cache of CompiledWorkflow snapshots keyed by workflow_id
+        self.workflow_cache = workflow_cache if workflow_cache is not None else LRUCache(maxsize=256)
+        # Process-local workflow_name_key -> workflow_id map; only existing names are cached
+        self.name_cache = name_cache if name_cache is not None else LRUCache(maxsize=1024)
+        # incident_number -> workflow_id bindings, shared with AnswerService
+        self.binding_cache = binding_cache
+
+    def _lookup_workflow_id(self, workflow_name: str) -> Optional[int]:
+        """workflow_id of a name (case-insensitive), from the name cache or the unique index."""
+        key = workflow_name_key(workflow_name)
+        workflow_id = self.name_cache.get(key)
+        if workflow_id is not None:
+            return workflow_id
+
+        generation = self.name_cache.generation
+        workflow_id = self.db.scalar(
+            select(Workflow.workflow_id).where(Workflow.workflow_name_key == key)
+        )
+        if workflow_id is not None:
+            self.name_cache.set(key, workflow_id, generation=generation)
+        return workflow_id
         
-    def is_workflow_name_unique(self, workflow_name):
+    def is_workflow_name_unique(self, workflow_name, exclude_workflow_id: Optional[int] = None):
         """
         Check if a workflow name is unique in a case-insensitive manner.
         
         Args:
             workflow_name (str): The name of the workflow to check
+            exclude_workflow_id (int): Workflow allowed to hold the name (the one being renamed)
         
         Returns:
             bool: True if the workflow name is unique, False otherwise
         """
-        # Ensure the name is stripped and lowercase for consistent comparison
-        workflow_name = workflow_name.strip().lower()
-        
-        # Use SQLAlchemy to query for existing workflows with the same name
-        existing_workflow = self.db.query(Workflow).filter(
-            func.lower(Workflow.workflow_name) == workflow_name
-        ).first()
-        
-        # Return True if no existing workflow is found, False otherwise
-        return existing_workflow is None
+        workflow_id = self._lookup_workflow_id(workflow_name)
+        return workflow_id is None or workflow_id == exclude_workflow_id
 
     def create_workflow(self, workflow_data: Dict) -> Workflow:
-        """Create a new workflow with all its questions and options"""
+        """
+        Create a new workflow with all its questions and options.
+
+        Questions and options are written with bulk statements rather than one
+        flush per row: the workflow INSERT, an ordered INSERT .. RETURNING for
+        all questions (ids come back in payload order), one executemany INSERT
+        for all options with their position-based next_question_id already
+        resolved, and one executemany UPDATE for the questions' own
+        next_question_id. Everything is committed once.
+
+        Whether the question INSERT is one statement depends on the dialect:
+        SQL Server batches it (OUTPUT inserted.question_id, ordered by an
+        insert sentinel), SQLite has no sentinel and sends one INSERT per
+        question. The executemany statements are single calls on both.
+        """
         try:
+            questions_data = workflow_data["questions"]
+
+            # Validate every question type before touching the database
+            question_types = []
+            for question_data in questions_data:
+                try:
+                    question_types.append(QuestionType(question_data["question_type"]).value)
+                except ValueError:
+                    raise ValueError(f"Invalid question type: {question_data['question_type']}")
+
             # Create workflow
             workflow = Workflow(
                 workflow_name=workflow_data["workflow_name"],
+                workflow_name_key=workflow_name_key(workflow_data["workflow_name"]),
                 incident_type=workflow_data["incident_type"]
             )
             self.db.add(workflow)
@@ -128,55 +254,57 @@ class WorkflowBuilderService:
                 logger.error(f"Error flushing workflow: {str(e)}")
                 raise
 
-            # Keep track of question positions and their actual IDs
-            position_to_question: Dict[int, Question] = {}
-            option_updates: List[tuple] = []  # Store (option, next_position) pairs
-            
-            # First pass: Create all questions without next_question_id
-            for position, question_data in enumerate(workflow_data["questions"], start=1):
-                try:
-                    question = self.add_question(
-                        workflow_id=workflow.workflow_id,
-                        question_text=question_data["question_text"],
-                        question_type=question_data["question_type"],
-                        is_required=question_data.get("is_required", True),
-                        is_completed=question_data.get("is_completed", False)
-                    )
-                    position_to_question[position] = question
-                    
-                    # Create options without next_question_id
-                    if "options" in question_data:
-                        for option_data in question_data["options"]:
-                            option = self.add_option(
-                                question_id=question.question_id,
-                                option_text=option_data["option_text"],
-                                is_completed=option_data.get("is_completed", False)
-                            )
-                            # Store the option and its target question position for later update
-                            if "next_question_id" in option_data:
-                                option_updates.append((option, option_data["next_question_id"]))
-                                
-                except SQLAlchemyError as e:
-                    logger.error(f"Error adding question or options: {str(e)}")
-                    raise
-
-            # Second pass: Update next_question_id references
-            for question_position, question_data in enumerate(workflow_data["questions"], start=1):
-                current_question = position_to_question[question_position]
-                
-                # Update question's next_question_id if present
-                if "next_question_id" in question_data:
-                    next_position = question_data["next_question_id"]
-                    if next_position in position_to_question:
-                        current_question.next_question_id = position_to_question[next_position].question_id
+            # First pass: insert all questions at once, ids returned in parameter order
+            position_to_question_id: Dict[int, int] = {}
+            if questions_data:
+                question_ids = self.db.scalars(
+                    insert(Question).returning(Question.question_id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "workflow_id": workflow.workflow_id,
+                            "question_text": question_data["question_text"],
+                            "question_type": question_type,
+                            "is_required": question_data.get("is_required", True),
+                            "is_completed": question_data.get("is_completed", False)
+                        }
+                        for question_data, question_type in zip(questions_data, question_types)
+                    ]
+                ).all()
+                position_to_question_id = dict(enumerate(question_ids, start=1))
+
+            # Second pass: options and next_question_id references, resolved in memory
+            option_rows = []
+            question_links = []
+            for position, question_data in enumerate(questions_data, start=1):
+                question_id = position_to_question_id[position]
+
+                next_position = question_data.get("next_question_id")
+                if next_position in position_to_question_id:
+                    question_links.append({
+                        "question_id": question_id,
+                        "next_question_id": position_to_question_id[next_position]
+                    })
 
-            # Update option next_question_id references
-            for option, next_position in option_updates:
-                if next_position in position_to_question:
-                    option.next_question_id = position_to_question[next_position].question_id
+                for option_data in question_data.get("options") or []:
+                    option_rows.append({
+                        "question_id": question_id,
+                        "option_text": option_data["option_text"],
+                        "next_question_id": position_to_question_id.get(option_data.get("next_question_id")),
+                        "is_completed": option_data.get("is_completed", False)
+                    })
+
+            if option_rows:
+                # Core INSERT so rows with and without a link go out as one executemany
+                # (ORM bulk INSERT splits batches wherever a value is None)
+                self.db.execute(Option.__table__.insert(), option_rows)
+            if question_links:
+                # ORM bulk UPDATE by primary key, sent as one executemany
+                self.db.execute(update(Question), question_links)
 
             self.db.commit()
-            logger.debug("Workflow creation completed successfully")
+            self.workflow_cache.invalidate(workflow.workflow_id)
+            self.name_cache.set(workflow.workflow_name_key, workflow.workflow_id)
+            logger.debug(f"Workflow creation completed successfully: {len(questions_data)} questions, {len(option_rows)} options")
             return workflow
 
         except Exception as e:
@@ -196,10 +324,16 @@ class WorkflowBuilderService:
                 logger.warning(f"Attempted to delete non-existent workflow with ID: {workflow_id}")
                 return False
             
-            # Delete associated responses first to avoid FK constraint issues
+            # Delete associated responses and step counters first to avoid FK constraint issues
             self.db.query(Response).filter(
                 Response.workflow_id == workflow_id
             ).delete(synchronize_session=False)
+            self.db.query(IncidentProgress).filter(
+                IncidentProgress.workflow_id == workflow_id
+            ).delete(synchronize_session=False)
+            self.db.query(IncidentWorkflow).filter(
+                IncidentWorkflow.workflow_id == workflow_id
+            ).delete(synchronize_session=False)
             
             # The workflow deletion will cascade to questions, which will cascade to:
             # - options (via cascade="all, delete-orphan")
@@ -207,6 +341,11 @@ class WorkflowBuilderService:
             self.db.delete(workflow)
             
             self.db.commit()
+            self.workflow_cache.invalidate(workflow_id)
+            self.name_cache.invalidate(workflow.workflow_name_key)
+            if self.binding_cache is not None:
+                # Keyed by incident; workflow deletions are rare enough to drop them all
+                self.binding_cache.clear()
             logger.info(f"Successfully deleted workflow {workflow_id} and all associated data")
             return True
             
@@ -215,68 +354,232 @@ class WorkflowBuilderService:
             self.db.rollback()
             raise
     
-    def update_workflow(self, workflow_id: int, workflow_data: Dict) -> Workflow:
+    def update_workflow(self, workflow_id: int, workflow_data: Dict) -> Dict:
+        """
+        Bring a stored workflow in line with the given payload and return what changed.
+
+        The payload lists the desired questions: they are matched to stored ones by
+        question_id and options by option_id within their own question; entries
+        without a known id are inserted, stored questions/options missing from the
+        payload are deleted, and only fields that are present and actually differ
+        are updated, so a GET /workflows/<id> payload round-trips without writes.
+        next_question_id values are real question ids and must point to a
+        question kept in this workflow. All writes are bulk statements (one per
+        kind of change) committed once, so fixing a single typo updates one row.
+
+        Omitting "questions" leaves the questions untouched, omitting a
+        question's "options" leaves its options untouched.
+
+        Returns:
+            dict: {"workflow": bool, "questions": {...}, "options": {...}}
+            where the nested dicts count inserted/updated/deleted rows.
+
+        Raises:
+            ValueError: If the workflow does not exist, a question type or
+                next_question_id is invalid, or a question would be deleted
+                that already has responses or is still linked to by a kept
+                question or option.
+        """
+        summary = {
+            "workflow": False,
+            "questions": {"inserted": 0, "updated": 0, "deleted": 0},
+            "options": {"inserted": 0, "updated": 0, "deleted": 0},
+        }
         try:
-            workflow = self.db.query(Workflow).filter(Workflow.workflow_id == workflow_id).first()
+            workflow = self.db.get(Workflow, workflow_id)
             if not workflow:
                 raise ValueError(f"Workflow {workflow_id} not found")
 
-            # Update workflow-level fields
-            workflow.workflow_name = workflow_data["workflow_name"]
-            workflow.incident_type = workflow_data["incident_type"]
-
-            # Update questions
-            existing_questions = {q.question_id: q for q in workflow.questions}
-            new_questions = []
-            for question_data in workflow_data["questions"]:
-                question_id = question_data.get("question_id")
-                if question_id and question_id in existing_questions:
-                    # Update existing question
-                    question = existing_questions[question_id]
-                    question.question_text = question_data["question_text"]
-                    question.question_type = question_data["question_type"]
-                    question.is_required = question_data.get("is_required", True)
-                    question.is_completed = question_data.get("is_completed", False)
-                    question.next_question_id = question_data.get("next_question_id")
-                else:
-                    # Create new question
-                    question = self.add_question(
-                        workflow_id=workflow.workflow_id,
-                        question_text=question_data["question_text"],
-                        question_type=question_data["question_type"],
-                        is_required=question_data.get("is_required", True),
-                        is_completed=question_data.get("is_completed", False),
-                        next_question_id=question_data.get("next_question_id")
-                    )
-                    new_questions.append(question)
-
-            # Update options
-            for question in new_questions + list(existing_questions.values()):
-                existing_options = {o.option_id: o for o in question.options}
-                for option_data in question_data.get("options", []):
-                    option_id = option_data.get("option_id")
-                    if option_id and option_id in existing_options:
-                        # Update existing option
-                        option = existing_options[option_id]
-                        option.option_text = option_data["option_text"]
-                        option.next_question_id = option_data.get("next_question_id")
-                        option.is_completed = option_data.get("is_completed", False)
-                    else:
-                        # Create new option
-                        option = self.add_option(
-                            question_id=question.question_id,
-                            option_text=option_data["option_text"],
-                            next_question_id=option_data.get("next_question_id"),
-                            is_completed=option_data.get("is_completed", False)
-                        )
+            # Workflow-level fields; the ORM only writes the row if a value differs
+            old_name_key = workflow.workflow_name_key
+            for key in ("workflow_name", "incident_type"):
+                if key in workflow_data and getattr(workflow, key) != workflow_data[key]:
+                    setattr(workflow, key, workflow_data[key])
+                    summary["workflow"] = True
+            workflow.workflow_name_key = workflow_name_key(workflow.workflow_name)
+
+            if "questions" in workflow_data:
+                self._apply_question_diff(workflow_id, workflow_data["questions"] or [], summary)
 
             self.db.commit()
-            return workflow
+            self.workflow_cache.invalidate(workflow_id)
+            if workflow.workflow_name_key != old_name_key:
+                self.name_cache.invalidate(old_name_key)
+            logger.debug(f"Workflow {workflow_id} updated: {summary}")
+            return summary
 
         except Exception as e:
+            logger.error(f"Error in update_workflow: {str(e)}")
             self.db.rollback()
             raise
 
+    _QUESTION_FIELDS = ("question_text", "question_type", "is_required", "is_completed", "next_question_id")
+    _OPTION_FIELDS = ("option_text", "next_question_id", "is_completed")
+
+    @staticmethod
+    def _new_option_row(question_id: int, option_data: Dict) -> Dict:
+        return {
+            "question_id": question_id,
+            "option_text": option_data["option_text"],
+            "next_question_id": option_data.get("next_question_id"),
+            "is_completed": option_data.get("is_completed", False),
+        }
+
+    def _apply_question_diff(self, workflow_id: int, questions_data: List[Dict], summary: Dict):
+        """Diff questions/options of a workflow against the payload and write the changes in bulk."""
+        # Stored graph as plain rows: two queries, no ORM objects
+        stored_questions = {
+            row.question_id: row for row in self.db.execute(
+                select(
+                    Question.question_id, Question.question_text, Question.question_type,
+                    Question.is_required, Question.is_completed, Question.next_question_id
+                ).where(Question.workflow_id == workflow_id)
+            )
+        }
+        stored_options: Dict[int, Dict[int, object]] = {question_id: {} for question_id in stored_questions}
+        for row in self.db.execute(
+            select(
+                Option.option_id, Option.question_id, Option.option_text,
+                Option.next_question_id, Option.is_completed
+            ).join(Question, Option.question_id == Question.question_id).where(Question.workflow_id == workflow_id)
+        ):
+            stored_options[row.question_id][row.option_id] = row
+
+        kept_ids = {
+            question_data.get("question_id") for question_data in questions_data
+            if question_data.get("question_id") in stored_questions
+        }
+
+        def check_link(next_question_id):
+            if next_question_id is not None and next_question_id not in kept_ids:
+                raise ValueError(f"next_question_id {next_question_id} is not a question of workflow {workflow_id}")
+            return next_question_id
+
+        question_updates = []
+        new_questions = []
+        option_updates = []
+        option_inserts = []
+        deleted_option_ids = []
+        # (question_id, next_question_id) of kept questions and options after the update
+        remaining_links = []
+        seen_question_ids = set()
+
+        for question_data in questions_data:
+            question_id = question_data.get("question_id")
+            is_new = question_id not in stored_questions or question_id in seen_question_ids
+            if "question_type" in question_data or is_new:
+                try:
+                    question_type = QuestionType(question_data["question_type"]).value
+                except ValueError:
+                    raise ValueError(f"Invalid question type: {question_data['question_type']}")
+            if "next_question_id" in question_data:
+                check_link(question_data["next_question_id"])
+            options_data = question_data.get("options") or []
+
+            if is_new:
+                new_questions.append(({
+                    "question_text": question_data["question_text"],
+                    "question_type": question_type,
+                    "is_required": question_data.get("is_required", True),
+                    "is_completed": question_data.get("is_completed", False),
+                    "next_question_id": question_data.get("next_question_id"),
+                }, options_data))
+                continue
+            seen_question_ids.add(question_id)
+
+            # Fields left out of the payload keep their stored value
+            desired = {key: question_data[key] for key in self._QUESTION_FIELDS if key in question_data}
+            if "question_type" in desired:
+                desired["question_type"] = question_type
+            stored = stored_questions[question_id]
+            changed = {key: value for key, value in desired.items() if getattr(stored, key) != value}
+            if changed:
+                question_updates.append({"question_id": question_id, **changed})
+            remaining_links.append((question_id, desired.get("next_question_id", stored.next_question_id)))
+
+            # Omitting "options" leaves the stored options untouched
+            existing_options = stored_options[question_id]
+            if "options" not in question_data:
+                remaining_links.extend((question_id, option.next_question_id) for option in existing_options.values())
+                continue
+
+            # Options are diffed against this question's own stored options
+            seen_option_ids = set()
+            for option_data in options_data:
+                if "next_question_id" in option_data:
+                    check_link(option_data["next_question_id"])
+                option_id = option_data.get("option_id")
+                if option_id in existing_options and option_id not in seen_option_ids:
+                    seen_option_ids.add(option_id)
+                    stored_option = existing_options[option_id]
+                    changed = {
+                        key: option_data[key] for key in self._OPTION_FIELDS
+                        if key in option_data and getattr(stored_option, key) != option_data[key]
+                    }
+                    if changed:
+                        option_updates.append({"option_id": option_id, **changed})
+                    remaining_links.append((question_id, option_data.get("next_question_id", stored_option.next_question_id)))
+                else:
+                    option_inserts.append(self._new_option_row(question_id, option_data))
+            deleted_option_ids.extend(option_id for option_id in existing_options if option_id not in seen_option_ids)
+
+        deleted_question_ids = [question_id for question_id in stored_questions if question_id not in kept_ids]
+        if deleted_question_ids:
+            # Stored links of kept questions/options must not point at a removed question
+            removed = set(deleted_question_ids)
+            dangling = sorted({
+                question_id for question_id, next_question_id in remaining_links if next_question_id in removed
+            })
+            if dangling:
+                raise ValueError(
+                    f"Questions {dangling} still link to a question that would be removed; "
+                    f"update their next_question_id as well"
+                )
+            answered = self.db.scalars(
+                select(Response.question_id).where(Response.question_id.in_(deleted_question_ids)).distinct()
+            ).all()
+            if answered:
+                raise ValueError(f"Questions {sorted(answered)} have recorded responses and cannot be removed")
+            for question_id in deleted_question_ids:
+                deleted_option_ids.extend(stored_options[question_id])
+
+        # New questions: one INSERT .. RETURNING, ids come back in payload order
+        if new_questions:
+            new_ids = self.db.scalars(
+                insert(Question).returning(Question.question_id, sort_by_parameter_order=True),
+                [{"workflow_id": workflow_id, **desired} for desired, _ in new_questions]
+            ).all()
+            for question_id, (_, options_data) in zip(new_ids, new_questions):
+                for option_data in options_data:
+                    if "next_question_id" in option_data:
+                        check_link(option_data["next_question_id"])
+                    option_inserts.append(self._new_option_row(question_id, option_data))
+
+        if question_updates:
+            # ORM bulk UPDATE by primary key, one executemany per set of changed columns
+            self.db.execute(update(Question), question_updates)
+        if option_updates:
+            self.db.execute(update(Option), option_updates)
+        if option_inserts:
+            # Core INSERT so rows with and without a link go out as one executemany
+            self.db.execute(Option.__table__.insert(), option_inserts)
+        if deleted_option_ids:
+            self.db.execute(delete(Option).where(Option.option_id.in_(deleted_option_ids)))
+        if deleted_question_ids:
+            self.db.execute(delete(Answer).where(Answer.question_id.in_(deleted_question_ids)))
+            self.db.execute(delete(Question).where(Question.question_id.in_(deleted_question_ids)))
+
+        summary["questions"] = {
+            "inserted": len(new_questions),
+            "updated": len(question_updates),
+            "deleted": len(deleted_question_ids),
+        }
+        summary["options"] = {
+            "inserted": len(option_inserts),
+            "updated": len(option_updates),
+            "deleted": len(deleted_option_ids),
+        }
+
     def add_question(
         self,
         workflow_id: int,
@@ -322,77 +625,81 @@ class WorkflowBuilderService:
         self.db.flush()
         return option
 
-    def get_workflow_structure(self, workflow_id: int) -> Dict:
-        """Get the complete workflow structure with questions and options."""
-        workflow = self.db.query(Workflow).filter(
-            Workflow.workflow_id == workflow_id
-        ).first()
-        
-        if not workflow:
-            raise ValueError(f"Workflow {workflow_id} not found")
-
-        questions = []
-        for question in workflow.questions:
-            question_data = {
-                "question_id": question.question_id,
-                "question_text": question.question_text,
-                "question_type": question.question_type,
-                "is_required": question.is_required,
-            }
-
-            # Add next_question_id for subjective questions and instructions
-            if question.question_type in [QuestionType.SUBJECTIVE, QuestionType.INSTRUCTION]:
-                question_data["next_question_id"] = question.next_question_id
-            
-            # Add is_completed only for instruction questions
-            if question.question_type == QuestionType.INSTRUCTION:
-                question_data["is_completed"] = question.is_completed
-
-            # Add options for multiple choice and checkbox questions
-            if question.question_type in [QuestionType.MULTIPLE_CHOICE, QuestionType.CHECKBOX]:
-                options = []
-                for option in question.options:
-                    options.append({
-                        "option_id": option.option_id,
-                        "option_text": option.option_text,
-                        "next_question_id": option.next_question_id,
-                        "is_completed": option.is_completed
-                    })
-                question_data["options"] = options
+    def get_compiled_workflow(self, workflow_id: int) -> CompiledWorkflow:
+        """
+        Return the immutable snapshot of a workflow, compiling and caching it on a miss.
 
-            questions.append(question_data)
+        Raises:
+            ValueError: If the workflow does not exist.
+        """
+        return load_compiled_workflow(self.db, self.workflow_cache, workflow_id)
 
-        return {
-            "workflow_name": workflow.workflow_name,
-            "incident_type": workflow.incident_type,
-            "questions": questions
-        }
+    def get_workflow_structure(self, workflow_id: int) -> Dict:
+        """Get the complete workflow structure with questions and options."""
+        return self.get_compiled_workflow(workflow_id).to_structure()
         
-    def get_all_workflow_details(self) -> List[Dict]:
-        """Fetch detailed information of all workflows."""
-        workflows = self.db.query(Workflow).all()
+    def get_all_workflow_details(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        name_prefix: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Fetch detailed information of workflows, ordered by workflow_id.
 
-        if not workflows:
-            return []
+        Args:
+            limit (int): Maximum number of workflows to return (all if None).
+            after (int): Keyset cursor; only workflows with a greater workflow_id are returned.
+            name_prefix (str): Only workflows whose name starts with this prefix.
+        """
+        # Column-only projection: no Workflow entities are built
+        query = select(
+            Workflow.workflow_id, Workflow.workflow_name, Workflow.incident_type, Workflow.created_at
+        ).where(*_workflow_page_conditions(after, name_prefix)).order_by(Workflow.workflow_id)
+        if limit is not None:
+            query = query.limit(limit)
 
         return [
             {
-                "workflow_id": workflow.workflow_id,
-                "workflow_name": workflow.workflow_name,
-                "incident_type": workflow.incident_type,
-                "created_at": workflow.created_at.isoformat()
+                "workflow_id": row.workflow_id,
+                "workflow_name": row.workflow_name,
+                "incident_type": row.incident_type,
+                "created_at": row.created_at.isoformat()
             }
-            for workflow in workflows
+            for row in self.db.execute(query)
         ]
         
         
+    def iter_all_workflow_details(
+        self,
+        after: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Iterator[Dict]:
+        """Stream the get_all_workflow_details entries, reading ``batch_size`` rows at a time (yield_per)."""
+        query = select(
+            Workflow.workflow_id, Workflow.workflow_name, Workflow.incident_type, Workflow.created_at
+        ).where(
+            *_workflow_page_conditions(after, name_prefix)
+        ).order_by(Workflow.workflow_id).execution_options(yield_per=batch_size)
+
+        for row in self.db.execute(query):
+            yield {
+                "workflow_id": row.workflow_id,
+                "workflow_name": row.workflow_name,
+                "incident_type": row.incident_type,
+                "created_at": row.created_at.isoformat()
+            }
+
     def get_questions_and_options(self, workflow_id: int) -> List[Dict]:
         """
         Fetch all questions and their associated options for a specific workflow.
         """
         try:
-            # Fetch all questions for the workflow
-            questions = self.db.query(Question).filter(Question.workflow_id == workflow_id).all()
+            # Fetch all questions for the workflow, with their options in one extra query
+            questions = self.db.query(Question).options(
+                selectinload(Question.options)
+            ).filter(Question.workflow_id == workflow_id).order_by(Question.question_id).all()
 
             if not questions:
                 raise ValueError(f"No questions found for workflow_id: {workflow_id}")
@@ -434,20 +741,10 @@ class WorkflowBuilderService:
             int or None: The workflow_id if found, otherwise None.
         """
         try:
-            # Strip and convert to lowercase for case-insensitive comparison
-            workflow_name = workflow_name.strip().lower()
-
-            # Query to find the workflow_id
-            workflow = self.db.query(Workflow).filter(
-                func.lower(Workflow.workflow_name) == workflow_name
-            ).first()
-
-            if workflow:
-                return workflow.workflow_id
-            return None
+            return self._lookup_workflow_id(workflow_name)
 
         except Exception as e:
-            print(f"Error fetching workflow_id: {str(e)}")
+            logger.error(f"Error fetching workflow_id: {str(e)}")
             return None
         
     def close_session(self):
@@ -458,69 +755,321 @@ class WorkflowBuilderService:
             except Exception as e:
                 logger.error(f"Error closing database session: {str(e)}")
 
+
+def format_transcript_entry(question_number: int, question_text: str, answer_text: str, answered_at: str) -> str:
+    """Format one answered step the way it is appended to TempIncident and IncidentLog_TBL."""
+    return f"""{question_number}. {question_text}{chr(13)}{chr(10)}{answer_text}{chr(13)}{chr(10)}Timestamp: {answered_at}{chr(13)}{chr(10)}"""
+
     
 class AnswerService:
-    def __init__(self, db_session):
+    def __init__(self, db_session, vc_service: Optional["VC_DB_Service"] = None, incidentlog_writer=None,
+                 materialize_transcripts: bool = True, binding_cache: Optional[LRUCache] = None):
         self.db = db_session
-        self.vc_service = VC_DB_Service(db_session)
-
-    def _get_workflow_id(self, question_id: int) -> int:
+        # Process-local incident_number -> workflow_id map; only bound incidents are cached
+        self.binding_cache = binding_cache if binding_cache is not None else LRUCache(maxsize=4096)
+        # Fold transcript segments back into text_mme once the last question is answered
+        self.materialize_transcripts = materialize_transcripts
+        # VC lookups and the IncidentLog_TBL update go through the VC session when one is given
+        self.vc_service = vc_service or VC_DB_Service(db_session)
+        # Optional write-behind queue for IncidentLog_TBL appends (see incidentlog_writer.py)
+        self.incidentlog_writer = incidentlog_writer
+
+    def submit_answer(
+        self,
+        workflow: CompiledWorkflow,
+        question_id: int,
+        answer_text: str,
+        incident_number: str,
+        answered_at: str,
+        question_text: Optional[str] = None,
+        building_frk: Optional[int] = None
+    ) -> Dict:
         """
-        Helper function to retrieve the workflow_id for a given question_id.
+        Record one answer in a single sop-manage transaction, then append it to IncidentLog_TBL.
+
+        Args:
+            workflow (CompiledWorkflow): Snapshot of the workflow being answered.
+            question_id (int): The question being answered.
+            answer_text (str): The answer as displayed in the transcript.
+            incident_number (str): The incident the SOP is run for.
+            answered_at (str): Formatted local time of the answer.
+            question_text (str): Optional override of the question text.
+            building_frk (int): Building of the incident, used for the SOP heading.
+
+        Returns:
+            dict: answer_id, response_id, question_number, is_last_question and
+            per-stage ``timings`` in milliseconds.
+
+        Raises:
+            ValueError: If the question is not part of the workflow.
         """
-        question = self.db.query(Question).filter(Question.question_id == question_id).first()
-        if not question:
-            raise ValueError(f"Invalid question_id: {question_id} does not exist.")
-        
-        return question.workflow_id
-    
-    def save_answer(self, question_id: int, answer_text: str, incident_number: str) -> dict:
+        result = self.submit_answers(
+            workflow=workflow,
+            incident_number=incident_number,
+            answers=[{
+                "question_id": question_id,
+                "answer_text": answer_text,
+                "answered_at": answered_at,
+                "question_text": question_text
+            }],
+            building_frk=building_frk
+        )
+        saved = result["answers"][0]
+        return {
+            "answer_id": saved["answer_id"],
+            "response_id": saved["response_id"],
+            "question_number": saved["question_number"],
+            "is_last_question": result["is_last_question"],
+            "timings": result["timings"]
+        }
+
+    def submit_answers(
+        self,
+        workflow: CompiledWorkflow,
+        incident_number: str,
+        answers: List[Dict],
+        building_frk: Optional[int] = None
+    ) -> Dict:
         """
-        Save an answer for a specific question and populate the Response table.
+        Record an ordered block of answers for one incident in a single sop-manage transaction.
+
+        Questions are validated against the compiled workflow snapshot, so no
+        question or workflow rows are read. A block that continues a run
+        sends the step-counter UPDATE, one transcript segment INSERT, one
+        INSERT .. RETURNING for the Answer rows and one for the Response
+        rows, then commits. SQL Server runs each of those INSERTs once for
+        the whole block; SQLite has no insert sentinel and sends them one
+        row per statement, i.e. two statements per answer.
+
+        The first block of a run adds the COUNT that seeds the step counter,
+        the counter and incident binding INSERTs (each in a savepoint, so a
+        concurrent first answer loses cleanly) and the lookup and INSERT of
+        the TempIncident row. A block that reaches a terminal question folds
+        the transcript instead of inserting a segment (see _fold_segments:
+        two SELECTs, an UPDATE and a DELETE), still before the one commit.
+
+        After the commit the block is appended to IncidentLog_TBL: the SOP
+        heading lookups (category directory and persons cache, where
+        configured, spare the VC queries) and one UPDATE, or a queue entry
+        when write-behind is enabled.
+
+        Args:
+            workflow (CompiledWorkflow): Snapshot of the workflow being answered.
+            incident_number (str): The incident the SOP is run for.
+            answers (list): Dicts with question_id, answer_text, answered_at
+                (formatted local time) and optionally question_text, in the
+                order they were answered.
+            building_frk (int): Building of the incident, used for the SOP heading.
+
+        Returns:
+            dict: ``answers`` (answer_id, response_id, question_id and
+            question_number per entry), is_last_question and per-stage
+            ``timings`` in milliseconds.
+
+        Raises:
+            ValueError: If the block is empty or a question is not part of the workflow.
         """
+        timer = StageTimer()
+
+        with timer.stage("resolve"):
+            if not answers:
+                raise ValueError("At least one answer is required.")
+            question_texts = []
+            for entry in answers:
+                question = workflow.question(entry["question_id"])
+                if question is None:
+                    raise ValueError(f"Question {entry['question_id']} is not part of workflow {workflow.workflow_id}.")
+                question_texts.append(entry.get("question_text") or question.question_text)
+            is_last_question = any(entry["question_id"] in workflow.terminal_question_ids for entry in answers)
+            fold = is_last_question and self.materialize_transcripts
+
         try:
-            # Fetch workflow_id
-            workflow_id = self._get_workflow_id(question_id)
-
-            # Create and save the Answer object
-            answer = Answer(
-                question_id=question_id,
-                answer_text=answer_text,
-                rendered_at=datetime.utcnow(),
-                submitted_at=datetime.utcnow()
+            with timer.stage("step"):
+                first_number = self._reserve_step_numbers(workflow.workflow_id, incident_number, len(answers))
+                formatted_texts = [
+                    format_transcript_entry(first_number + i, question_text, entry["answer_text"], entry["answered_at"])
+                    for i, (entry, question_text) in enumerate(zip(answers, question_texts))
+                ]
+
+            with timer.stage("persist"):
+                # Earlier steps of this run imply the TempIncident row and the binding exist already
+                bound_workflow_id = None
+                if first_number == 1:
+                    binding_generation = self.binding_cache.generation
+                    bound_workflow_id = self._bind_incident(incident_number, workflow.workflow_id)
+                    now = datetime.now(timezone.utc)
+                    existing = self.db.scalar(
+                        select(TempIncident.incident_number).where(TempIncident.incident_number == incident_number)
+                    )
+                    if existing is None:
+                        self.db.execute(insert(TempIncident).values(
+                            incident_number=incident_number,
+                            text_mme=f"*Start SOP* {now}{chr(13)}{chr(10)}{chr(13)}{chr(10)}",
+                            created_at=now,
+                            updated_at=now
+                        ))
+
+                # The transcript is written with plain statements, never through TempIncident or
+                # segment objects: a folded segment id the database hands out again cannot then
+                # meet a stale identity left in the session
+                block_text = "\n".join(formatted_texts)
+                if fold:
+                    # The run ends with this block: fold it and the earlier segments into text_mme
+                    # in this transaction, so answers and transcript commit together or not at all
+                    self._fold_segments(incident_number, block_text)
+                else:
+                    # The transcript only grows by one segment row, whatever its length so far
+                    self.db.execute(insert(TempIncidentSegment).values(incident_number=incident_number, text=block_text))
+
+                # One INSERT .. RETURNING per table for the whole block, ids in payload order
+                # (SQL Server batches these; SQLite sends one row per statement, see create_workflow)
+                submitted_at = datetime.utcnow()
+                answer_ids = self.db.scalars(
+                    insert(Answer).returning(Answer.answer_id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "question_id": entry["question_id"],
+                            "answer_text": entry["answer_text"],
+                            "rendered_at": submitted_at,
+                            "submitted_at": submitted_at
+                        }
+                        for entry in answers
+                    ]
+                ).all()
+                response_ids = self.db.scalars(
+                    insert(Response).returning(Response.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "incident_number": incident_number,
+                            "workflow_id": workflow.workflow_id,
+                            "question_id": entry["question_id"],
+                            "answer_id": answer_id
+                        }
+                        for entry, answer_id in zip(answers, answer_ids)
+                    ]
+                ).all()
+                saved = [
+                    (entry["question_id"], answer_id, response_id)
+                    for entry, answer_id, response_id in zip(answers, answer_ids, response_ids)
+                ]
+                self.db.commit()
+                if bound_workflow_id is not None:
+                    self.binding_cache.set(incident_number, bound_workflow_id, generation=binding_generation)
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise RuntimeError(f"Database error while saving answers: {str(e)}")
+
+        with timer.stage("incidentlog"):
+            self.update_incidentlog_details(
+                incident_number=incident_number,
+                new_text=f"{chr(13)}{chr(10)}".join(formatted_texts),
+                workflow_name=workflow.workflow_name,
+                building_frk=building_frk
             )
-            self.db.add(answer)
-            self.db.flush()  # Get answer_id after flush
-
-            # Check if incident_number exists in TempIncident
-            temp_incident = self.db.query(TempIncident).filter_by(incident_number=incident_number).first()
-            if not temp_incident:
-                timestamp = datetime.now(timezone.utc)
-                # Create a new TempIncident if it doesn't exist
-                temp_incident = TempIncident(
+
+        logger.debug(f"{len(answers)} answer(s) for incident {incident_number} timings (ms): {timer.timings}")
+        return {
+            "answers": [
+                {
+                    "question_id": question_id,
+                    "answer_id": answer_id,
+                    "response_id": response_id,
+                    "question_number": first_number + i
+                }
+                for i, (question_id, answer_id, response_id) in enumerate(saved)
+            ],
+            "is_last_question": is_last_question,
+            "timings": timer.timings
+        }
+
+    def _reserve_step_numbers(self, workflow_id: int, incident_number: str, count: int) -> int:
+        """
+        Advance the incident's step counter by count and return the first reserved step number.
+
+        The counter row is updated in the caller's transaction, so it is
+        locked until the responses are committed and concurrent answers for
+        the same incident get consecutive numbers. Costs one UPDATE however
+        many steps came before; only the first answer of an incident run
+        seeds the counter with a COUNT of responses recorded before the
+        counter existed.
+        """
+        step_count = self.db.execute(
+            update(IncidentProgress)
+            .where(
+                IncidentProgress.incident_number == incident_number,
+                IncidentProgress.workflow_id == workflow_id
+            )
+            .values(step_count=IncidentProgress.step_count + count, updated_at=datetime.utcnow())
+            .returning(IncidentProgress.step_count)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if step_count is not None:
+            return step_count - count + 1
+
+        existing = self.db.query(func.count(Response.id)).filter(
+            Response.workflow_id == workflow_id,
+            Response.incident_number == incident_number
+        ).scalar()
+        try:
+            with self.db.begin_nested():
+                self.db.add(IncidentProgress(
                     incident_number=incident_number,
-                    text_mme=f"*Start SOP* {timestamp}{chr(13)}{chr(10)}{chr(13)}{chr(10)}",  # Initialize with empty text
-                    created_at=datetime.now(timezone.utc),
-                    updated_at=datetime.now(timezone.utc)
-                )
-                self.db.add(temp_incident)
+                    workflow_id=workflow_id,
+                    step_count=existing + count
+                ))
+            return existing + 1
+        except IntegrityError:
+            # Another request created the counter first; take the update path
+            return self._reserve_step_numbers(workflow_id, incident_number, count)
+
+    def _bind_incident(self, incident_number: str, workflow_id: int) -> int:
+        """
+        Bind the incident to the workflow in the caller's transaction, unless it is
+        bound already; returns the workflow the incident is bound to.
+        """
+        try:
+            with self.db.begin_nested():
+                self.db.add(IncidentWorkflow(incident_number=incident_number, workflow_id=workflow_id))
+            return workflow_id
+        except IntegrityError:
+            # Bound by an earlier run or a concurrent first answer; the first binding stays
+            return self.db.scalar(
+                select(IncidentWorkflow.workflow_id).where(IncidentWorkflow.incident_number == incident_number)
+            )
 
-            # Create and save the Response object
-            response = Response(
-                incident_number=incident_number,
-                workflow_id=workflow_id,
-                question_id=question_id,
-                answer_id=answer.answer_id
+    # Incident numbers per binding lookup statement
+    BINDING_BATCH_SIZE = 1000
+
+    def get_bound_workflows(self, incident_numbers: List[str]) -> Dict[str, Optional[int]]:
+        """
+        workflow_id each incident is bound to (None if it has no answers yet),
+        from the binding cache or point lookups on incident_workflow.
+        """
+        keys = list(dict.fromkeys(str(number) for number in incident_numbers))
+        bound: Dict[str, Optional[int]] = {}
+        missing = []
+        for key in keys:
+            bound[key] = self.binding_cache.get(key)
+            if bound[key] is None:
+                missing.append(key)
+        if not missing:
+            return bound
+
+        generation = self.binding_cache.generation
+        for start in range(0, len(missing), self.BINDING_BATCH_SIZE):
+            rows = self.db.execute(
+                select(IncidentWorkflow.incident_number, IncidentWorkflow.workflow_id)
+                .where(IncidentWorkflow.incident_number.in_(missing[start:start + self.BINDING_BATCH_SIZE]))
             )
-            self.db.add(response)
-            self.db.commit()
+            for incident_number, workflow_id in rows:
+                bound[incident_number] = workflow_id
+                self.binding_cache.set(incident_number, workflow_id, generation=generation)
+        return bound
 
-            return {"answer_id": answer.answer_id, "response_id": response.id}
+    def get_bound_workflow(self, incident_number: str) -> Optional[int]:
+        """workflow_id the incident is bound to, or None (see get_bound_workflows)."""
+        return self.get_bound_workflows([incident_number])[str(incident_number)]
 
-        except Exception as e:
-            self.db.rollback()
-            raise
-    
     def update_incidentlog_details(self, incident_number: str, new_text: str, workflow_name: str, building_frk: str):
         """
         Append new text (question, answer, timestamp) to the iinlActionTaken_MEM field in the IncidentLog_TBL.
@@ -536,90 +1085,123 @@ class AnswerService:
             2. Use incident_category_prk to get person details
             3. Add to the static heading
             4. Construct the SQL query to update iinlActionTaken_MEM
+
+        When a write-behind IncidentLogWriter is configured, the append is
+        queued instead and all of the above runs on the writer thread.
         
         Returns:
             None
         """
-        incident_category_prk = self.vc_service.get_incident_category_prk_by_wf_name(workflow_name)
-        person_details = self.vc_service.get_persons_by_incident_category(incident_category_prk, building_frk)
-        try:
-            # Dynamically format the heading with the workflow_name
-            static_heading = f"======SOP - {workflow_name} ======"
-            
-            if person_details:
-                static_heading += "\n\nRelated Persons:\n"
-                for p in person_details:
-                    static_heading += (
-                        f"- {p['prsFirstName_txt']} {p['prsLastName_txt']} | "
-                        f"{p['prsEmailAddress_txt']} | Mobile: {p['prsMobileNum_txt']}\n"
-        )
-
-            # Construct the SQL query to update iinlActionTaken_MEM
-            query = text("""
-            UPDATE [TEST].[dbo].[IncidentLog_TBL]
-            SET inlActionTaken_MEM = 
-            ISNULL(CAST(inlActionTaken_MEM AS NVARCHAR(MAX)), '') + 
-            CASE 
-                WHEN ISNULL(CAST(inlActionTaken_MEM AS NVARCHAR(MAX)), '') = '' 
-                THEN :static_heading + CHAR(13) + CHAR(10) + CHAR(13) + CHAR(10) 
-                ELSE CHAR(13) + CHAR(10) 
-            END + 
-            :new_text
-            WHERE incidentlog_prk = :incident_number
-            """)
-
-            # Execute the query with parameters
-            self.db.execute(query, {
-                "static_heading": static_heading,
-                "new_text": new_text,
-                "incident_number": incident_number
-            })
-            self.db.commit()
+        if self.incidentlog_writer is not None:
+            self.incidentlog_writer.enqueue(
+                incident_number=incident_number,
+                new_text=new_text,
+                workflow_name=workflow_name,
+                building_frk=building_frk
+            )
+            return
 
-        except SQLAlchemyError as e:
-            self.db.rollback()
-            raise RuntimeError(f"Database error while updating IncidentLog_TBL: {str(e)}")
+        static_heading = self.vc_service.build_sop_heading(workflow_name, building_frk)
+        self.vc_service.append_incidentlog_text(incident_number, static_heading, new_text)
 
 
 
-    def update_temp_incident_text(self, incident_number: str, new_text: str):
+    def get_incident_transcript(self, incident_number: str) -> Optional[str]:
         """
-        Update the text_mme field in the TempIncident table by appending new Q&A text.
-        If the record does not exist, create a new one.
+        Assemble the full transcript of an incident: text_mme followed by its segments.
 
-        Args:
-            incident_number (str): The incident number to update.
-            new_text (str): The text to append to the text_mme field.
+        While a run is in progress text_mme only holds the "*Start SOP*" line (or
+        what an explicit materialize_transcript folded); this is the complete text.
 
         Returns:
-            None
+            str: The transcript, or None if the incident has no TempIncident record.
         """
         try:
-            # Fetch the existing TempIncident record
-            temp_incident = self.db.query(TempIncident).filter_by(incident_number=incident_number).first()
+            row = self.db.execute(
+                select(TempIncident.text_mme).where(TempIncident.incident_number == incident_number)
+            ).first()
+            if row is None:
+                return None
+            parts = [row.text_mme] if row.text_mme else []
+            parts.extend(self.db.scalars(
+                select(TempIncidentSegment.text)
+                .where(TempIncidentSegment.incident_number == incident_number)
+                .order_by(TempIncidentSegment.id)
+            ))
+            return "\n".join(parts)
+        except SQLAlchemyError as e:
+            raise RuntimeError(f"Database error while reading transcript: {str(e)}")
 
-            if temp_incident:
-                # Append to existing text_mme
-                temp_incident.text_mme = f"{temp_incident.text_mme}\n{new_text}" if temp_incident.text_mme else new_text
-                temp_incident.updated_at = datetime.now(timezone.utc)
-            else:
-                # Create a new TempIncident record
-                temp_incident = TempIncident(
-                    incident_number=incident_number,
-                    text_mme=new_text,
-                    created_at=datetime.now(timezone.utc),
-                    updated_at=datetime.now(timezone.utc)
+    def _fold_segments(self, incident_number: str, new_text: Optional[str] = None) -> Optional[str]:
+        """
+        Fold the incident's segments, and new_text if given, into text_mme and
+        delete them, in the caller's transaction.
+
+        The TempIncident row is locked for the rest of the transaction, so
+        concurrent folds cannot drop segments; segments appended meanwhile
+        get higher ids and are left for the next fold. Writes nothing if
+        there is nothing to fold.
+
+        Returns:
+            str: The new text_mme, or None if the incident has no TempIncident record.
+        """
+        row = self.db.execute(
+            select(TempIncident.text_mme)
+            .where(TempIncident.incident_number == incident_number)
+            .with_for_update()
+        ).first()
+        if row is None:
+            return None
+        segments = self.db.execute(
+            select(TempIncidentSegment.id, TempIncidentSegment.text)
+            .where(TempIncidentSegment.incident_number == incident_number)
+            .order_by(TempIncidentSegment.id)
+        ).all()
+        if not segments and not new_text:
+            return row.text_mme
+
+        parts = [row.text_mme] if row.text_mme else []
+        parts.extend(segment.text for segment in segments)
+        if new_text:
+            parts.append(new_text)
+        text_mme = "\n".join(parts)
+        self.db.execute(
+            update(TempIncident)
+            .where(TempIncident.incident_number == incident_number)
+            .values(text_mme=text_mme, updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        if segments:
+            self.db.execute(
+                delete(TempIncidentSegment)
+                .where(
+                    TempIncidentSegment.incident_number == incident_number,
+                    TempIncidentSegment.id <= segments[-1].id
                 )
-                self.db.add(temp_incident)
+                .execution_options(synchronize_session=False)
+            )
+        return text_mme
 
-            # Commit changes
-            self.db.commit()
+    def materialize_transcript(self, incident_number: str) -> Optional[str]:
+        """
+        Fold an incident's transcript segments into text_mme and delete them.
 
+        submit_answers already folds when a run reaches a terminal question
+        (unless TRANSCRIPT_MATERIALIZE is off); this is the deferred fold for
+        such runs and for runs that were abandoned. It is idempotent: once
+        the segments are folded, calling it again writes nothing.
+
+        Returns:
+            str: The materialized transcript, or None if the incident has no TempIncident record.
+        """
+        try:
+            text_mme = self._fold_segments(incident_number)
+            self.db.commit()
+            return text_mme
         except SQLAlchemyError as e:
             self.db.rollback()
-            raise RuntimeError(f"Database error while updating TempIncident: {str(e)}")
-        
-        
+            raise RuntimeError(f"Database error while materializing transcript: {str(e)}")
+
     def fetch_question_text(self, question_id: int) -> str:
         """
         Fetch the text of a question based on its ID.
@@ -649,7 +1231,9 @@ class AnswerService:
             responses = (
                 self.db.query(Response)
                 .join(Question, Response.question_id == Question.question_id)
+                .options(contains_eager(Response.question), joinedload(Response.answer))
                 .filter(Response.workflow_id == workflow_id, Response.incident_number == incident_number)
+                .order_by(Response.id)
                 .all()
             )
             
@@ -674,85 +1258,130 @@ class AnswerService:
                 logger.error(f"Error closing database session: {str(e)}")
 
 class VC_DB_Service:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, persons_cache: Optional[LRUCache] = None, category_directory=None):
         self.db = db_session
+        # TTL cache of related persons keyed by (incident_category_prk, building_frk)
+        self.persons_cache = persons_cache
+        # Preloaded IncidentCategory_TBL map (see incident_category_directory.py)
+        self.category_directory = category_directory
+
+    def for_session(self, db_session: Session) -> "VC_DB_Service":
+        """Return a service bound to another session that shares this service's caches."""
+        return VC_DB_Service(db_session, persons_cache=self.persons_cache, category_directory=self.category_directory)
 
-    def check_incidentlog_exists(self, incidentlog_prk: int) -> bool:
+    def invalidate_persons_cache(self, incident_category_prk=None, building_frk=None) -> int:
         """
-        Check if an incident with the given primary key exists using a raw SQL query.
-        
-        Args:
-            incidentlog_prk (int): The primary key of the incident log.
+        Drop cached related-person lists.
+
+        With no arguments the whole cache is cleared; otherwise only entries
+        matching the given category and/or building are dropped.
 
         Returns:
-            bool: True if the incident exists, False otherwise.
+            int: Number of entries dropped (-1 when the whole cache was cleared).
         """
-        try:
-            # Define the SQL query using text() from SQLAlchemy
-            query = text("""
-                SELECT TOP 100 1
-                FROM [dbo].[incidentlog_tbl]
-                WHERE incidentlog_prk = :incidentlog_prk
-            """)
-            
-            # Execute the query with the parameter
-            result = self.db.execute(query, {"incidentlog_prk": incidentlog_prk}).fetchone()
-            
-            # If a result is returned, the incident log exists
-            return result is not None
+        if self.persons_cache is None:
+            return 0
+        if incident_category_prk is None and building_frk is None:
+            self.persons_cache.clear()
+            return -1
+        return self.persons_cache.invalidate_where(
+            lambda key: (incident_category_prk is None or key[0] == incident_category_prk)
+            and (building_frk is None or key[1] == building_frk)
+        )
 
-        except SQLAlchemyError as e:
-            logger.error(f"Database error: {str(e)}")
-            raise RuntimeError(f"Database error: {str(e)}")
-        
-    def get_workflow_for_incidentlog(self, incidentlog_prk: int) -> int:
+    def build_sop_heading(self, workflow_name: str, building_frk) -> str:
         """
-        Get the workflow_id associated with the given incidentlog_prk.
-        
-        Args:
-            incidentlog_prk (int): The primary key of the incident log.
+        Build the SOP heading written before the first IncidentLog_TBL append,
+        listing the related persons of the workflow's incident category and building.
+        """
+        incident_category_prk = self.get_incident_category_prk_by_wf_name(workflow_name)
+        person_details = self.get_persons_by_incident_category(incident_category_prk, building_frk)
+
+        # Dynamically format the heading with the workflow_name
+        static_heading = f"======SOP - {workflow_name} ======"
         
-        Returns:
-            int: The workflow_id if found, otherwise None.
+        if person_details:
+            static_heading += "\n\nRelated Persons:\n"
+            for p in person_details:
+                static_heading += (
+                    f"- {p['prsFirstName_txt']} {p['prsLastName_txt']} | "
+                    f"{p['prsEmailAddress_txt']} | Mobile: {p['prsMobileNum_txt']}\n"
+                )
+        return static_heading
+
+    def append_incidentlog_text(self, incident_number: str, static_heading: str, new_text: str):
+        """
+        Append text to inlActionTaken_MEM of an incident, prefixed with the heading
+        when the column is still empty, and commit.
+
+        Raises:
+            RuntimeError: If the update fails.
         """
         try:
+            # Construct the SQL query to update iinlActionTaken_MEM
             query = text("""
-                SELECT  distinct workflow_id
-                FROM [sop-manage].[dbo].[response]
-                WHERE incident_number = :incidentlog_prk
+            UPDATE [TEST].[dbo].[IncidentLog_TBL]
+            SET inlActionTaken_MEM = 
+            ISNULL(CAST(inlActionTaken_MEM AS NVARCHAR(MAX)), '') + 
+            CASE 
+                WHEN ISNULL(CAST(inlActionTaken_MEM AS NVARCHAR(MAX)), '') = '' 
+                THEN :static_heading + CHAR(13) + CHAR(10) + CHAR(13) + CHAR(10) 
+                ELSE CHAR(13) + CHAR(10) 
+            END + 
+            :new_text
+            WHERE incidentlog_prk = :incident_number
             """)
-            result = self.db.execute(query, {"incidentlog_prk": incidentlog_prk}).fetchone()
-            return result[0] if result else None
+
+            # Execute the query with parameters
+            self.db.execute(query, {
+                "static_heading": static_heading,
+                "new_text": new_text,
+                "incident_number": incident_number
+            })
+            self.db.commit()
+
         except SQLAlchemyError as e:
-            logger.error(f"Database error: {str(e)}")
-            raise RuntimeError(f"Database error: {str(e)}")
+            self.db.rollback()
+            raise RuntimeError(f"Database error while updating IncidentLog_TBL: {str(e)}")
 
-        
-    def get_incident_status(self, incidentlog_prk: int) -> dict:
+    # Incident numbers per validation statement (SQL Server allows 2100 parameters)
+    VALIDATION_BATCH_SIZE = 1000
+
+    def validate_incidentlogs(self, incidentlog_prks: List[int]) -> Dict[int, Dict]:
         """
-        Fetch status of an incident from IncidentLog_TBL.
+        Existence and status of many incidents, one statement per
+        VALIDATION_BATCH_SIZE incident numbers. The workflow an incident is
+        bound to lives in sop-manage (AnswerService.get_bound_workflows).
 
         Args:
-            incidentlog_prk (int): The primary key of the incident log.
+            incidentlog_prks (List[int]): Primary keys of the incident logs.
 
         Returns:
-            dict: A dictionary with incident details including `inlStatus_FRK`.
+            dict: incidentlog_prk -> {"exists", "inlStatus_FRK"} for every
+            requested key; unknown incidents have exists False.
         """
+        query = text("""
+            SELECT IncidentLog_PRK, inlStatus_FRK
+            FROM [dbo].[IncidentLog_TBL]
+            WHERE IncidentLog_PRK IN :incidentlog_prks
+        """).bindparams(bindparam("incidentlog_prks", expanding=True))
+
+        keys = list(dict.fromkeys(int(prk) for prk in incidentlog_prks))
+        results = {prk: {"exists": False, "inlStatus_FRK": None} for prk in keys}
         try:
-            query = text("""
-                SELECT inlStatus_FRK
-                FROM [dbo].[IncidentLog_TBL]
-                WHERE incidentlog_prk = :incidentlog_prk
-            """)
-            result = self.db.execute(query, {"incidentlog_prk": incidentlog_prk}).fetchone()
-            if result:
-                return {"inlStatus_FRK": result[0]}
-            return None
+            for start in range(0, len(keys), self.VALIDATION_BATCH_SIZE):
+                batch = keys[start:start + self.VALIDATION_BATCH_SIZE]
+                for row in self.db.execute(query, {"incidentlog_prks": batch}):
+                    results[row.IncidentLog_PRK] = {"exists": True, "inlStatus_FRK": row.inlStatus_FRK}
+            return results
         except SQLAlchemyError as e:
             logger.error(f"Database error: {str(e)}")
             raise RuntimeError(f"Database error: {str(e)}")
-        
-        
+
+    def validate_incidentlog(self, incidentlog_prk: int) -> Dict:
+        """Existence and status of one incident (see validate_incidentlogs)."""
+        return self.validate_incidentlogs([incidentlog_prk])[int(incidentlog_prk)]
+
     def get_workflow_name_by_incident(self, incident_number):
         """
         Fetch workflow name based on incident number.
@@ -767,6 +1396,24 @@ class VC_DB_Service:
             str: Workflow name derived from incident category
             None: If no incident is found
         """
+        directory = self.category_directory
+        if directory is not None and directory.loaded:
+            try:
+                result = self.db.execute(text("""
+                    SELECT inlCategory_FRK
+                    FROM [dbo].IncidentLog_TBL
+                    WHERE IncidentLog_PRK = :incident_number
+                """), {"incident_number": incident_number}).fetchone()
+                if result is None:
+                    return None
+                workflow_name = directory.workflow_name_for_prk(result.inlCategory_FRK)
+                # A category created since the last refresh falls through to the join below
+                if workflow_name is not None:
+                    return workflow_name
+            except Exception as e:
+                logger.error(f"Error fetching incident category for incident {incident_number}: {str(e)}")
+                return None
+
         try:
             # Construct the SQL query to fetch incident category
             query = text("""
@@ -798,10 +1445,16 @@ class VC_DB_Service:
         
         except Exception as e:
             logger.error(f"Error fetching workflow name from incident category: {str(e)}")
-            print(f"Error fetching workflow name for incident {incident_number}: {e}")
             return None
         
         
+    def get_cached_incident_category_prk(self, workflow_name) -> Optional[int]:
+        """IncidentCategory_PRK from the category directory without a query, or None if it isn't there."""
+        directory = self.category_directory
+        if directory is not None and directory.loaded:
+            return directory.prk_for_workflow_name(workflow_name)
+        return None
+
     def get_incident_category_prk_by_wf_name(self, workflow_name):
         """
         Reverse engineer workflow_name to get the corresponding IncidentCategory_PRK.
@@ -813,6 +1466,11 @@ class VC_DB_Service:
             int: IncidentCategory_PRK if found
             None: If no matching record found
         """
+        incident_category_prk = self.get_cached_incident_category_prk(workflow_name)
+        # A category created since the last refresh falls through to the query below
+        if incident_category_prk is not None:
+            return incident_category_prk
+
         try:
             # Reverse transformation: Replace underscores with spaces
             incident_name = ' '.join(workflow_name.split('_'))
@@ -835,7 +1493,6 @@ class VC_DB_Service:
 
         except Exception as e:
             logger.error(f"Error fetching IncidentCategory_PRK from workflow_name: {str(e)}")
-            print(f"Error fetching IncidentCategory_PRK from workflow_name {workflow_name}: {e}")
             return None
     
     def get_building_frk_from_incident_number(self, incident_number):
@@ -879,6 +1536,13 @@ class VC_DB_Service:
         Returns:
             list: List of person dictionaries
         """
+        cache_key = (incident_category_prk, building_frk)
+        if self.persons_cache is not None:
+            generation = self.persons_cache.generation
+            cached = self.persons_cache.get(cache_key)
+            if cached is not None:
+                return [dict(person) for person in cached]
+
         try:
             query = text("""
                 WITH AllData AS (
@@ -915,7 +1579,10 @@ class VC_DB_Service:
                 "building_frk": building_frk
             }).fetchall()
 
-            return [dict(row._mapping) for row in results]
+            persons = [dict(row._mapping) for row in results]
+            if self.persons_cache is not None:
+                self.persons_cache.set(cache_key, tuple(persons), generation=generation)
+            return persons
 
         except Exception as e:
             logger.error(f"Error fetching persons for incident_category_prk={incident_category_prk} and building_frk={building_frk}: {str(e)}")
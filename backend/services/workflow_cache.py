@@ -0,0 +1,172 @@
+import os
+import sys
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+# Append the backend path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.models.SOP_tables import Workflow, Question, QuestionType
+from backend.services.cache import LRUCache
+
+
+@dataclass(frozen=True)
+class CompiledOption:
+    option_id: int
+    option_text: str
+    next_question_id: Optional[int]
+    is_completed: bool
+
+
+@dataclass(frozen=True)
+class CompiledQuestion:
+    question_id: int
+    question_text: str
+    question_type: str
+    is_required: bool
+    next_question_id: Optional[int]
+    is_completed: bool
+    options: Tuple[CompiledOption, ...]
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """
+    Immutable snapshot of a workflow graph.
+
+    Snapshots are shared between request threads through the workflow cache,
+    so nothing in here may be mutated; ``to_structure`` hands out fresh dicts.
+
+    ``terminal_question_ids`` holds the questions that end the SOP. As in
+    the builder and the showcase, a null next_question_id means "the next
+    question in order"; a link to a question outside the workflow ends it.
+    A question's links are those of its options, or its own when it has
+    none; it is terminal when none of them leads to another question, so
+    a linear SOP ends at its last question. Branching SOPs can have several.
+    """
+    workflow_id: int
+    workflow_name: str
+    incident_type: str
+    questions: Tuple[CompiledQuestion, ...]
+    _by_id: Mapping[int, CompiledQuestion] = field(init=False, repr=False, compare=False)
+    terminal_question_ids: FrozenSet[int] = field(init=False, compare=False)
+
+    def __post_init__(self):
+        by_id = {q.question_id: q for q in self.questions}
+        object.__setattr__(self, "_by_id", MappingProxyType(by_id))
+        ordered = sorted(by_id)
+        following = dict(zip(ordered, ordered[1:]))
+
+        def leads_on(question: CompiledQuestion, next_question_id: Optional[int]) -> bool:
+            if next_question_id is None:
+                return question.question_id in following
+            return next_question_id in by_id
+
+        object.__setattr__(self, "terminal_question_ids", frozenset(
+            q.question_id for q in self.questions
+            if not any(
+                leads_on(q, next_question_id)
+                for next_question_id in ([o.next_question_id for o in q.options] or [q.next_question_id])
+            )
+        ))
+
+    def question(self, question_id: int) -> Optional[CompiledQuestion]:
+        """Return the question with the given id, or None if it is not part of this workflow."""
+        return self._by_id.get(question_id)
+
+    def to_structure(self) -> Dict:
+        """Render the GET /workflows/<id> payload."""
+        questions = []
+        for question in self.questions:
+            question_data = {
+                "question_id": question.question_id,
+                "question_text": question.question_text,
+                "question_type": question.question_type,
+                "is_required": question.is_required,
+            }
+
+            # Add next_question_id for subjective questions and instructions
+            if question.question_type in [QuestionType.SUBJECTIVE, QuestionType.INSTRUCTION]:
+                question_data["next_question_id"] = question.next_question_id
+
+            # Add is_completed only for instruction questions
+            if question.question_type == QuestionType.INSTRUCTION:
+                question_data["is_completed"] = question.is_completed
+
+            # Add options for multiple choice and checkbox questions
+            if question.question_type in [QuestionType.MULTIPLE_CHOICE, QuestionType.CHECKBOX]:
+                question_data["options"] = [
+                    {
+                        "option_id": option.option_id,
+                        "option_text": option.option_text,
+                        "next_question_id": option.next_question_id,
+                        "is_completed": option.is_completed
+                    }
+                    for option in question.options
+                ]
+
+            questions.append(question_data)
+
+        return {
+            "workflow_name": self.workflow_name,
+            "incident_type": self.incident_type,
+            "questions": questions
+        }
+
+
+def compile_workflow(workflow: Workflow) -> CompiledWorkflow:
+    """Build an immutable snapshot from a loaded Workflow and its questions/options."""
+    return CompiledWorkflow(
+        workflow_id=workflow.workflow_id,
+        workflow_name=workflow.workflow_name,
+        incident_type=workflow.incident_type,
+        questions=tuple(
+            CompiledQuestion(
+                question_id=question.question_id,
+                question_text=question.question_text,
+                question_type=question.question_type,
+                is_required=question.is_required,
+                next_question_id=question.next_question_id,
+                is_completed=question.is_completed,
+                options=tuple(
+                    CompiledOption(
+                        option_id=option.option_id,
+                        option_text=option.option_text,
+                        next_question_id=option.next_question_id,
+                        is_completed=option.is_completed
+                    )
+                    for option in question.options
+                )
+            )
+            for question in workflow.questions
+        )
+    )
+
+
+def load_compiled_workflow(db: Session, cache: LRUCache, workflow_id: int) -> CompiledWorkflow:
+    """
+    Return the snapshot of a workflow from cache, compiling and caching it on a miss.
+
+    Raises:
+        ValueError: If the workflow does not exist.
+    """
+    snapshot = cache.get(workflow_id)
+    if snapshot is not None:
+        return snapshot
+
+    generation = cache.generation
+    # Three queries regardless of size: workflow, its questions, their options
+    workflow = db.query(Workflow).options(
+        selectinload(Workflow.questions).selectinload(Question.options)
+    ).filter(
+        Workflow.workflow_id == workflow_id
+    ).first()
+
+    if not workflow:
+        raise ValueError(f"Workflow {workflow_id} not found")
+
+    snapshot = compile_workflow(workflow)
+    cache.set(workflow_id, snapshot, generation=generation)
+    return snapshot
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+# main.py and the api use imports relative to backend/, the models relative to the repo root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.models.SOP_tables import Base
+# The endpoint benchmark's stand-in for the VC database: its tables and the T-SQL rewrite
+from benchmarks.endpoint_benchmark import VC_TABLES, make_engine
+
+
+class StatementCounter:
+    """Counts (and keeps) the statements an engine sends while ``counting`` is set."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        self.counting = False
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.counting:
+            self.count += 1
+            self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self):
+        self.count, self.statements, self.counting = 0, [], True
+        return self
+
+    def __exit__(self, *exc):
+        self.counting = False
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    Both databases in one SQLite file, as in the endpoint benchmark: the sop-manage
+    schema (dbo mapped to "main") and the VC tables VC_DB_Service reads, empty.
+    """
+    engine = make_engine(str(tmp_path / "sop.db"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for ddl in VC_TABLES:
+            conn.exec_driver_sql(ddl)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def vc_data(engine):
+    """VC rows: category "Fire Alarm" (3); incident 42 in building 7, whose key holder is person 1."""
+    with engine.begin() as conn:
+        for statement in (
+            "INSERT INTO IncidentCategory_TBL VALUES (3, 'Fire Alarm')",
+            "INSERT INTO Building_TBL VALUES (7)",
+            "INSERT INTO Device_TBL (dvcBuilding_FRK, dvcName_txt) VALUES (7, 'dev-7')",
+            "INSERT INTO NVR_TBL (nvrAlias_TXT) VALUES ('dev-7')",
+            "INSERT INTO ProEvent_TBL (pevBuilding_frk, pevIncidentCategory_frk) VALUES (7, 3)",
+            "INSERT INTO Person_TBL VALUES (1, 'Ada', 'Lovelace', '0123', '0456', 'ada@example.com')",
+            "INSERT INTO BuildingKeyLink_TBL (bklBuilding_FRK, bklKeyHolder_FRK) VALUES (7, 1)",
+            "INSERT INTO IncidentLog_TBL VALUES (42, 1, 3, 7, NULL, NULL)",
+        ):
+            conn.exec_driver_sql(statement)
+
+
+@pytest.fixture
+def session(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    return StatementCounter(engine)
+
+
+@pytest.fixture
+def client(engine):
+    """Test client of the full app; both databases are the SQLite file."""
+    from main import create_app
+    factory = sessionmaker(bind=engine)
+    return create_app(session_factory=factory, vc_session_factory=factory, start_background=False).test_client()
+
+
+@pytest.fixture
+def mssql_executemany_sql():
+    """
+    SQL Server SQL of an INSERT executed with several parameter sets.
+
+    SQLite has no insert sentinel, so an ordered INSERT .. RETURNING goes one
+    row per statement there; on SQL Server it is a single statement ordered
+    by a counter column (``sen_counter``). Tests assert the latter on the
+    compiled statement since no SQL Server is at hand.
+    """
+    from sqlalchemy.dialects import mssql
+
+    def compile_for_mssql(statement, column_keys):
+        return str(statement.compile(dialect=mssql.pyodbc.dialect(), column_keys=column_keys, for_executemany=True))
+    return compile_for_mssql
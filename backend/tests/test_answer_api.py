@@ -0,0 +1,79 @@
+import pytest
+
+TIMESTAMP = "2025-01-01T10:00:00.000Z"
+
+
+@pytest.fixture
+def workflow(client):
+    """Five sequential subjective questions; returns (workflow_id, question ids in order)."""
+    response = client.post("/api/workflows", json={"workflow_name": "Intrusion", "incident_type": "Test", "questions": [
+        {"question_text": f"Step {n}", "question_type": "SUBJECTIVE"} for n in range(1, 6)
+    ]})
+    workflow_id = response.get_json()["workflow_id"]
+    questions = client.get(f"/api/workflows/{workflow_id}/questions").get_json()
+    return workflow_id, [q["question_id"] for q in questions]
+
+
+def batch(client, workflow_id, answers, incident_number="5001"):
+    return client.post("/api/questions/answers/batch", json={
+        "incident_number": incident_number, "workflow_id": workflow_id, "answers": answers,
+    })
+
+
+def test_batch_keeps_payload_order_and_continues_step_numbers(client, workflow):
+    workflow_id, question_ids = workflow
+    first = [question_ids[2], question_ids[0], question_ids[1]]
+
+    response = batch(client, workflow_id, [
+        {"question_id": question_id, "answer_text": f"Answer {question_id}", "timestamp": TIMESTAMP}
+        for question_id in first
+    ])
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [a["question_id"] for a in body["answers"]] == first
+    assert [a["question_number"] for a in body["answers"]] == [1, 2, 3]
+    assert len({a["answer_id"] for a in body["answers"]}) == 3
+    assert body["is_last_question"] is False
+
+    response = batch(client, workflow_id, [
+        {"question_id": question_id, "answer_text": "Done", "timestamp": TIMESTAMP} for question_id in question_ids[3:]
+    ])
+    body = response.get_json()
+    assert [a["question_number"] for a in body["answers"]] == [4, 5]
+    assert body["is_last_question"] is True
+
+    # Responses come back in step order, each with its own answer
+    responses = client.get(f"/api/workflows/{workflow_id}/responses/5001").get_json()
+    assert [r["question_id"] for r in responses] == first + question_ids[3:]
+
+
+@pytest.mark.parametrize("bad_entry", [
+    "not an object",
+    {"question_id": "abc", "answer_text": "x", "timestamp": TIMESTAMP},
+    {"question_id": 1, "answer_text": "x", "timestamp": "yesterday"},
+    {"question_id": 1, "timestamp": TIMESTAMP},
+])
+def test_batch_rejects_a_bad_entry_without_writing(client, workflow, bad_entry):
+    workflow_id, question_ids = workflow
+    response = batch(client, workflow_id, [
+        {"question_id": question_ids[0], "answer_text": "x", "timestamp": TIMESTAMP},
+        bad_entry,
+    ])
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Answer 2:")
+    assert client.get(f"/api/workflows/{workflow_id}/responses/5001").status_code == 404
+
+
+def test_answer_and_response_inserts_are_one_statement_on_sql_server(mssql_executemany_sql):
+    from sqlalchemy import insert
+    from backend.models.SOP_tables import Answer, Response
+
+    answer_sql = mssql_executemany_sql(
+        insert(Answer).returning(Answer.answer_id, sort_by_parameter_order=True),
+        ["question_id", "answer_text", "rendered_at", "submitted_at"])
+    response_sql = mssql_executemany_sql(
+        insert(Response).returning(Response.id, sort_by_parameter_order=True),
+        ["incident_number", "workflow_id", "question_id", "answer_id"])
+
+    for sql in (answer_sql, response_sql):
+        assert "OUTPUT inserted." in sql and "ORDER BY sen_counter" in sql
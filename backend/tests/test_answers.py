@@ -0,0 +1,135 @@
+import re
+
+import pytest
+from sqlalchemy import delete, select
+
+from backend.models.SOP_tables import IncidentProgress
+from backend.services.wf_builder_service import AnswerService, WorkflowBuilderService
+
+ANSWERED_AT = "01-01-2025 15:30:00"
+
+
+@pytest.fixture
+def workflow(session):
+    """Eight sequential subjective questions; the eighth is terminal."""
+    builder = WorkflowBuilderService(session)
+    created = builder.create_workflow({
+        "workflow_name": "Intrusion",
+        "incident_type": "Test",
+        "questions": [{"question_text": f"Step {n}", "question_type": "SUBJECTIVE"} for n in range(1, 9)],
+    })
+    return builder.get_compiled_workflow(created.workflow_id)
+
+
+def answer(service, workflow, questions, incident_number="5001"):
+    return service.submit_answers(workflow, incident_number, [
+        {"question_id": question.question_id, "answer_text": "ok", "answered_at": ANSWERED_AT}
+        for question in questions
+    ])
+
+
+def sop_statements(statements):
+    """'VERB table' of every statement on the sop-manage tables (schema "main" in the tests)."""
+    summary = []
+    for statement in statements.statements:
+        table = re.search(r"\bmain\.(\w+)", statement)
+        if statement.startswith(("SAVEPOINT", "RELEASE")):
+            summary.append(statement.split()[0])
+        elif table:
+            summary.append(f"{statement.split()[0]} {table.group(1)}")
+    return summary
+
+
+def test_step_numbers_continue_across_submissions(session, workflow):
+    service = AnswerService(session)
+    questions = workflow.questions
+
+    first = answer(service, workflow, questions[:3])
+    second = answer(service, workflow, questions[3:5])
+
+    assert [a["question_number"] for a in first["answers"]] == [1, 2, 3]
+    assert [a["question_number"] for a in second["answers"]] == [4, 5]
+    assert [a["question_id"] for a in first["answers"] + second["answers"]] == [q.question_id for q in questions[:5]]
+    assert session.scalar(select(IncidentProgress.step_count).where(IncidentProgress.incident_number == "5001")) == 5
+    assert first["is_last_question"] is False and second["is_last_question"] is False
+
+
+def test_first_answer_binds_the_incident(session, workflow):
+    service = AnswerService(session)
+    assert service.get_bound_workflow("5001") is None
+
+    answer(service, workflow, workflow.questions[:1])
+
+    assert service.get_bound_workflow("5001") == workflow.workflow_id
+    # Also visible to a service without the cached binding
+    assert AnswerService(session).get_bound_workflow("5001") == workflow.workflow_id
+
+
+def test_statements_per_block(session, workflow, statements):
+    """
+    SQLite sends the ordered Answer/Response INSERTs one row per statement;
+    test_answer_api checks they are one statement each on SQL Server.
+    """
+    service = AnswerService(session)
+    questions = workflow.questions
+
+    with statements:
+        answer(service, workflow, questions[:3])
+    assert sop_statements(statements) == [
+        "UPDATE incident_progress", "SELECT response",
+        "SAVEPOINT", "INSERT incident_progress", "RELEASE",
+        "SAVEPOINT", "INSERT incident_workflow", "RELEASE",
+        "SELECT temp_incident", "INSERT temp_incident",
+        "INSERT temp_incident_segment",
+    ] + ["INSERT answer"] * 3 + ["INSERT response"] * 3
+
+    with statements:
+        answer(service, workflow, questions[3:7])
+    assert sop_statements(statements) == [
+        "UPDATE incident_progress", "INSERT temp_incident_segment",
+    ] + ["INSERT answer"] * 4 + ["INSERT response"] * 4
+
+    with statements:
+        result = answer(service, workflow, questions[7:])
+    assert result["is_last_question"] is True
+    assert sop_statements(statements) == [
+        "UPDATE incident_progress",
+        "SELECT temp_incident", "SELECT temp_incident_segment", "UPDATE temp_incident", "DELETE temp_incident_segment",
+        "INSERT answer", "INSERT response",
+    ]
+
+
+def test_step_counter_seeds_from_existing_responses(session, workflow):
+    service = AnswerService(session)
+    questions = workflow.questions
+    answer(service, workflow, questions[:3])
+    answer(service, workflow, questions[:2], incident_number="5002")
+    # Responses recorded before incident_progress existed have no counter row
+    session.execute(delete(IncidentProgress))
+    session.commit()
+
+    result = answer(service, workflow, questions[3:5])
+
+    # Counts only this incident's responses
+    assert [a["question_number"] for a in result["answers"]] == [4, 5]
+    assert session.scalar(select(IncidentProgress.step_count).where(IncidentProgress.incident_number == "5001")) == 5
+    # The seeded counter numbers the next block
+    assert [a["question_number"] for a in answer(service, workflow, questions[5:6])["answers"]] == [6]
+
+
+def test_first_answer_wins_the_binding(session, workflow):
+    builder = WorkflowBuilderService(session)
+    other = builder.get_compiled_workflow(builder.create_workflow({
+        "workflow_name": "Fire alarm",
+        "incident_type": "Test",
+        "questions": [{"question_text": "Evacuate", "question_type": "INSTRUCTION"}],
+    }).workflow_id)
+    service = AnswerService(session)
+
+    assert service._bind_incident("5001", workflow.workflow_id) == workflow.workflow_id
+    # A later first answer under another workflow keeps the existing binding
+    assert service._bind_incident("5001", other.workflow_id) == workflow.workflow_id
+    session.commit()
+
+    answer(service, other, other.questions)
+    assert AnswerService(session).get_bound_workflow("5001") == workflow.workflow_id
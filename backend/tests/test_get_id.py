@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from main import create_app
+
+
+def make_app(engine, monkeypatch, lookup_workers, directory_loaded):
+    monkeypatch.setenv("LOOKUP_WORKERS", str(lookup_workers))
+    factory = sessionmaker(bind=engine)
+    app = create_app(session_factory=factory, vc_session_factory=factory, start_background=False)
+    if directory_loaded:
+        app.extensions["category_directory"].load()
+    submitted = []
+    executor = app.extensions["lookup_executor"]
+    if executor is not None:
+        submit = executor.submit
+        monkeypatch.setattr(executor, "submit", lambda fn, *args: submitted.append(fn.__name__) or submit(fn, *args))
+    client = app.test_client()
+    response = client.post("/api/workflows", json={"workflow_name": "Fire_Alarm", "incident_type": "Test", "questions": [
+        {"question_text": "Evacuate", "question_type": "INSTRUCTION"},
+    ]})
+    assert response.status_code == 200
+    return app, client, submitted
+
+
+@pytest.mark.parametrize("directory_loaded", [True, False])
+@pytest.mark.parametrize("body", [
+    {"workflow_name": "Fire_Alarm", "incident_number": 42},
+    {"workflow_name": "Fire_Alarm"},
+    {"workflow_name": "Flood"},
+])
+def test_same_payload_with_and_without_lookup_executor(engine, vc_data, monkeypatch, directory_loaded, body):
+    payloads = []
+    for lookup_workers in (0, 4):
+        app, client, _ = make_app(engine, monkeypatch, lookup_workers, directory_loaded)
+        response = client.post("/api/workflows/get_id", json=body)
+        payloads.append((response.status_code, response.get_json()))
+        # Each app creates the workflow; start the next one from an empty catalog
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM main.question"))
+            conn.execute(text("DELETE FROM main.workflow"))
+
+    assert payloads[0] == payloads[1]
+    if body["workflow_name"] == "Fire_Alarm" and "incident_number" in body:
+        status, payload = payloads[0]
+        assert status == 200
+        assert payload["building_frk"] == 7
+        assert [person["prsFirstName_txt"] for person in payload["persons"]] == ["Ada"]
+
+
+@pytest.mark.parametrize("directory_loaded, expected", [
+    (True, ["get_building_frk_from_incident_number"]),
+    (False, ["get_incident_category_prk_by_wf_name", "get_building_frk_from_incident_number"]),
+])
+def test_only_lookups_that_query_go_to_the_executor(engine, vc_data, monkeypatch, directory_loaded, expected):
+    app, client, submitted = make_app(engine, monkeypatch, 4, directory_loaded)
+
+    response = client.post("/api/workflows/get_id", json={"workflow_name": "Fire_Alarm", "incident_number": 42})
+
+    assert response.status_code == 200
+    assert submitted == expected
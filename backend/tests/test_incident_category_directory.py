@@ -0,0 +1,77 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from backend.services.incident_category_directory import IncidentCategoryDirectory
+from backend.services.wf_builder_service import VC_DB_Service
+
+
+class UnreachableSession:
+    """Session whose queries fail, as when the VC database is down."""
+
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("VC database down")
+
+    def close(self):
+        pass
+
+
+def test_load_maps_names_both_ways(engine, vc_data):
+    directory = IncidentCategoryDirectory(sessionmaker(bind=engine))
+    assert not directory.loaded
+
+    assert directory.load()
+
+    assert directory.loaded
+    assert directory.prk_for_workflow_name("Fire_Alarm") == 3
+    # Case and spacing are ignored, like the SQL Server comparison
+    assert directory.prk_for_workflow_name("fire  ALARM") == 3
+    assert directory.workflow_name_for_prk(3) == "Fire_Alarm"
+    assert directory.prk_for_workflow_name("Flood") is None
+    assert directory.stats()["size"] == 1
+
+
+def test_miss_falls_back_to_the_database_until_the_next_refresh(session, engine, vc_data, statements):
+    directory = IncidentCategoryDirectory(sessionmaker(bind=engine))
+    directory.load()
+    service = VC_DB_Service(session, category_directory=directory)
+
+    with statements:
+        assert service.get_incident_category_prk_by_wf_name("Fire_Alarm") == 3
+    assert statements.count == 0
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO IncidentCategory_TBL VALUES (4, 'Gas Leak')"))
+    # Not in the directory yet: answered by the query
+    with statements:
+        assert service.get_incident_category_prk_by_wf_name("Gas_Leak") == 4
+    assert statements.count == 1
+
+    assert directory.load()
+    assert directory.refreshes == 2
+    with statements:
+        assert service.get_incident_category_prk_by_wf_name("Gas_Leak") == 4
+    assert statements.count == 0
+
+
+def test_failed_load_leaves_callers_on_the_database(session, engine, vc_data, statements):
+    directory = IncidentCategoryDirectory(UnreachableSession)
+    assert not directory.load()
+    assert not directory.loaded
+    assert directory.refresh_failures == 1
+
+    service = VC_DB_Service(session, category_directory=directory)
+    with statements:
+        assert service.get_incident_category_prk_by_wf_name("Fire_Alarm") == 3
+    assert statements.count == 1
+
+
+def test_failed_refresh_keeps_the_last_map(engine, vc_data):
+    directory = IncidentCategoryDirectory(sessionmaker(bind=engine))
+    directory.load()
+
+    directory.session_factory = UnreachableSession
+    assert not directory.load()
+
+    assert directory.loaded
+    assert directory.refresh_failures == 1
+    assert directory.prk_for_workflow_name("Fire_Alarm") == 3
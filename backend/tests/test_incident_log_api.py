@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import text
+
+from backend.models.SOP_tables import IncidentWorkflow
+
+OPEN, CLOSED = 1, 2
+
+
+@pytest.fixture
+def incidents(engine, session):
+    """Incidents 1..1200 in IncidentLog_TBL, of which 7 is closed; 5 is bound to workflow 1, 1100 to workflow 2."""
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO IncidentLog_TBL (IncidentLog_PRK, inlStatus_FRK) VALUES (:prk, :status)"),
+            [{"prk": prk, "status": CLOSED if prk == 7 else OPEN} for prk in range(1, 1201)]
+        )
+    session.add_all([
+        IncidentWorkflow(incident_number="5", workflow_id=1),
+        IncidentWorkflow(incident_number="1100", workflow_id=2),
+    ])
+    session.commit()
+
+
+@pytest.mark.parametrize("query, status, body", [
+    ({}, 400, {"error": "incidentlog_prk is required"}),
+    ({"incidentlog_prk": "abc"}, 400, {"error": "incident number must be an integer"}),
+    ({"incidentlog_prk": 9999}, 200, {"exists": False}),
+    ({"incidentlog_prk": 7}, 400, {"error": "Incident is closed"}),
+    ({"incidentlog_prk": 5, "workflow_id": 2}, 400,
+     {"error": "Incident number is already associated with another workflow.", "linked_workflow": 1}),
+    ({"incidentlog_prk": 5, "workflow_id": 1}, 200, {"exists": True}),
+    ({"incidentlog_prk": 6, "workflow_id": 2}, 200, {"exists": True}),
+    ({"incidentlog_prk": 6}, 200, {"exists": True}),
+])
+def test_check(client, incidents, query, status, body):
+    response = client.get("/api/incident-log/check", query_string=query)
+    assert response.status_code == status
+    assert response.get_json() == body
+
+
+def test_check_batch_crosses_the_statement_batch_boundary(client, incidents, statements):
+    prks = list(range(1, 1201)) + [9999, 5, 3]
+
+    with statements:
+        response = client.post("/api/incident-log/check/batch", json={"incidentlog_prks": prks, "workflow_id": 1})
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    # One entry per distinct incident, in request order
+    assert [r["incidentlog_prk"] for r in results] == list(range(1, 1201)) + [9999]
+    by_prk = {r["incidentlog_prk"]: r for r in results}
+    assert by_prk[5] == {"incidentlog_prk": 5, "exists": True, "closed": False, "inlStatus_FRK": OPEN,
+                         "linked_workflow": 1, "conflict": False}
+    assert by_prk[1100]["conflict"] is True and by_prk[1100]["linked_workflow"] == 2
+    assert by_prk[7]["closed"] is True
+    assert by_prk[9999] == {"incidentlog_prk": 9999, "exists": False, "closed": False, "inlStatus_FRK": None,
+                            "linked_workflow": None, "conflict": False}
+    assert sum(r["exists"] for r in results) == 1200
+
+    # 1201 distinct incidents: two validation statements and two binding lookups
+    assert sum("IncidentLog_TBL" in s for s in statements.statements) == 2
+    assert sum("incident_workflow" in s for s in statements.statements) == 2
+
+
+@pytest.mark.parametrize("body, error", [
+    ({}, "incidentlog_prks must be a non-empty list"),
+    ({"incidentlog_prks": "1,2"}, "incidentlog_prks must be a non-empty list"),
+    ({"incidentlog_prks": list(range(5001))}, "At most 5000 incident numbers per request"),
+    ({"incidentlog_prks": [1, "x"]}, "incident numbers and workflow_id must be integers"),
+    ({"incidentlog_prks": [1], "workflow_id": "x"}, "incident numbers and workflow_id must be integers"),
+])
+def test_check_batch_rejects_bad_requests(client, body, error):
+    response = client.post("/api/incident-log/check/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
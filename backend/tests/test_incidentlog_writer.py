@@ -0,0 +1,55 @@
+import logging
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from main import create_app
+from services.incidentlog_writer import IncidentLogWriter
+
+
+class UnreachableVC:
+    """VC service whose database is down: every append fails."""
+
+    def for_session(self, session):
+        return self
+
+    def build_sop_heading(self, workflow_name, building_frk):
+        raise ConnectionError("VC database unreachable")
+
+
+def test_stop_logs_the_appends_it_could_not_write(engine, caplog):
+    writer = IncidentLogWriter(sessionmaker(bind=engine), max_attempts=2, vc_service=UnreachableVC())
+    writer.enqueue("1001", "Step 1", "Fire alarm")
+    writer.enqueue("1001", "Step 2", "Fire alarm")
+    writer.enqueue("1002", "Step 1", "Fire alarm")
+
+    with caplog.at_level(logging.ERROR, logger="services.incidentlog_writer"):
+        writer.stop(timeout=5)
+
+    stats = writer.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["dropped"] == 3
+    assert stats["failures"] == 4
+    dropped = [record.getMessage() for record in caplog.records if "Dropping" in record.getMessage()]
+    assert any("incident 1001" in message for message in dropped)
+    assert any("incident 1002" in message for message in dropped)
+
+
+def test_stop_logs_blocks_left_when_the_timeout_passes(engine, caplog):
+    writer = IncidentLogWriter(sessionmaker(bind=engine), vc_service=UnreachableVC())
+    writer.enqueue("1001", "Step 1", "Fire alarm")
+
+    with caplog.at_level(logging.ERROR, logger="services.incidentlog_writer"):
+        writer.stop(timeout=0)
+
+    assert writer.stats()["dropped"] == 1
+    assert any("incident 1001 unwritten" in record.getMessage() for record in caplog.records)
+
+
+def test_write_behind_is_refused_with_several_workers(engine, monkeypatch):
+    monkeypatch.setenv("INCIDENTLOG_WRITE_BEHIND", "true")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    factory = sessionmaker(bind=engine)
+
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY=1"):
+        create_app(session_factory=factory, vc_session_factory=factory, start_background=False)
@@ -0,0 +1,73 @@
+from prometheus_client import multiprocess, values
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from main import create_app
+from services.metrics import Metrics
+
+
+def test_incidentlog_writer_stats_are_exported(engine, monkeypatch):
+    monkeypatch.setenv("INCIDENTLOG_WRITE_BEHIND", "true")
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    factory = sessionmaker(bind=engine)
+    app = create_app(session_factory=factory, vc_session_factory=factory, start_background=False)
+    writer = app.extensions["incidentlog_writer"]
+    writer.enqueue("1001", "Step 1", "Fire alarm")
+    writer.enqueue("1001", "Step 2", "Fire alarm")
+    client = app.test_client()
+
+    stats = client.get("/api/cache/stats").get_json()["incidentlog_writer"]
+    assert stats["enqueued"] == 2
+    assert stats["queue_depth"] == 2
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'incidentlog_writer_events_total{event="enqueued"} 2.0' in metrics
+    assert 'incidentlog_writer_state{field="queue_incidents"} 1.0' in metrics
+
+    # Nothing to write to: drop the queue instead of flushing it at exit
+    monkeypatch.setattr(writer, "_write", lambda batch: None)
+    writer.stop()
+
+
+def test_pool_checkouts_are_counted_from_pool_events(engine):
+    # Instrumented before its first connection, as create_app does
+    engine.dispose()
+    metrics = Metrics()
+    metrics.instrument_engine(engine, "sop")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert 'db_pool_connections{db="sop",state="checked_out"} 1.0' in metrics.render().decode()
+    # dispose() closes the idle connection and replaces the pool; the listeners move to the new one
+    engine.dispose()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    rendered = metrics.render().decode()
+    assert 'db_pool_checkouts_total{db="sop"} 2.0' in rendered
+    assert 'db_pool_connects_total{db="sop"} 2.0' in rendered
+    assert 'db_pool_connection_held_seconds_count{db="sop"} 2.0' in rendered
+    assert 'db_pool_connections{db="sop",state="checked_out"} 0.0' in rendered
+    assert 'db_pool_connections{db="sop",state="open"} 1.0' in rendered
+
+
+def test_metrics_are_merged_across_workers(tmp_path, monkeypatch):
+    """prometheus_client multiprocess mode, as set up by gunicorn.conf.py; pid 99999999 is an exited worker."""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda: 99999999))
+    exited = Metrics()
+    exited.requests_total.labels("/api/workflows", "GET", "200").inc(2)
+    exited.pool_state.labels("sop", "open").set(5)
+    multiprocess.mark_process_dead(99999999, str(tmp_path))
+
+    monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue())
+    metrics = Metrics()
+    metrics.requests_total.labels("/api/workflows", "GET", "200").inc(3)
+    metrics.pool_state.labels("sop", "open").set(2)
+
+    rendered = metrics.render().decode()
+
+    # Counters keep what exited workers counted, live gauges only sum live workers
+    assert 'http_requests_total{method="GET",route="/api/workflows",status="200"} 5.0' in rendered
+    assert 'db_pool_connections{db="sop",state="open"} 2.0' in rendered
+    values.close_all_multiprocess_files()
@@ -0,0 +1,74 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from backend.services.cache import LRUCache
+from backend.services.wf_builder_service import VC_DB_Service
+from main import create_app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def first_names(persons):
+    return [person["prsFirstName_txt"] for person in persons]
+
+
+def test_persons_are_cached_until_the_ttl_passes(session, vc_data, statements):
+    clock = Clock()
+    service = VC_DB_Service(session, persons_cache=LRUCache(maxsize=8, ttl=60, clock=clock))
+
+    with statements:
+        assert first_names(service.get_persons_by_incident_category(3, 7)) == ["Ada"]
+        # Callers get copies; changing one leaves the cached list alone
+        service.get_persons_by_incident_category(3, 7)[0]["prsFirstName_txt"] = "changed"
+        assert first_names(service.get_persons_by_incident_category(3, 7)) == ["Ada"]
+    assert statements.count == 1
+
+    session.execute(text("UPDATE Person_TBL SET prsFirstName_txt = 'Grace' WHERE Person_PRK = 1"))
+    session.commit()
+    clock.now = 59
+    assert first_names(service.get_persons_by_incident_category(3, 7)) == ["Ada"]
+
+    clock.now = 61
+    with statements:
+        assert first_names(service.get_persons_by_incident_category(3, 7)) == ["Grace"]
+    assert statements.count == 1
+
+
+def test_invalidation_drops_matching_entries(session, vc_data):
+    service = VC_DB_Service(session, persons_cache=LRUCache(maxsize=8, ttl=60))
+    for key in ((3, 7), (3, 8), (4, 7)):
+        service.get_persons_by_incident_category(*key)
+
+    assert service.invalidate_persons_cache(incident_category_prk=3) == 2
+    assert service.invalidate_persons_cache(building_frk=7) == 1
+    assert service.invalidate_persons_cache() == -1
+    assert VC_DB_Service(session).invalidate_persons_cache() == 0
+
+
+def test_delete_persons_cache_endpoint(engine, vc_data, statements):
+    factory = sessionmaker(bind=engine)
+    app = create_app(session_factory=factory, vc_session_factory=factory, start_background=False)
+    client = app.test_client()
+    cache = app.extensions["persons_cache"]
+    vc_service = VC_DB_Service(factory(), persons_cache=cache)
+    vc_service.get_persons_by_incident_category(3, 7)
+    vc_service.get_persons_by_incident_category(5, 9)
+
+    response = client.delete("/api/cache/persons", query_string={"incident_category_prk": 3})
+    assert response.get_json() == {"invalidated": 1}
+    # The other entry is still served from the cache
+    with statements:
+        vc_service.get_persons_by_incident_category(5, 9)
+    assert statements.count == 0
+
+    response = client.delete("/api/cache/persons")
+    assert response.get_json() == {"invalidated": "all"}
+    with statements:
+        vc_service.get_persons_by_incident_category(5, 9)
+    assert statements.count == 1
@@ -0,0 +1,108 @@
+import warnings
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.models.SOP_tables import TempIncident, TempIncidentSegment
+from backend.services.wf_builder_service import AnswerService, WorkflowBuilderService, format_transcript_entry
+
+ANSWERED_AT = "01-01-2025 15:30:00"
+
+
+@pytest.fixture
+def workflow(session):
+    """Three sequential subjective questions; the third is terminal."""
+    builder = WorkflowBuilderService(session)
+    created = builder.create_workflow({
+        "workflow_name": "Intrusion",
+        "incident_type": "Test",
+        "questions": [{"question_text": f"Step {n}", "question_type": "SUBJECTIVE"} for n in range(1, 4)],
+    })
+    return builder.get_compiled_workflow(created.workflow_id)
+
+
+def answer(service, workflow, incident_number, questions):
+    return service.submit_answers(workflow, incident_number, [
+        {"question_id": question.question_id, "answer_text": f"Answer {question.question_id}", "answered_at": ANSWERED_AT}
+        for question in questions
+    ])
+
+
+def expected_steps(questions, first_number=1):
+    return [
+        format_transcript_entry(first_number + i, question.question_text, f"Answer {question.question_id}", ANSWERED_AT)
+        for i, question in enumerate(questions)
+    ]
+
+
+def segment_count(session, incident_number):
+    return session.scalar(
+        select(func.count()).select_from(TempIncidentSegment).where(TempIncidentSegment.incident_number == incident_number)
+    )
+
+
+def text_mme(session, incident_number):
+    return session.scalar(select(TempIncident.text_mme).where(TempIncident.incident_number == incident_number))
+
+
+def test_answers_append_segments_until_the_terminal_block_folds_them(session, workflow):
+    service = AnswerService(session)
+    first, second, third = workflow.questions
+
+    answer(service, workflow, "5001", [first])
+    answer(service, workflow, "5001", [second])
+    assert segment_count(session, "5001") == 2
+    assert text_mme(session, "5001").startswith("*Start SOP*")
+
+    # Mid-run the transcript is text_mme plus the segments
+    transcript = service.get_incident_transcript("5001")
+    assert transcript.endswith("\n".join(expected_steps([first, second])))
+
+    result = answer(service, workflow, "5001", [third])
+    assert result["is_last_question"] is True
+    assert segment_count(session, "5001") == 0
+    assert text_mme(session, "5001").endswith("\n".join(expected_steps([first, second, third])))
+    assert service.get_incident_transcript("5001") == text_mme(session, "5001")
+
+
+def test_materialize_transcript_is_a_deferred_idempotent_fold(session, workflow):
+    service = AnswerService(session, materialize_transcripts=False)
+
+    answer(service, workflow, "5001", workflow.questions)
+    assert segment_count(session, "5001") == 1
+    transcript = service.get_incident_transcript("5001")
+
+    assert service.materialize_transcript("5001") == transcript
+    assert segment_count(session, "5001") == 0
+    updated_at = session.scalar(select(TempIncident.updated_at).where(TempIncident.incident_number == "5001"))
+
+    assert service.materialize_transcript("5001") == transcript
+    assert session.scalar(select(TempIncident.updated_at).where(TempIncident.incident_number == "5001")) == updated_at
+    assert service.materialize_transcript("unknown") is None
+
+
+def test_reused_segment_ids_do_not_mix_transcripts(session, workflow):
+    """
+    SQLite hands a folded (deleted) segment id out again; a session still
+    holding the deleted segment must neither warn nor read it back.
+    """
+    service = AnswerService(session)
+    first, second, third = workflow.questions
+
+    answer(service, workflow, "5001", [first, second])
+    held_segments = session.get(TempIncident, "5001").segments
+    answer(service, workflow, "5001", [third])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        answer(service, workflow, "5002", [first])
+        answer(service, workflow, "5003", [first, second])
+
+    assert held_segments
+    assert service.get_incident_transcript("5001").endswith("\n".join(expected_steps([first, second, third])))
+    assert service.get_incident_transcript("5002").endswith(expected_steps([first])[0])
+    assert service.get_incident_transcript("5003").endswith("\n".join(expected_steps([first, second])))
+
+    answer(service, workflow, "5002", [second, third])
+    assert text_mme(session, "5002").endswith("\n".join(expected_steps([first, second, third])))
+    assert segment_count(session, "5002") == 0
+    assert segment_count(session, "5003") == 1
@@ -0,0 +1,33 @@
+from backend.services.wf_builder_service import WorkflowBuilderService
+
+
+def create(client, name):
+    response = client.post("/api/workflows", json={"workflow_name": name, "incident_type": "Test", "questions": [
+        {"question_text": "Step 1", "question_type": "SUBJECTIVE"},
+    ]})
+    assert response.status_code == 200
+    return response.get_json()["workflow_id"]
+
+
+def test_rename_to_a_taken_name_is_rejected(client):
+    fire = create(client, "Fire_Alarm")
+    flood = create(client, "Flood")
+
+    response = client.patch(f"/api/workflows/{flood}", json={"workflow_name": " fire_alarm "})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "name_not_unique"
+
+    # Keeping its own name (in another case) is not a conflict
+    response = client.patch(f"/api/workflows/{fire}", json={"workflow_name": "FIRE_ALARM"})
+    assert response.status_code == 200
+
+
+def test_rename_race_maps_to_name_not_unique(client, monkeypatch):
+    create(client, "Fire_Alarm")
+    flood = create(client, "Flood")
+    # The check passes, the unique index on workflow_name_key still refuses the rename
+    monkeypatch.setattr(WorkflowBuilderService, "is_workflow_name_unique", lambda *args, **kwargs: True)
+
+    response = client.patch(f"/api/workflows/{flood}", json={"workflow_name": "Fire_Alarm"})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "name_not_unique"
@@ -0,0 +1,59 @@
+from sqlalchemy import insert, select
+
+from backend.models.SOP_tables import Option, Question
+from backend.services.wf_builder_service import WorkflowBuilderService
+
+
+def workflow_data(question_count):
+    """Linked multiple-choice questions whose "Skip" option jumps two ahead."""
+    return {
+        "workflow_name": "Fire alarm",
+        "incident_type": "Test",
+        "questions": [
+            {
+                "question_text": f"Step {n}",
+                "question_type": "MULTIPLE_CHOICE",
+                "next_question_id": n + 1 if n < question_count else None,
+                "options": [
+                    {"option_text": "Next", "next_question_id": None},
+                    {"option_text": "Skip", "next_question_id": n + 2 if n + 2 <= question_count else None},
+                ],
+            }
+            for n in range(1, question_count + 1)
+        ],
+    }
+
+
+def statement_kinds(statements):
+    return [" ".join(statement.split()[:3]) for statement in statements.statements]
+
+
+def test_statements_per_created_workflow(session, statements):
+    """SQLite has no insert sentinel: one INSERT per question, everything else one statement."""
+    with statements:
+        created = WorkflowBuilderService(session).create_workflow(workflow_data(5))
+    assert statement_kinds(statements) == (
+        ["INSERT INTO main.workflow"] + ["INSERT INTO main.question"] * 5
+        + ["INSERT INTO main.option", "UPDATE main.question SET"]
+        # The commit expired the workflow; caching its id refreshes it
+        + ["SELECT main.workflow.workflow_id AS"]
+    )
+
+    questions = session.scalars(
+        select(Question).where(Question.workflow_id == created.workflow_id).order_by(Question.question_id)
+    ).all()
+    assert [q.question_text for q in questions] == [f"Step {n}" for n in range(1, 6)]
+    ids = [q.question_id for q in questions]
+    assert [q.next_question_id for q in questions] == ids[1:] + [None]
+    skips = session.scalars(
+        select(Option.next_question_id).where(Option.option_text == "Skip").order_by(Option.question_id)
+    ).all()
+    assert skips == ids[2:] + [None, None]
+
+
+def test_question_insert_is_one_statement_on_sql_server(mssql_executemany_sql):
+    sql = mssql_executemany_sql(
+        insert(Question).returning(Question.question_id, sort_by_parameter_order=True),
+        ["workflow_id", "question_text", "question_type", "is_required", "is_completed"]
+    )
+    assert "OUTPUT inserted.question_id" in sql and "ORDER BY sen_counter" in sql
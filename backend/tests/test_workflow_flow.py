@@ -0,0 +1,50 @@
+from backend.services.cache import LRUCache
+from backend.services.workflow_cache import CompiledOption, CompiledQuestion, CompiledWorkflow
+from backend.services.wf_builder_service import QuestionManagementService, WorkflowBuilderService
+
+
+def test_linear_sop_ends_at_its_last_question(session):
+    # The builder saves sequential steps with next_question_id null
+    cache = LRUCache(maxsize=16)
+    workflow = WorkflowBuilderService(session, workflow_cache=cache).create_workflow({
+        "workflow_name": "Linear",
+        "incident_type": "Test",
+        "questions": [
+            {"question_text": f"Step {n}", "question_type": "SUBJECTIVE", "next_question_id": None}
+            for n in range(1, 6)
+        ],
+    })
+    questions = QuestionManagementService(session, workflow_cache=cache)
+    question_ids = [q["question_id"] for q in questions.get_workflow_question_ids(workflow.workflow_id)]
+
+    assert [questions.is_last_question(question_id) for question_id in question_ids] == [False] * 4 + [True]
+
+
+def question(question_id, next_question_id=None, options=()):
+    return CompiledQuestion(
+        question_id=question_id, question_text=f"Q{question_id}", question_type="SUBJECTIVE",
+        is_required=True, next_question_id=next_question_id, is_completed=False,
+        options=tuple(
+            CompiledOption(option_id=question_id * 10 + n, option_text=f"O{n}", next_question_id=link, is_completed=False)
+            for n, link in enumerate(options)
+        ),
+    )
+
+
+def test_branches_end_where_no_link_leads_on():
+    # 1: one option jumps to 3, the other goes on to 2 (null)
+    # 2: links outside the workflow, which ends the flow
+    # 3: last in order with a null link
+    workflow = CompiledWorkflow(
+        workflow_id=1, workflow_name="Branching", incident_type="Test",
+        questions=(question(1, options=(3, None)), question(2, next_question_id=999), question(3)),
+    )
+    assert workflow.terminal_question_ids == {2, 3}
+
+
+def test_question_with_every_option_ending_the_flow_is_terminal():
+    workflow = CompiledWorkflow(
+        workflow_id=1, workflow_name="Early exit", incident_type="Test",
+        questions=(question(1, options=(999, 999)), question(2)),
+    )
+    assert workflow.terminal_question_ids == {1, 2}
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import insert
+
+from backend.models.SOP_tables import Question, Workflow, workflow_name_key
+
+WORKFLOWS = 600
+
+
+@pytest.fixture
+def catalog(session):
+    """Workflows 1..600, odd ids named "Fire n" and even ids "Flood n", with two questions each."""
+    names = {workflow_id: f"{'Fire' if workflow_id % 2 else 'Flood'} {workflow_id}" for workflow_id in range(1, WORKFLOWS + 1)}
+    session.execute(insert(Workflow), [
+        {"workflow_id": workflow_id, "workflow_name": name, "workflow_name_key": workflow_name_key(name),
+         "incident_type": "Test"}
+        for workflow_id, name in names.items()
+    ])
+    session.execute(insert(Question), [
+        {"workflow_id": workflow_id, "question_text": f"Step {n}", "question_type": "SUBJECTIVE"}
+        for workflow_id in names for n in (1, 2)
+    ])
+    session.commit()
+    return names
+
+
+def workflow_ids(path, body):
+    """Workflow ids of a page: /workflows/questions is keyed by workflow_id, /workflows/details a list."""
+    if path == "/api/workflows/questions":
+        return sorted(int(workflow_id) for workflow_id in body)
+    return [workflow["workflow_id"] for workflow in body]
+
+
+LISTINGS = ["/api/workflows/questions", "/api/workflows/details"]
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+def test_pages_follow_the_cursor_through_the_catalog(client, catalog, path):
+    seen, after, pages = [], None, 0
+    while True:
+        query = {"limit": 250} if after is None else {"limit": 250, "after": after}
+        response = client.get(path, query_string=query)
+        assert response.status_code == 200
+        ids = workflow_ids(path, response.get_json())
+        seen += ids
+        pages += 1
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+        # The cursor is the last workflow of the page
+        assert int(after) == ids[-1]
+
+    assert pages == 3
+    assert seen == list(range(1, WORKFLOWS + 1))
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+def test_prefix_filters_every_page(client, catalog, path):
+    response = client.get(path, query_string={"prefix": "Fire", "limit": 100, "after": 400})
+    ids = workflow_ids(path, response.get_json())
+
+    assert ids == list(range(401, WORKFLOWS, 2))
+    assert response.headers["X-Next-Cursor"] == str(ids[-1])
+
+    # Last (partial) page: no cursor
+    response = client.get(path, query_string={"prefix": "Fire", "limit": 100, "after": ids[-1]})
+    assert workflow_ids(path, response.get_json()) == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+def test_limit_is_clamped_to_max_page_size(client, catalog, path):
+    response = client.get(path, query_string={"limit": 10000})
+
+    assert workflow_ids(path, response.get_json()) == list(range(1, 501))
+    assert response.headers["X-Next-Cursor"] == "500"
+
+    # after alone pages with the default (maximum) size
+    response = client.get(path, query_string={"after": 500})
+    assert workflow_ids(path, response.get_json()) == list(range(501, WORKFLOWS + 1))
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_question_listing_keeps_questions_of_the_page(client, catalog):
+    body = client.get("/api/workflows/questions", query_string={"limit": 2, "after": 10}).get_json()
+    assert body == {
+        str(workflow_id): {
+            "workflow_name": catalog[workflow_id],
+            "questions": [
+                {"question_id": 2 * workflow_id - 1, "question_text": "Step 1", "question_type": "SUBJECTIVE"},
+                {"question_id": 2 * workflow_id, "question_text": "Step 2", "question_type": "SUBJECTIVE"},
+            ],
+        }
+        for workflow_id in (11, 12)
+    }
+
+
+@pytest.mark.parametrize("path", LISTINGS)
+@pytest.mark.parametrize("query", [{"limit": 0}, {"limit": "ten"}, {"after": "x"}])
+def test_invalid_page_arguments_are_rejected(client, path, query):
+    response = client.get(path, query_string=query)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid query parameters")
@@ -0,0 +1,62 @@
+import pytest
+
+from backend.services.cache import LRUCache
+from backend.services.wf_builder_service import QuestionManagementService, WorkflowBuilderService
+
+
+def linear_workflow(name: str, questions: int) -> dict:
+    """A workflow of subjective questions, each with null next_question_id as the builder saves them."""
+    return {
+        "workflow_name": name,
+        "incident_type": "Test",
+        "questions": [
+            {"question_text": f"Step {n}", "question_type": "SUBJECTIVE", "next_question_id": None}
+            for n in range(1, questions + 1)
+        ],
+    }
+
+
+def branching_workflow(name: str, questions: int) -> dict:
+    """Multiple choice questions whose two options both lead to the next question."""
+    return {
+        "workflow_name": name,
+        "incident_type": "Test",
+        "questions": [
+            {
+                "question_text": f"Step {n}",
+                "question_type": "MULTIPLE_CHOICE",
+                "options": [
+                    {"option_text": "Yes", "next_question_id": n + 1 if n < questions else None},
+                    {"option_text": "No", "next_question_id": n + 1 if n < questions else None},
+                ],
+            }
+            for n in range(1, questions + 1)
+        ],
+    }
+
+
+@pytest.fixture
+def builder(session):
+    return WorkflowBuilderService(session, workflow_cache=LRUCache(maxsize=16))
+
+
+@pytest.mark.parametrize("read", ["structure", "questions_and_options", "all_workflow_questions"])
+def test_read_paths_issue_a_constant_number_of_queries(session, builder, statements, read):
+    counts = {}
+    for size in (5, 50):
+        workflow = builder.create_workflow(branching_workflow(f"SOP {size}", size))
+        session.expunge_all()
+        builder.workflow_cache.clear()
+
+        with statements:
+            if read == "structure":
+                structure = builder.get_workflow_structure(workflow.workflow_id)
+                assert len(structure["questions"]) == size
+                assert all(len(question["options"]) == 2 for question in structure["questions"])
+            elif read == "questions_and_options":
+                assert len(builder.get_questions_and_options(workflow.workflow_id)) == size
+            else:
+                QuestionManagementService(session).get_all_workflow_questions()
+        counts[size] = statements.count
+
+    assert 0 < counts[5] == counts[50]
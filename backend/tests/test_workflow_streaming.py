@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from sqlalchemy import event, insert
+
+from backend.models.SOP_tables import Question, Workflow, workflow_name_key
+
+# More than the 1000 rows iter_all_* fetch per yield_per batch
+WORKFLOWS = 2500
+
+
+@pytest.fixture
+def catalog(session):
+    """Workflows 1..2500 named "SOP n" with two questions each, except workflow 3 which has none."""
+    session.execute(insert(Workflow), [
+        {"workflow_id": workflow_id, "workflow_name": f"SOP {workflow_id}",
+         "workflow_name_key": workflow_name_key(f"SOP {workflow_id}"), "incident_type": "Test"}
+        for workflow_id in range(1, WORKFLOWS + 1)
+    ])
+    session.execute(insert(Question), [
+        {"workflow_id": workflow_id, "question_text": f"Step {n}", "question_type": "SUBJECTIVE"}
+        for workflow_id in range(1, WORKFLOWS + 1) if workflow_id != 3 for n in (1, 2)
+    ])
+    session.commit()
+
+
+def parse(mode, body):
+    if mode == "ndjson":
+        return [json.loads(line) for line in body.splitlines()]
+    return json.loads(body)
+
+
+@pytest.mark.parametrize("mode, mimetype", [("json", "application/json"), ("ndjson", "application/x-ndjson")])
+def test_details_stream_parses(client, catalog, mode, mimetype):
+    response = client.get("/api/workflows/details", query_string={"stream": mode, "after": 10})
+
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    items = parse(mode, response.get_data(as_text=True))
+    assert [item["workflow_id"] for item in items] == list(range(11, WORKFLOWS + 1))
+    assert items[0]["workflow_name"] == "SOP 11"
+
+
+@pytest.mark.parametrize("mode", ["json", "ndjson"])
+def test_question_stream_parses(client, catalog, mode):
+    response = client.get("/api/workflows/questions", query_string={"stream": mode, "prefix": "SOP 2"})
+
+    assert response.status_code == 200
+    body = parse(mode, response.get_data(as_text=True))
+    if mode == "ndjson":
+        # One line per workflow, with its id
+        workflows = {item.pop("workflow_id"): item for item in body}
+    else:
+        workflows = {int(workflow_id): value for workflow_id, value in body.items()}
+    expected_ids = [workflow_id for workflow_id in range(1, WORKFLOWS + 1) if str(workflow_id).startswith("2")]
+    assert sorted(workflows) == expected_ids
+    assert [q["question_text"] for q in workflows[2]["questions"]] == ["Step 1", "Step 2"]
+
+    # A workflow without questions is still listed
+    body = parse(mode, client.get("/api/workflows/questions", query_string={"stream": mode, "prefix": "SOP 3"}).get_data(as_text=True))
+    questions = {item["workflow_id"]: item["questions"] for item in body} if mode == "ndjson" else {
+        int(workflow_id): value["questions"] for workflow_id, value in body.items()
+    }
+    assert questions[3] == []
+
+
+@pytest.mark.parametrize("path", ["/api/workflows/details", "/api/workflows/questions"])
+def test_session_stays_open_until_the_stream_ends(client, catalog, engine, path):
+    checkins = []
+    event.listen(engine, "checkin", lambda dbapi_connection, connection_record: checkins.append(1))
+
+    response = client.get(path, query_string={"stream": "ndjson"}, buffered=False)
+    chunks = iter(response.response)
+    lines = [next(chunks)]
+    # The yield_per cursor is read over several batches; its connection stays checked out
+    assert checkins == []
+    for chunk in chunks:
+        lines.append(chunk)
+        assert checkins == []
+    response.close()
+
+    # Returned to the pool by the teardown once the stream is done
+    assert checkins == [1]
+    assert len(b"".join(lines).splitlines()) == WORKFLOWS
+
+
+@pytest.mark.parametrize("query", [{"stream": "xml"}, {"stream": "json", "limit": 10}])
+def test_invalid_stream_arguments_are_rejected(client, query):
+    response = client.get("/api/workflows/details", query_string=query)
+    assert response.status_code == 400
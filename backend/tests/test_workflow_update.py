@@ -0,0 +1,69 @@
+import pytest
+
+from backend.services.wf_builder_service import WorkflowBuilderService
+
+
+@pytest.fixture
+def workflow(session):
+    """Q1 (multiple choice) -> "Yes" jumps to Q3, "No" goes on to Q2; Q2 and Q3 are instructions."""
+    builder = WorkflowBuilderService(session)
+    created = builder.create_workflow({
+        "workflow_name": "Fire alarm",
+        "incident_type": "Test",
+        "questions": [
+            {
+                "question_text": "Fire?",
+                "question_type": "MULTIPLE_CHOICE",
+                "options": [
+                    {"option_text": "Yes", "next_question_id": 3},
+                    {"option_text": "No", "next_question_id": None},
+                ],
+            },
+            {"question_text": "False alarm noted", "question_type": "INSTRUCTION"},
+            {"question_text": "Call the fire brigade", "question_type": "INSTRUCTION"},
+        ],
+    })
+    return builder.get_compiled_workflow(created.workflow_id)
+
+
+def test_update_without_options_keeps_them(session, workflow):
+    builder = WorkflowBuilderService(session)
+    first = workflow.questions[0]
+
+    summary = builder.update_workflow(workflow.workflow_id, {"questions": [
+        {"question_id": first.question_id, "question_text": "Is there a fire?"},
+        {"question_id": workflow.questions[1].question_id},
+        {"question_id": workflow.questions[2].question_id},
+    ]})
+
+    assert summary["questions"]["updated"] == 1
+    assert summary["options"] == {"inserted": 0, "updated": 0, "deleted": 0}
+    stored = builder.get_compiled_workflow(workflow.workflow_id).questions[0]
+    assert stored.question_text == "Is there a fire?"
+    assert stored.options == first.options
+
+
+def test_removing_a_linked_question_is_rejected(session, workflow):
+    builder = WorkflowBuilderService(session)
+    first, second, third = workflow.questions
+
+    # "Yes" still links to the third question through its stored next_question_id
+    with pytest.raises(ValueError, match="still link"):
+        builder.update_workflow(workflow.workflow_id, {"questions": [
+            {"question_id": first.question_id},
+            {"question_id": second.question_id},
+        ]})
+    assert len(builder.get_compiled_workflow(workflow.workflow_id).questions) == 3
+
+    # Relinking the option in the same payload makes the removal valid
+    yes, no = first.options
+    builder.update_workflow(workflow.workflow_id, {"questions": [
+        {"question_id": first.question_id, "options": [
+            {"option_id": yes.option_id, "next_question_id": second.question_id},
+            {"option_id": no.option_id},
+        ]},
+        {"question_id": second.question_id},
+    ]})
+    assert [q.question_id for q in builder.get_compiled_workflow(workflow.workflow_id).questions] == [
+        first.question_id, second.question_id
+    ]
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is built without its background threads; gunicorn.conf.py starts
+them, with fresh connection pools, in every worker once it has forked.
+For the same reason the CLI is run against this module:
+
+    flask --app wsgi init-db
+"""
+from main import create_app
+
+app = create_app(start_background=False)